@@ -6,6 +6,7 @@ class AiCourseCreatorConfig(AppConfig):
     name = "ai_course_creator"
     label = "ai_course_creator"
     verbose_name = "AI Course Creator"
+    default_auto_field = "django.db.models.AutoField"
 
     plugin_app = {
         PluginURLs.CONFIG: {
@@ -19,17 +19,14 @@ def generate_course_data(course_topic, course_level, num_modules):
     content_generator = ContentGenerator()
     
 
-    course_structure = course_generator.generate_course_structure(
+    # Unit content is generated alongside video search and assessments
+    course_with_content = course_generator.generate_course_structure(
         title=course_topic,
         audience=audience,
         duration=duration,
         components=["text"],
-    )
-
-    course_with_content = content_generator.generate_course_content(
-        course_structure=course_structure,
-        components=["text"],
-        use_web_search=False,
+        assessment_types=["multiple-choice"],
+        content_generator=content_generator,
     )
 
     course_dict = course_with_content.to_dict()
@@ -1,59 +1,22 @@
 import os
 import json
 import uuid
-from typing import Dict, List, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Any, Optional
 import google.generativeai as genai
 import logging
 
 from ..models.course import Course, Assessment
+from ..utils.concurrency import DEFAULT_MAX_CONCURRENCY
+from ..utils.metrics import stage
+from .context_cache import CachedContext, shared_context
+from .gemini_client import get_model
+from .llm_cache import generate_text
 
 logger = logging.getLogger(__name__)
 
-class AssessmentGenerator:
-    def __init__(self):
-        genai.configure(api_key=os.getenv('AI_COURSE_CREATOR_GEMINI_API_KEY'))
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
-    
-    def generate_assessments(self, course_structure: Course, assessment_types: List[str]) -> Course:
-        """Generate assessments for the course"""
-        
-        try:
-            # Generate section-level assessments
-            for section in course_structure.sections:
-                assessment = self._generate_section_assessment(
-                    section_id=section.id,
-                    section_title=section.title,
-                    course_title=course_structure.title,
-                    assessment_types=assessment_types
-                )
-                if assessment:
-                    course_structure.add_assessment(assessment)
-            
-            # Generate final course assessment
-            final_assessment = self._generate_final_assessment(
-                course_structure=course_structure,
-                assessment_types=assessment_types
-            )
-            if final_assessment:
-                course_structure.add_assessment(final_assessment)
-            
-            return course_structure
-            
-        except Exception as e:
-            logger.error(f"Error generating assessments: {str(e)}")
-            return course_structure
-    
-    def _generate_section_assessment(self, section_id: str, section_title: str, course_title: str, assessment_types: List[str]) -> Assessment:
-        """Generate assessment for a specific section"""
-        
-        try:
-            prompt = f"""
-            Create an assessment for this course section:
-            
-            Course: {course_title}
-            Section: {section_title}
-            Assessment Types: {', '.join(assessment_types)}
-            
+# Question rules and response format shared by every section assessment prompt
+SECTION_ASSESSMENT_INSTRUCTIONS = """
             Generate a mix of questions using the specified assessment types:
             - multiple-choice: 4 options, 1 correct answer
             - checkbox: 4-6 options, 2-3 correct answers
@@ -68,9 +31,9 @@ class AssessmentGenerator:
             Use <p>, <strong>, <em>, <code>, <ul>, <li> tags as needed.
             
             Return JSON format with HTML content:
-            {{
+            {
                 "questions": [
-                    {{
+                    {
                         "id": "q1",
                         "type": "multiple-choice",
                         "question": "<p>What is the primary purpose of <strong>key concept</strong>?</p>",
@@ -78,54 +41,149 @@ class AssessmentGenerator:
                         "correct_answer": "<p>Option A with <em>emphasis</em></p>",
                         "explanation": "<p>This is correct because <strong>explanation</strong> with proper HTML formatting.</p>",
                         "difficulty": "medium"
-                    }},
-                    {{
+                    },
+                    {
                         "id": "q2", 
                         "type": "checkbox",
                         "question": "<p>Which of the following are <strong>key characteristics</strong>?</p>",
                         "options": ["<p>Option 1</p>", "<p>Option 2</p>", "<p>Option 3</p>", "<p>Option 4</p>"],
                         "correct_answers": ["<p>Option 1</p>", "<p>Option 3</p>"],
                         "explanation": "<p><strong>Explanation</strong> with HTML formatting.</p>"
-                    }},
-                    {{
+                    },
+                    {
                         "id": "q3",
                         "type": "text-input",
                         "question": "<p>Explain the concept of <em>key term</em> in your own words.</p>",
                         "correct_answer": "<p>Expected answer with proper formatting</p>",
                         "explanation": "<p>This answer demonstrates understanding of <strong>key concepts</strong>.</p>"
-                    }},
-                    {{
+                    },
+                    {
                         "id": "q4",
                         "type": "dropdown",
                         "question": "<p>Select the correct <strong>method</strong> for this scenario:</p>",
                         "options": ["<p>Select...</p>", "<p>Option A</p>", "<p>Option B</p>", "<p>Option C</p>"],
                         "correct_answer": "<p>Option B</p>",
                         "explanation": "<p><strong>Explanation</strong> with HTML formatting.</p>"
-                    }},
-                    {{
+                    },
+                    {
                         "id": "q5",
                         "type": "numerical",
                         "question": "<p>Calculate: What is <strong>2 + 2</strong>?</p>",
                         "correct_answer": "4",
                         "tolerance": "0",
                         "explanation": "<p>Basic arithmetic: <em>2 + 2 = 4</em></p>"
-                    }}
+                    }
                 ]
-            }}
+            }
             """
+
+SECTION_ASSESSMENT_SYSTEM_INSTRUCTION = "You are an expert at creating educational assessments. Create challenging but fair questions that test understanding. IMPORTANT: All text content must be formatted in HTML using proper tags like <p>, <strong>, <em>, <code>, etc."
+
+class AssessmentGenerator:
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY):
+        self.max_concurrency = max(1, max_concurrency)
+    
+    @property
+    def model(self) -> genai.GenerativeModel:
+        return get_model()
+    
+    @stage("assessments")
+    def generate_assessments(self, course_structure: Course, assessment_types: List[str], max_concurrency: Optional[int] = None, progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Course:
+        """Generate assessments for the course
+
+        The final assessment only needs the section titles, so it is started
+        together with the per-section assessments. At most ``max_concurrency``
+        calls run at once and results are attached in section order, followed
+        by the final assessment. ``progress_callback("assessment", data)`` is
+        called as each one finishes, in completion order. Section prompts
+        share their instructions through a cached context when it is large
+        enough to cache.
+        """
+        
+        def report(future):
+            if progress_callback and not future.cancelled() and future.exception() is None and future.result():
+                progress_callback("assessment", {"assessment": future.result().to_dict()})
+        
+        workers = max(1, min(max_concurrency or self.max_concurrency, len(course_structure.sections) + 1))
+        
+        try:
+            with self._course_context(course_structure.title, assessment_types) as context, \
+                    ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ai-course-assessment") as executor:
+                # Generate final course assessment
+                final_future = executor.submit(
+                    self._generate_final_assessment,
+                    course_structure=course_structure,
+                    assessment_types=assessment_types
+                )
+                
+                # Generate section-level assessments
+                section_futures = [
+                    executor.submit(
+                        self._generate_section_assessment,
+                        section_id=section.id,
+                        section_title=section.title,
+                        course_title=course_structure.title,
+                        assessment_types=assessment_types,
+                        context=context
+                    )
+                    for section in course_structure.sections
+                ]
+                
+                for future in [final_future] + section_futures:
+                    future.add_done_callback(report)
+                
+                # A failed assessment is logged and skipped; the others are still attached
+                for future in section_futures + [final_future]:
+                    try:
+                        assessment = future.result()
+                    except Exception as e:
+                        logger.error(f"Skipping assessment: {str(e)}")
+                        continue
+                    if assessment:
+                        course_structure.add_assessment(assessment)
+            
+            return course_structure
+            
+        except Exception as e:
+            logger.error(f"Error generating assessments: {str(e)}")
+            return course_structure
+    
+    def _course_context(self, course_title: str, assessment_types: List[str]):
+        """Cached prefix for the section assessment prompts of one course"""
+        contents = f"""
+            Course: {course_title}
+            Assessment Types: {', '.join(assessment_types)}
+            """ + SECTION_ASSESSMENT_INSTRUCTIONS
+        return shared_context(SECTION_ASSESSMENT_SYSTEM_INSTRUCTION, contents, model_name=self.model.model_name)
+    
+    def _generate_section_assessment(self, section_id: str, section_title: str, course_title: str, assessment_types: List[str], context: Optional[CachedContext] = None, use_cache: bool = True) -> Assessment:
+        """Generate assessment for a specific section"""
+        
+        try:
+            if context:
+                # Course, types, rules and format are in the cached prefix
+                full_prompt = f"""
+            Create an assessment for this course section, following the instructions above:
             
-            full_prompt = "You are an expert at creating educational assessments. Create challenging but fair questions that test understanding. IMPORTANT: All text content must be formatted in HTML using proper tags like <p>, <strong>, <em>, <code>, etc.\n\n" + prompt
+            Section: {section_title}
+            """
+            else:
+                full_prompt = SECTION_ASSESSMENT_SYSTEM_INSTRUCTION + "\n\n" + self._section_assessment_prompt(section_title, course_title, assessment_types)
             
-            response = self.model.generate_content(
+            content = generate_text(
+                self.model,
                 full_prompt,
                 generation_config=genai.types.GenerationConfig(
                     temperature=0.7,
                     max_output_tokens=2000
-                )
+                ),
+                validate=self._is_json_response,
+                context=context,
+                use_cache=use_cache
             )
             
             # Get and validate response content
-            content = response.text.strip()
+            content = content.strip()
             if not content:
                 logger.warning(f"Empty response from Gemini for section assessment: {section_title}")
                 raise Exception(f"Section assessment generation failed: {str(e)}")
@@ -154,7 +212,16 @@ class AssessmentGenerator:
             logger.error(f"Error generating section assessment: {str(e)}")
             raise Exception(f"Section assessment generation failed: {str(e)}")
     
-    def _generate_final_assessment(self, course_structure: Course, assessment_types: List[str]) -> Assessment:
+    def _section_assessment_prompt(self, section_title: str, course_title: str, assessment_types: List[str]) -> str:
+        return f"""
+            Create an assessment for this course section:
+            
+            Course: {course_title}
+            Section: {section_title}
+            Assessment Types: {', '.join(assessment_types)}
+            """ + SECTION_ASSESSMENT_INSTRUCTIONS
+    
+    def _generate_final_assessment(self, course_structure: Course, assessment_types: List[str], use_cache: bool = True) -> Assessment:
         """Generate comprehensive final assessment for the entire course"""
         
         try:
@@ -179,16 +246,19 @@ class AssessmentGenerator:
             
             full_prompt = "You are an expert at creating comprehensive final exams. Create questions that test both knowledge and practical application.\n\n" + prompt
             
-            response = self.model.generate_content(
+            content = generate_text(
+                self.model,
                 full_prompt,
                 generation_config=genai.types.GenerationConfig(
                     temperature=0.7,
                     max_output_tokens=3000
-                )
+                ),
+                validate=self._is_json_response,
+                use_cache=use_cache
             )
             
             # Get and validate response content
-            content = response.text.strip()
+            content = content.strip()
             if not content:
                 logger.warning(f"Empty response from Gemini for final assessment: {course_structure.title}")
                 raise Exception(f"Final assessment generation failed: {str(e)}")
@@ -235,16 +305,18 @@ class AssessmentGenerator:
             
             full_prompt = "You are an expert question writer. Create clear, educational questions.\n\n" + prompt
             
-            response = self.model.generate_content(
+            content = generate_text(
+                self.model,
                 full_prompt,
                 generation_config=genai.types.GenerationConfig(
                     temperature=0.7,
                     max_output_tokens=5000
-                )
+                ),
+                validate=self._is_json_response
             )
             
             # Get and validate response content
-            content = response.text.strip()
+            content = content.strip()
             if not content:
                 logger.warning(f"Empty response from Gemini for question generation: {topic}")
                 raise Exception(f"Question generation failed: {str(e)}")
@@ -261,6 +333,14 @@ class AssessmentGenerator:
             logger.error(f"Error generating question: {str(e)}")
             raise Exception(f"Question generation failed: {str(e)}")
     
+    def _is_json_response(self, content: str) -> bool:
+        """Whether a response parses as JSON (only those are cached)"""
+        try:
+            json.loads(self._extract_json_from_response(content))
+            return True
+        except ValueError:
+            return False
+    
     def _extract_json_from_response(self, content: str) -> str:
         """Extract JSON from Gemini response, handling markdown code blocks"""
         content = content.strip()
@@ -0,0 +1,198 @@
+"""
+Batch course generation for catalog-scale runs
+
+Specs are read from CSV or JSONL (``topic``, ``level``, ``duration`` and
+optional ``id``/``assessment_types``), generated across a worker pool, and
+appended to a JSONL results file as each course finishes. The results file
+doubles as the checkpoint: re-running with the same output skips every spec
+that already has a successful line.
+"""
+import csv
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from ..models.serialization import dumps, loads
+from .content_generator import ContentGenerator
+from .course_generator import CourseGenerator
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_CONCURRENCY = 4
+DEFAULT_ASSESSMENT_TYPES = ["multiple-choice", "checkbox", "text-input", "dropdown", "numerical"]
+DURATIONS = ("short", "medium", "long")
+
+
+def load_batch_specs(path: str) -> List[Dict[str, Any]]:
+    """Read course specs from a ``.csv`` or ``.jsonl`` file"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    specs = []
+    for line_number, row in enumerate(rows, start=1):
+        topic = (row.get("topic") or "").strip()
+        if not topic:
+            raise ValueError(f"{path}: row {line_number} has no topic")
+
+        duration = (row.get("duration") or "medium").strip().lower()
+        if duration not in DURATIONS:
+            raise ValueError(f"{path}: row {line_number} has invalid duration {duration!r}")
+
+        assessment_types = row.get("assessment_types") or DEFAULT_ASSESSMENT_TYPES
+        if isinstance(assessment_types, str):
+            assessment_types = [value.strip() for value in assessment_types.split(";") if value.strip()]
+
+        spec = {
+            "topic": topic,
+            "level": (row.get("level") or "beginner").strip().lower(),
+            "duration": duration,
+            "assessment_types": assessment_types,
+        }
+        spec["id"] = row.get("id") or spec_key(spec)
+        specs.append(spec)
+
+    return specs
+
+
+def spec_key(spec: Dict[str, Any]) -> str:
+    material = json.dumps(
+        {key: spec.get(key) for key in ("topic", "level", "duration", "assessment_types")},
+        sort_keys=True
+    )
+    return hashlib.sha1(material.encode("utf-8")).hexdigest()[:16]
+
+
+def completed_spec_ids(output_path: str) -> Set[str]:
+    """
+    Ids with a successful result line in ``output_path``
+
+    Read as bytes, so a partial last line (which may end inside a
+    multi-byte character) is skipped like any other unreadable line.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+
+    with open(output_path, "rb") as f:
+        for line in f:
+            try:
+                record = loads(line)
+            except ValueError:  # includes UnicodeDecodeError
+                continue
+            if isinstance(record, dict) and record.get("status") == "ok":
+                done.add(record.get("id"))
+    return done
+
+
+class _StartRateLimiter:
+    """Spaces course starts so no more than ``per_minute`` begin in any minute"""
+
+    def __init__(self, per_minute: Optional[float]):
+        self.interval = 60.0 / per_minute if per_minute else 0.0
+        self._next_start = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            start_at = max(now, self._next_start)
+            self._next_start = start_at + self.interval
+        if start_at > now:
+            time.sleep(start_at - now)
+
+
+def run_batch(
+    specs: Iterable[Dict[str, Any]],
+    output_path: str,
+    concurrency: int = DEFAULT_BATCH_CONCURRENCY,
+    courses_per_minute: Optional[float] = None,
+    include_videos: bool = True,
+    include_content: bool = True,
+    unit_concurrency: Optional[int] = None,
+    unit_batch_size: Optional[int] = None,
+    on_result: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> Dict[str, int]:
+    """
+    Generate every spec not already completed in ``output_path``
+
+    Up to ``concurrency`` courses run at once and at most
+    ``courses_per_minute`` are started per minute. Each finished course (or
+    failure) is appended to ``output_path`` as one JSON line and flushed to
+    disk immediately. ``on_result`` receives each record with its ``Course``
+    object. Returns counts of ``generated``, ``failed`` and ``skipped``.
+    """
+    specs = list(specs)
+    done = completed_spec_ids(output_path)
+    pending = [spec for spec in specs if spec["id"] not in done]
+    summary = {"generated": 0, "failed": 0, "skipped": len(specs) - len(pending)}
+
+    logger.info(f"Batch generation: {len(pending)} courses to generate, {summary['skipped']} already done")
+    if not pending:
+        return summary
+
+    limiter = _StartRateLimiter(courses_per_minute)
+
+    def generate(spec: Dict[str, Any]) -> Dict[str, Any]:
+        limiter.wait()
+        started = time.monotonic()
+        try:
+            content_generator = None
+            if include_content:
+                options = {}
+                if unit_concurrency:
+                    options["max_concurrency"] = unit_concurrency
+                if unit_batch_size:
+                    options["unit_batch_size"] = unit_batch_size
+                content_generator = ContentGenerator(**options)
+
+            course = CourseGenerator().generate_course_structure(
+                title=spec["topic"],
+                audience=spec["level"],
+                duration=spec["duration"],
+                components=["text", "video"] if include_videos else ["text"],
+                assessment_types=spec["assessment_types"],
+                include_videos=include_videos,
+                content_generator=content_generator,
+            )
+            return {"id": spec["id"], "status": "ok", "spec": spec, "course": course,
+                    "elapsed": round(time.monotonic() - started, 2)}
+
+        except Exception as e:
+            logger.error(f"Batch course {spec['id']} ({spec['topic']}) failed: {str(e)}")
+            return {"id": spec["id"], "status": "error", "spec": spec, "error": str(e),
+                    "elapsed": round(time.monotonic() - started, 2)}
+
+    directory = os.path.dirname(os.path.abspath(output_path))
+    os.makedirs(directory, exist_ok=True)
+
+    with open(output_path, "a+b") as output, \
+            ThreadPoolExecutor(max_workers=max(1, concurrency), thread_name_prefix="ai-course-batch") as executor:
+        # Terminate a line left half-written by an interrupted run
+        if output.seek(0, os.SEEK_END) > 0:
+            output.seek(-1, os.SEEK_END)
+            if output.read(1) != b"\n":
+                output.write(b"\n")
+
+        futures = [executor.submit(generate, spec) for spec in pending]
+
+        for future in as_completed(futures):
+            record = future.result()
+            output.write(dumps(record) + b"\n")
+            output.flush()
+            os.fsync(output.fileno())
+
+            summary["generated" if record["status"] == "ok" else "failed"] += 1
+            if on_result:
+                on_result(record)
+
+    return summary
@@ -0,0 +1,211 @@
+"""
+Compile generated assessment questions into CAPA problem XML
+
+Every question type the assessment generator produces (multiple-choice,
+checkbox, text-input, dropdown, numerical) has a format template compiled
+once at import, so turning a question into XML is a single ``str.format``.
+Compiled problems are validated together: one XML parse covers a whole
+batch, and only when it fails are the problems parsed one by one to find
+the bad ones. A problem whose question HTML is not well-formed is rebuilt
+with its text escaped; one that still fails is dropped and logged.
+"""
+import logging
+import re
+import xml.etree.ElementTree as ET
+from html.entities import name2codepoint
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, NamedTuple, Optional
+from xml.sax.saxutils import escape, quoteattr
+
+from .modulestore import url_name
+
+logger = logging.getLogger(__name__)
+
+_XML_ENTITIES = {"amp", "lt", "gt", "quot", "apos"}
+_REFERENCE_RE = re.compile(r"&(?:([A-Za-z][A-Za-z0-9]*);|(#[0-9]+;|#[xX][0-9A-Fa-f]+;))?")
+
+_PROBLEM = '<problem display_name={display_name}>\n{response}{solution}\n</problem>\n'
+_SOLUTION = '<solution><div class="detailed-solution">{explanation}</div></solution>'
+_CHOICE = '<choice correct="{correct}">{text}</choice>'
+
+_RESPONSES = {
+    "multiple-choice": (
+        '<multiplechoiceresponse><label>{label}</label>'
+        '<choicegroup type="MultipleChoice">{choices}</choicegroup></multiplechoiceresponse>'
+    ),
+    "checkbox": '<choiceresponse><label>{label}</label><checkboxgroup>{choices}</checkboxgroup></choiceresponse>',
+    "dropdown": '<optionresponse><label>{label}</label><optioninput options={options} correct={answer}/></optionresponse>',
+    "text-input": '<stringresponse answer={answer} type="ci"><label>{label}</label><textline size="40"/></stringresponse>',
+    "numerical": (
+        '<numericalresponse answer={answer}><label>{label}</label>'
+        '<responseparam type="tolerance" default={tolerance}/><formulaequationinput/></numericalresponse>'
+    ),
+}
+_RESPONSE_TAGS = {
+    "multiplechoiceresponse", "choiceresponse", "optionresponse", "stringresponse", "numericalresponse",
+}
+
+
+class ProblemBlock(NamedTuple):
+    block_id: str
+    display_name: str
+    data: str
+
+
+class _TextExtractor(HTMLParser):
+    """Collects the text of an HTML fragment; a stray ``<`` or ``&`` stays text"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+
+    def handle_data(self, data: str):
+        self.parts.append(data)
+
+
+def plain_text(html) -> str:
+    """Text content of an HTML fragment, with entities decoded (not escaped)"""
+    parser = _TextExtractor()
+    parser.feed(str(html or ""))
+    parser.close()
+    return "".join(parser.parts).strip()
+
+
+def _xml_reference(match) -> str:
+    name, numeric = match.groups()
+    if numeric or name in _XML_ENTITIES:
+        return match.group(0)
+    if name in name2codepoint:
+        return f"&#{name2codepoint[name]};"
+    return "&amp;" + (f"{name};" if name else "")
+
+
+def _xml_references(html: str) -> str:
+    """HTML named entities (``&nbsp;``) as numeric references and a bare ``&`` escaped, as XML needs"""
+    return _REFERENCE_RE.sub(_xml_reference, html)
+
+
+def _markup(html, escaped: bool) -> str:
+    return escape(plain_text(html)) if escaped else _xml_references(str(html or ""))
+
+
+def compile_question(question: Dict, display_name: str, escaped: bool = False) -> str:
+    """
+    CAPA XML for one question dict
+
+    Question, option and explanation HTML is embedded as is (with HTML-only
+    entities made XML-safe), or as escaped plain text when ``escaped`` is set. Unknown types compile as multiple-choice.
+    """
+    question_type = question.get("type", "multiple-choice")
+    if question_type not in _RESPONSES:
+        question_type = "multiple-choice"
+    label = _markup(question.get("question"), escaped)
+    options = question.get("options", [])
+    correct = question.get("correct_answer", "")
+
+    if question_type in ("multiple-choice", "checkbox"):
+        correct_answers = question.get("correct_answers", []) if question_type == "checkbox" else [correct]
+        response = _RESPONSES[question_type].format(label=label, choices="".join(
+            _CHOICE.format(correct="true" if option in correct_answers else "false", text=_markup(option, escaped))
+            for option in options
+        ))
+    elif question_type == "dropdown":
+        option_list = ",".join("'" + plain_text(option).replace("'", "\\'") + "'" for option in options)
+        response = _RESPONSES[question_type].format(
+            label=label, options=quoteattr(f"({option_list})"), answer=quoteattr(plain_text(correct))
+        )
+    elif question_type == "numerical":
+        response = _RESPONSES[question_type].format(
+            label=label, answer=quoteattr(plain_text(correct)), tolerance=quoteattr(str(question.get("tolerance") or "0"))
+        )
+    else:
+        response = _RESPONSES[question_type].format(label=label, answer=quoteattr(plain_text(correct)))
+
+    explanation = question.get("explanation")
+    return _PROBLEM.format(
+        display_name=quoteattr(display_name),
+        response=response,
+        solution=_SOLUTION.format(explanation=_markup(explanation, escaped)) if explanation else ""
+    )
+
+
+def _problem_error(problem: ET.Element) -> Optional[str]:
+    responses = [child for child in problem if child.tag in _RESPONSE_TAGS]
+    if len(responses) != 1:
+        return "expected exactly one response"
+    response = responses[0]
+    if response.tag in ("multiplechoiceresponse", "choiceresponse"):
+        choices = response.findall(".//choice")
+        if not choices:
+            return "no choices"
+        if not any(choice.get("correct") == "true" for choice in choices):
+            return "no correct choice"
+    elif response.tag == "optionresponse":
+        option_input = response.find("optioninput")
+        if option_input is None or not option_input.get("correct"):
+            return "no correct option"
+    elif not response.get("answer"):
+        return "no answer"
+    return None
+
+
+def validate_problems(problems: List[str]) -> List[Optional[str]]:
+    """
+    Check a batch of problem XML strings; returns an error (or ``None``) per problem
+
+    The batch is parsed as one document. Only if that fails is each problem
+    parsed on its own to find the malformed ones.
+    """
+    try:
+        roots = list(ET.fromstring("<problems>" + "".join(problems) + "</problems>"))
+    except ET.ParseError:
+        roots = None
+
+    # Unbalanced markup in one problem can be balanced by the next one
+    if roots is None or len(roots) != len(problems) or any(root.tag != "problem" for root in roots):
+        roots = []
+        for problem in problems:
+            try:
+                roots.append(ET.fromstring(problem))
+            except ET.ParseError as e:
+                roots.append(str(e))
+
+    return [root if isinstance(root, str) else _problem_error(root) for root in roots]
+
+
+def compile_assessments(assessments: Iterable[Dict]) -> Dict[str, List[ProblemBlock]]:
+    """
+    Compile and validate the questions of every assessment in one pass
+
+    Returns the problem blocks of each assessment keyed by assessment id.
+    Block ids are ``<assessment url_name>_<question index>``.
+    """
+    compiled: Dict[str, List[ProblemBlock]] = {}
+    pending = []  # (assessment id, question, block)
+
+    for assessment in assessments:
+        name = url_name(assessment.get("id"))
+        title = assessment.get("title", "Assessment")
+        compiled[assessment.get("id")] = []
+        for index, question in enumerate(assessment.get("questions", [])):
+            display_name = f"{title} - Question {index + 1}"
+            block = ProblemBlock(f"{name}_{index}", display_name, compile_question(question, display_name))
+            pending.append((assessment.get("id"), question, block))
+
+    errors = validate_problems([block.data for _, _, block in pending])
+    retry = [item for item, error in zip(pending, errors) if error]
+    if retry:
+        escaped = [block._replace(data=compile_question(question, block.display_name, escaped=True)) for _, question, block in retry]
+        retry_errors = dict(zip((block.block_id for block in escaped), validate_problems([block.data for block in escaped])))
+        replacements = {block.block_id: block for block in escaped}
+    else:
+        retry_errors, replacements = {}, {}
+
+    for assessment_id, _, block in pending:
+        block = replacements.get(block.block_id, block)
+        if retry_errors.get(block.block_id):
+            logger.warning(f"Dropping invalid problem {block.block_id}: {retry_errors[block.block_id]}")
+            continue
+        compiled[assessment_id].append(block)
+
+    return compiled
@@ -1,48 +1,32 @@
 import os
-from typing import Dict, List, Any
+import re
+import json
+from typing import Callable, Dict, Iterator, List, Any, Optional
 import google.generativeai as genai
 import logging
 
 from ..models.course import Course, Section, SubSection, Unit
+from ..utils.concurrency import DEFAULT_MAX_CONCURRENCY, run_bounded
+from ..utils.metrics import stage
+from .gemini_client import get_model, max_output_tokens
+from .context_cache import CachedContext, shared_context
+from .llm_cache import generate_text, stream_text
+from .source_index import STRUCTURE_DIGEST_CHARS, SourceIndex
 
 logger = logging.getLogger(__name__)
 
-class ContentGenerator:
-    def __init__(self):
-        genai.configure(api_key=os.getenv('AI_COURSE_CREATOR_GEMINI_API_KEY'))
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
-    
-    def generate_course_content(self, course_structure: Course, components: List[str], use_web_search: bool = True) -> Course:
-        """Generate detailed content for each unit in the course"""
-        
-        try:
-            for section in course_structure.sections:
-                for subsection in section.subsections:
-                    for unit in subsection.units:
-                        self._generate_unit_content(unit, course_structure.title, section.title, subsection.title, components)
-            
-            return course_structure
-            
-        except Exception as e:
-            logger.error(f"Error generating course content: {str(e)}")
-            return course_structure
-    
-    def _generate_unit_content(self, unit: Unit, course_title: str, section_title: str, subsection_title: str, components: List[str]):
-        """Generate content for a specific unit with text+video structure"""
-        
-        try:
-            # Set unit to text_video type by default for rich content
-           
-            
-            prompt = f"""
-Create a complete, high-quality learning unit for a professional learning platform.
+UNIT_BATCH_SIZE = int(os.getenv('AI_COURSE_CREATOR_UNIT_BATCH_SIZE', '3'))  # units per Gemini call; 1 disables batching
+UNIT_MAX_OUTPUT_TOKENS = 8000  # output cap of a unit generated on its own
+# Output budget of each unit in a batched call: a full unit (60-80 lines of HTML,
+# JSON-escaped) is about 2k tokens. A unit cut off by the cap is regenerated alone.
+UNIT_BATCH_OUTPUT_TOKENS = int(os.getenv('AI_COURSE_CREATOR_UNIT_BATCH_OUTPUT_TOKENS', '2600'))
 
-Course: {course_title}
-Section: {section_title}
-Subsection: {subsection_title}
-Unit: {unit.title}
+_UNIT_ENTRY_RE = re.compile(r'\{\s*"id"\s*:')
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+UNIT_SYSTEM_INSTRUCTION = "You are an expert educator creating HTML-formatted educational content that pairs with video lessons. All content must be in proper HTML format for display in a learning management system."
+
+# Rules shared by the single-unit and batched unit prompts
+UNIT_RULES = """━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 CORE RULES (NON-NEGOTIABLE)
 ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 
@@ -120,45 +104,321 @@ OUTPUT RULES
 - NO external links
 - Content must stand alone even WITHOUT video
 
-━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
-Return ONLY the final HTML.
 """
 
+class ContentGenerator:
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, unit_batch_size: int = UNIT_BATCH_SIZE):
+        self.max_concurrency = max(1, max_concurrency)
+        self.unit_batch_size = max(1, unit_batch_size)
+    
+    @property
+    def model(self) -> genai.GenerativeModel:
+        return get_model()
+    
+    @stage("content")
+    def generate_course_content(self, course_structure: Course, components: List[str], use_web_search: bool = True, max_concurrency: Optional[int] = None, progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None, source_index: Optional[SourceIndex] = None) -> Course:
+        """Generate detailed content for each unit in the course
+
+        Units are filled in parallel with at most ``max_concurrency`` Gemini
+        calls in flight (defaults to the generator's limit; 1 runs serially).
+        Each unit is updated in place, so course order is unchanged.
+        ``progress_callback("unit", data)`` is called as each unit finishes.
+        With a ``source_index`` each unit prompt gets only the top-ranked
+        chunks of the uploaded material for that unit. With
+        ``unit_batch_size`` > 1, units of the same subsection share one call.
+        The instructions and course context shared by every unit prompt are
+        sent once as a cached context when they are large enough to cache.
+        """
+        
+        def generate_units(units: List[Unit], section: Section, subsection: SubSection):
+            references = [
+                source_index.search(f"{subsection.title} {unit.title}") if source_index else None
+                for unit in units
+            ]
+            if len(units) == 1:
+                self._generate_unit_content(units[0], course_structure.title, section.title, subsection.title, components, references[0], context)
+            else:
+                self._generate_unit_batch(units, course_structure.title, section.title, subsection.title, components, references, context)
             
-            full_prompt = "You are an expert educator creating HTML-formatted educational content that pairs with video lessons. All content must be in proper HTML format for display in a learning management system.\n\n" + prompt
+            if progress_callback:
+                for unit in units:
+                    progress_callback("unit", {
+                        "section_id": section.id,
+                        "subsection_id": subsection.id,
+                        "unit": unit.to_dict()
+                    })
+        
+        try:
+            batch_size = self._unit_batch_size()
+            jobs = [
+                (subsection.units[start:start + batch_size], section, subsection)
+                for section in course_structure.sections
+                for subsection in section.subsections
+                for start in range(0, len(subsection.units), batch_size)
+            ]
+            
+            with self._course_context(course_structure.title, source_index) as context:
+                run_bounded(
+                    generate_units,
+                    jobs,
+                    max_workers=max_concurrency or self.max_concurrency,
+                    thread_name_prefix="ai-course-content"
+                )
             
-            # Log content generation
-            logger.info(f"Generating HTML content for unit: {unit.title}")
-            logger.info(f"Course context: {course_title} > {section_title} > {subsection_title}")
+            return course_structure
             
-            response = self.model.generate_content(
-                full_prompt,
+        except Exception as e:
+            logger.error(f"Error generating course content: {str(e)}")
+            return course_structure
+    
+    def _unit_batch_size(self) -> int:
+        """``unit_batch_size``, reduced so every unit of a batch keeps its output budget"""
+        fits = max(1, max_output_tokens(self.model.model_name) // UNIT_BATCH_OUTPUT_TOKENS)
+        if fits < self.unit_batch_size:
+            logger.info(f"{self.model.model_name} returns at most {fits} unit(s) per call; "
+                        f"batching {fits} instead of {self.unit_batch_size}")
+        return min(self.unit_batch_size, fits)
+    
+    def _course_context(self, course_title: str, source_index: Optional[SourceIndex] = None):
+        """Cached prefix for every unit prompt of a course: rules, course title and a source digest"""
+        
+        source_block = ""
+        if source_index:
+            source_block = f"""
+COURSE SOURCE MATERIAL (excerpts from the author's uploaded document):
+Stay consistent with this material throughout the course.
+
+{source_index.digest(course_title, max_chars=STRUCTURE_DIGEST_CHARS)}
+"""
+        
+        contents = f"""
+Course: {course_title}
+{source_block}
+""" + UNIT_RULES
+        return shared_context(UNIT_SYSTEM_INSTRUCTION, contents, model_name=self.model.model_name)
+    
+    def _generate_unit_content(self, unit: Unit, course_title: str, section_title: str, subsection_title: str, components: List[str], reference_material: Optional[List[str]] = None, context: Optional[CachedContext] = None, use_cache: bool = True):
+        """Generate content for a specific unit with text+video structure"""
+        
+        try:
+            content = self._request_unit_content(unit, course_title, section_title, subsection_title, reference_material, context, use_cache)
+            self._apply_unit_content(unit, content)
+            
+        except Exception as e:
+            logger.error(f"Error generating unit content for {unit.title}: {str(e)}")
+            self._apply_unit_fallback(unit)
+    
+    def _request_unit_content(self, unit: Unit, course_title: str, section_title: str, subsection_title: str, reference_material: Optional[List[str]] = None, context: Optional[CachedContext] = None, use_cache: bool = True) -> str:
+        """One unit's HTML from Gemini; unlike ``_generate_unit_content`` errors are raised, not replaced by a fallback"""
+        
+        full_prompt = self._create_unit_prompt(unit, course_title, section_title, subsection_title, reference_material, context)
+        
+        # Log content generation
+        logger.debug(f"Generating HTML content for unit: {course_title} > {section_title} > {subsection_title} > {unit.title}")
+        
+        content = generate_text(
+            self.model,
+            full_prompt,
+            generation_config=self._unit_generation_config(),
+            context=context,
+            use_cache=use_cache
+        )
+        
+        logger.debug(f"Generated HTML content length: {len(content)} characters")
+        return content
+    
+    def _generate_unit_batch(self, units: List[Unit], course_title: str, section_title: str, subsection_title: str, components: List[str], references: List[Optional[List[str]]], context: Optional[CachedContext] = None):
+        """Generate several units of one subsection in a single call
+
+        Units missing from (or unparseable in) the response fall back to
+        individual ``_generate_unit_content`` calls.
+        """
+        
+        parsed = {}
+        try:
+            logger.info(f"Generating {len(units)} units in one batch for: {subsection_title}")
+            content = generate_text(
+                self.model,
+                self._create_unit_batch_prompt(units, course_title, section_title, subsection_title, references, context),
                 generation_config=genai.types.GenerationConfig(
                     temperature=0.7,
-                    max_output_tokens=8000
-                )
+                    max_output_tokens=min(max_output_tokens(self.model.model_name), UNIT_BATCH_OUTPUT_TOKENS * len(units)),
+                    response_mime_type="application/json"
+                ),
+                validate=lambda text: bool(self._parse_unit_batch(text)),
+                context=context
             )
+            parsed = self._parse_unit_batch(content)
+        except Exception as e:
+            logger.error(f"Error generating unit batch for {subsection_title}: {str(e)}")
+        
+        for index, (unit, reference_material) in enumerate(zip(units, references), start=1):
+            html = parsed.get(f"u{index}")
+            if html:
+                self._apply_unit_content(unit, html)
+            else:
+                logger.warning(f"Unit {unit.title} missing from batch response, generating it alone")
+                self._generate_unit_content(unit, course_title, section_title, subsection_title, components, reference_material, context)
+    
+    def _create_unit_batch_prompt(self, units: List[Unit], course_title: str, section_title: str, subsection_title: str, references: List[Optional[List[str]]], context: Optional[CachedContext] = None) -> str:
+        """Prompt for several units sharing one copy of the rules and reference excerpts"""
+        
+        # Neighbouring units often retrieve the same chunks; include each once
+        excerpts = list(dict.fromkeys(chunk for chunks in references if chunks for chunk in chunks))
+        reference_block = ""
+        if excerpts:
+            joined = "\n\n---\n\n".join(excerpts)
+            reference_block = f"""
+REFERENCE MATERIAL (excerpts from the author's uploaded document):
+Ground the units in these excerpts and stay faithful to them.
+
+{joined}
+"""
+        
+        unit_list = "\n".join(f"- u{index}: {unit.title}" for index, unit in enumerate(units, start=1))
+        json_format = """Return ONLY JSON in this format, one entry per unit, in the order listed:
+{"units": [{"id": "u1", "html": "<h3>Overview</h3>..."}]}
+"""
+        
+        if context:
+            # Course title and rules are in the cached prefix
+            return f"""
+Create {len(units)} complete, high-quality learning units following the course context and rules above.
+Each unit is written independently and must follow ALL the rules in full.
+
+Section: {section_title}
+Subsection: {subsection_title}
+Units:
+{unit_list}
+{reference_block}
+""" + json_format
+        
+        prompt = f"""
+Create {len(units)} complete, high-quality learning units for a professional learning platform.
+Each unit is written independently and must follow ALL the rules below in full.
+
+Course: {course_title}
+Section: {section_title}
+Subsection: {subsection_title}
+Units:
+{unit_list}
+{reference_block}
+""" + UNIT_RULES + """━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+""" + json_format
+        
+        return UNIT_SYSTEM_INSTRUCTION + "\n\n" + prompt
+    
+    def _parse_unit_batch(self, content: str) -> Dict[str, str]:
+        """Map unit ids to HTML; complete entries are kept even if the response was truncated"""
+        
+        try:
+            units = json.loads(content).get("units", [])
+        except (ValueError, AttributeError):
+            # Truncated output: decode each complete {"id": ...} object on its own
+            units = []
+            decoder = json.JSONDecoder()
+            for match in _UNIT_ENTRY_RE.finditer(content):
+                try:
+                    units.append(decoder.raw_decode(content, match.start())[0])
+                except ValueError:
+                    continue
+        
+        return {
+            str(entry.get("id")): entry["html"]
+            for entry in units
+            if isinstance(entry, dict) and isinstance(entry.get("html"), str) and entry["html"].strip()
+        }
+    
+    def stream_unit_content(self, unit: Unit, course_title: str, section_title: str, subsection_title: str, components: List[str], reference_material: Optional[List[str]] = None) -> Iterator[str]:
+        """Yield unit HTML chunks as Gemini produces them
+
+        Uses the same prompt and generation config as ``_generate_unit_content``.
+        Once the stream ends the unit's ``content``, ``reading_time`` and
+        ``resources`` are set exactly as the non-streamed path would set them;
+        on failure the unit gets the usual fallback content instead.
+        """
+        
+        chunks = []
+        try:
+            full_prompt = self._create_unit_prompt(unit, course_title, section_title, subsection_title, reference_material)
             
-            content = response.text
-            logger.info(f"Generated HTML content length: {len(content)} characters")
-            logger.info(f"Content preview: {content[:200]}...")
-            unit.content = content
+            logger.info(f"Streaming HTML content for unit: {unit.title}")
             
-            # Estimate realistic reading time based on content length
-            word_count = len(content.split())
-            unit.reading_time = max(3, min(15, word_count // 200))  # 200 words per minute reading speed
+            for text in stream_text(self.model, full_prompt, generation_config=self._unit_generation_config()):
+                chunks.append(text)
+                yield text
             
-            # Add metadata
-            unit.resources.append({
-                "type": "generated_content",
-                "content_structure": "text_video_card",
-                "generated_at": "now"
-            })
+            content = "".join(chunks)
+            logger.info(f"Streamed HTML content length: {len(content)} characters")
+            self._apply_unit_content(unit, content)
             
         except Exception as e:
-            logger.error(f"Error generating unit content for {unit.title}: {str(e)}")
-            unit.content = f"<p><strong>{unit.title}</strong> - covering key concepts and practical applications.</p>"
-            unit.reading_time = 5
+            logger.error(f"Error streaming unit content for {unit.title}: {str(e)}")
+            self._apply_unit_fallback(unit)
+    
+    def _create_unit_prompt(self, unit: Unit, course_title: str, section_title: str, subsection_title: str, reference_material: Optional[List[str]] = None, context: Optional[CachedContext] = None) -> str:
+        """Build the Gemini prompt for a unit's HTML content (only the per-unit part with a ``context``)"""
+        
+        reference_block = ""
+        if reference_material:
+            excerpts = "\n\n---\n\n".join(reference_material)
+            reference_block = f"""
+REFERENCE MATERIAL (excerpts from the author's uploaded document):
+Ground the unit in these excerpts and stay faithful to them.
+
+{excerpts}
+"""
+        
+        if context:
+            # Course title and rules are in the cached prefix
+            return f"""
+Create a complete, high-quality learning unit following the course context and rules above.
+
+Section: {section_title}
+Subsection: {subsection_title}
+Unit: {unit.title}
+{reference_block}
+Return ONLY the final HTML.
+"""
+        
+        prompt = f"""
+Create a complete, high-quality learning unit for a professional learning platform.
+
+Course: {course_title}
+Section: {section_title}
+Subsection: {subsection_title}
+Unit: {unit.title}
+{reference_block}
+""" + UNIT_RULES + """━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
+Return ONLY the final HTML.
+"""
+
+        return UNIT_SYSTEM_INSTRUCTION + "\n\n" + prompt
+    
+    def _unit_generation_config(self):
+        return genai.types.GenerationConfig(
+            temperature=0.7,
+            max_output_tokens=UNIT_MAX_OUTPUT_TOKENS
+        )
+    
+    def _apply_unit_content(self, unit: Unit, content: str):
+        """Store generated HTML on the unit with its reading time and metadata"""
+        unit.content = content
+        
+        # Estimate realistic reading time based on content length
+        word_count = len(content.split())
+        unit.reading_time = max(3, min(15, word_count // 200))  # 200 words per minute reading speed
+        
+        # Add metadata
+        unit.resources.append({
+            "type": "generated_content",
+            "content_structure": "text_video_card",
+            "generated_at": "now"
+        })
+    
+    def _apply_unit_fallback(self, unit: Unit):
+        unit.content = f"<p><strong>{unit.title}</strong> - covering key concepts and practical applications.</p>"
+        unit.reading_time = 5
     
     def generate_learning_objectives(self, unit_title: str, section_context: str) -> List[str]:
         """Generate specific learning objectives for a unit"""
@@ -186,7 +446,8 @@ Return ONLY the final HTML.
             
             full_prompt = "You are an educational expert. Create clear, specific learning objectives using action verbs in HTML format.\n\n" + prompt
             
-            response = self.model.generate_content(
+            content = generate_text(
+                self.model,
                 full_prompt,
                 generation_config=genai.types.GenerationConfig(
                     temperature=0.6,
@@ -194,7 +455,6 @@ Return ONLY the final HTML.
                 )
             )
             
-            content = response.text
             # Parse objectives from response
             objectives = [obj.strip() for obj in content.split('\n') if obj.strip() and ('able to' in obj.lower() or 'will' in obj.lower())]
             
@@ -226,7 +486,8 @@ Return ONLY the final HTML.
             
             full_prompt = "You are an expert at creating practical, engaging educational exercises.\n\n" + prompt
             
-            response = self.model.generate_content(
+            content = generate_text(
+                self.model,
                 full_prompt,
                 generation_config=genai.types.GenerationConfig(
                     temperature=0.7,
@@ -236,7 +497,6 @@ Return ONLY the final HTML.
             
             # Parse response into exercise format
             exercises = []
-            content = response.text
             
             # Simple parsing - in production, you'd want more robust parsing
             exercise_blocks = content.split('\n\n')
@@ -0,0 +1,205 @@
+"""
+Server-side context caching for prompt prefixes shared across a course
+
+Unit and assessment prompts for one course repeat the same instructions and
+course context. ``shared_context`` puts that prefix into a Gemini cached
+content once per course and yields a model bound to it, so each call only
+sends its own suffix. The prefix is measured with the model's token counter
+(estimated from its length when counting fails), and prefixes below the model's minimum cacheable size (1,024 tokens for
+Flash models, 4,096 for Pro) are not cached; callers then fall back to
+full prompts.
+
+The ``local`` backend is an in-process fake that prepends the prefix to each
+prompt itself; it behaves like the real cache for tests and development.
+"""
+import datetime
+import hashlib
+import logging
+import os
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+import google.generativeai as genai
+
+from ..utils.metrics import provider_call
+from ..utils.rate_limit import get_limiter
+from ..utils.resilience import resilient_call
+from .gemini_client import get_model
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_CACHE_BACKEND = os.getenv('AI_COURSE_CREATOR_CONTEXT_CACHE', 'gemini')  # gemini, local or none
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv('AI_COURSE_CREATOR_CONTEXT_CACHE_MIN_TOKENS', '0'))  # 0: the model's minimum
+CONTEXT_CACHE_TTL = int(os.getenv('AI_COURSE_CREATOR_CONTEXT_CACHE_TTL', '3600'))  # seconds
+COUNT_TOKENS_DEADLINE = float(os.getenv('AI_COURSE_CREATOR_COUNT_TOKENS_DEADLINE', '30'))  # seconds, then estimated
+
+# Smallest prefix Gemini caches, by model family; unknown models get the larger minimum
+_MODEL_MIN_TOKENS = (("flash", 1024), ("pro", 4096))
+DEFAULT_MIN_TOKENS = 4096
+
+
+class CachedContext:
+    """A cached prompt prefix and the model handle that reads from it"""
+
+    def __init__(self, name: str, prefix: str, model):
+        self.name = name
+        self.prefix = prefix
+        self.model = model
+        self.key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+
+
+def min_cache_tokens(model_name: str) -> int:
+    """Smallest prefix, in tokens, that ``model_name`` accepts as cached content"""
+    if CONTEXT_CACHE_MIN_TOKENS:
+        return CONTEXT_CACHE_MIN_TOKENS
+    for family, tokens in _MODEL_MIN_TOKENS:
+        if family in model_name:
+            return tokens
+    return DEFAULT_MIN_TOKENS
+
+
+class GeminiContextCache:
+    def count_tokens(self, model_name: str, system_instruction: str, contents: str) -> int:
+        get_model(model_name)  # make sure the SDK is configured
+        model = genai.GenerativeModel(model_name, system_instruction=system_instruction)
+
+        def request() -> int:
+            with provider_call("gemini", "count_tokens"):
+                return model.count_tokens(contents).total_tokens
+
+        # Counting is a request of its own: it shares the Gemini limits and retries
+        return resilient_call(
+            request,
+            deadline=COUNT_TOKENS_DEADLINE,
+            hedge=False,
+            latency_key=f"{model_name}:count_tokens",
+            limiter=get_limiter("gemini")
+        )
+
+    def create(self, model_name: str, system_instruction: str, contents: str, ttl: int) -> CachedContext:
+        get_model(model_name)  # make sure the SDK is configured
+        with provider_call("gemini", "cache_create") as record:
+            cached = genai.caching.CachedContent.create(
+                model=model_name,
+                display_name=f"ai-course-{uuid.uuid4().hex[:12]}",
+                system_instruction=system_instruction,
+                contents=[contents],
+                ttl=datetime.timedelta(seconds=ttl)
+            )
+            # Creating the cache is billed for the tokens it stores
+            record.prompt_tokens = getattr(getattr(cached, "usage_metadata", None), "total_token_count", None)
+        model = genai.GenerativeModel.from_cached_content(cached_content=cached)
+        return CachedContext(cached.name, _prefix(system_instruction, contents), model)
+
+    def delete(self, context: CachedContext):
+        genai.caching.CachedContent.get(context.name).delete()
+
+
+class _LocalCachedModel:
+    def __init__(self, model, prefix: str):
+        self.model = model
+        self.prefix = prefix
+
+    @property
+    def model_name(self) -> str:
+        return self.model.model_name
+
+    def generate_content(self, prompt: str, **kwargs):
+        return self.model.generate_content(self.prefix + prompt, **kwargs)
+
+
+class LocalContextCache:
+    """In-process stand-in for Gemini cached content"""
+
+    def __init__(self):
+        self.contexts: Dict[str, CachedContext] = {}
+        self.created = 0
+        self.deleted = 0
+        self._lock = threading.Lock()
+
+    def count_tokens(self, model_name: str, system_instruction: str, contents: str) -> int:
+        return _estimate_tokens(system_instruction, contents)
+
+    def create(self, model_name: str, system_instruction: str, contents: str, ttl: int) -> CachedContext:
+        prefix = _prefix(system_instruction, contents)
+        context = CachedContext(f"local/{uuid.uuid4().hex}", prefix, _LocalCachedModel(get_model(model_name), prefix))
+        with self._lock:
+            self.contexts[context.name] = context
+            self.created += 1
+        return context
+
+    def delete(self, context: CachedContext):
+        with self._lock:
+            if self.contexts.pop(context.name, None) is not None:
+                self.deleted += 1
+
+
+def _prefix(system_instruction: str, contents: str) -> str:
+    return system_instruction + "\n\n" + contents
+
+
+def _estimate_tokens(system_instruction: str, contents: str) -> int:
+    return (len(system_instruction) + len(contents)) // 4
+
+
+_BACKENDS = {
+    "gemini": GeminiContextCache,
+    "local": LocalContextCache,
+}
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_context_cache(name: str = CONTEXT_CACHE_BACKEND):
+    """Process-wide context cache backend, or ``None`` when disabled"""
+    if name not in _BACKENDS:
+        return None
+    with _backends_lock:
+        if name not in _backends:
+            _backends[name] = _BACKENDS[name]()
+        return _backends[name]
+
+
+def _count_tokens(cache, model_name: str, system_instruction: str, contents: str) -> int:
+    try:
+        return cache.count_tokens(model_name, system_instruction, contents)
+    except Exception as e:
+        logger.debug(f"Could not count prefix tokens, estimating: {str(e)}")
+        return _estimate_tokens(system_instruction, contents)
+
+
+@contextmanager
+def shared_context(system_instruction: str, contents: str, model_name: Optional[str] = None,
+                   backend: Optional[str] = None) -> Iterator[Optional[CachedContext]]:
+    """
+    Cache ``system_instruction`` + ``contents`` for the duration of the block
+
+    Yields ``None`` when caching is disabled, the prefix is smaller than the
+    model's minimum (see ``min_cache_tokens``), or creating the cache fails. The cache is deleted on exit.
+    """
+    cache = get_context_cache(backend or CONTEXT_CACHE_BACKEND)
+    context = None
+
+    if cache is not None:
+        model_name = model_name or get_model().model_name
+        tokens = _count_tokens(cache, model_name, system_instruction, contents)
+        if tokens < min_cache_tokens(model_name):
+            logger.debug(f"Prefix of {tokens} tokens is below the {model_name} context cache minimum")
+        else:
+            try:
+                context = cache.create(model_name, system_instruction, contents, CONTEXT_CACHE_TTL)
+                logger.info(f"Created cached context {context.name} ({tokens} tokens)")
+            except Exception as e:
+                logger.warning(f"Context caching unavailable, sending full prompts: {str(e)}")
+
+    try:
+        yield context
+    finally:
+        if context is not None:
+            try:
+                cache.delete(context)
+            except Exception as e:
+                # The TTL still expires it
+                logger.warning(f"Could not delete cached context {context.name}: {str(e)}")
@@ -3,24 +3,43 @@ Course Builder Service
 Creates Open edX course components in the modulestore
 """
 import logging
-from typing import Dict, List, Optional
+from html import escape
+from typing import Any, Dict, List, Optional
+
+from .capa import compile_assessments
+from .modulestore import course_key_for, get_modulestore, url_name
+from .olx_export import assessment_format, final_chapter_name, write_olx
 
 log = logging.getLogger(__name__)
 
+_COMPONENT_HTML = (
+    '<div class="ai-generated-module">'
+    '<div class="module-header"><h2>{title}</h2><p class="module-description">{description}</p></div>'
+    '<div class="module-content">{content}</div>'
+    '{objectives}{duration}'
+    '</div>'
+)
+_OBJECTIVES_HTML = '<div class="learning-objectives"><h3>Learning Objectives</h3><ul>{items}</ul></div>'
+_DURATION_HTML = '<div class="module-duration"><strong>Estimated Time:</strong> {duration}</div>'
+
 
 class CourseBuilderService:
     """Service for creating Open edX course components"""
 
-    def __init__(self, runtime=None, parent_location=None):
+    def __init__(self, runtime=None, parent_location=None, modulestore=None, user_id=None):
         """
         Initialize Course Builder Service
 
         Args:
             runtime: XBlock runtime
-            parent_location: Parent location for creating components
+            parent_location: Parent location for creating components (the course root or course key)
+            modulestore: Modulestore to write to (defaults to the runtime's or Studio's)
+            user_id: User recorded as the author of created blocks
         """
         self.runtime = runtime
         self.parent_location = parent_location
+        self.modulestore = modulestore
+        self.user_id = user_id
 
     def create_course_components(
         self,
@@ -35,19 +54,22 @@ class CourseBuilderService:
             create_in_studio: Whether to create actual components in Studio (requires modulestore access)
 
         Returns:
-            Dictionary with component locations and metadata
+            Dictionary with component locations and metadata, or the plan
+            of components when nothing is written to Studio
+
+        Raises:
+            Any error from the modulestore. The write is not replaced by the
+            plan, since the blocks created before the error may remain.
         """
-        if not create_in_studio or not self.runtime:
+        if not create_in_studio or not (self.runtime or self.modulestore):
             return self._create_component_plan(course_structure)
 
         try:
-            # This would integrate with Open edX's modulestore
-            # For now, returns a plan of what would be created
             return self._create_with_modulestore(course_structure)
 
         except Exception as e:
             log.error(f"Error creating course components: {str(e)}")
-            return self._create_component_plan(course_structure)
+            raise
 
     def _create_component_plan(self, course_structure: Dict) -> Dict:
         """
@@ -89,27 +111,37 @@ class CourseBuilderService:
 
         return components
 
+    def _get_modulestore(self):
+        return self.modulestore or getattr(self.runtime, 'modulestore', None) or get_modulestore()
+
+    def _root_location(self):
+        # A course key stands for its course root block
+        if hasattr(self.parent_location, 'make_usage_key'):
+            return self.parent_location.make_usage_key('course', 'course')
+        return self.parent_location
+
     def _create_with_modulestore(self, course_structure: Dict) -> Dict:
         """
         Create actual components in Open edX modulestore
 
-        This method would interact with the Open edX modulestore to create:
-        - Chapters (for grouping modules)
-        - Sequentials (for module content)
-        - Verticals (for individual units)
-        - HTML XBlocks (for content display)
+        Writes the whole course in one bulk operation, so the modulestore
+        commits it as a single transaction, and publishes it once at the end:
+        - Chapters (one per section)
+        - Sequentials (one per subsection)
+        - Verticals (one per unit)
+        - HTML and video XBlocks (unit content)
+        - Graded sequentials of CAPA problems (assessments)
 
         Args:
-            course_structure: Course structure dictionary
+            course_structure: Course structure dictionary (``Course.to_dict()``)
 
         Returns:
             Dictionary with created component locations
         """
-        # Note: This requires integration with Open edX modulestore
-        # which is available in the Studio runtime context
-
-        if not self.runtime:
-            return self._create_component_plan(course_structure)
+        store = self._get_modulestore()
+        root = self._root_location()
+        if store is None or root is None:
+            raise RuntimeError("Creating components needs a modulestore and a parent location")
 
         created_components = {
             'course_title': course_structure.get('title', ''),
@@ -117,126 +149,126 @@ class CourseBuilderService:
             'locations': []
         }
 
-        try:
-            # Get the modulestore from runtime
-            # This is a simplified example - actual implementation would need
-            # proper integration with Open edX's modulestore API
-
-            sections = course_structure.get('sections', [])
-
-            for idx, module in enumerate(sections):
-                # In a full implementation, this would:
-                # 1. Create a chapter if needed
-                # 2. Create a sequential for the module
-                # 3. Create a vertical for the content
-                # 4. Create HTML blocks for the content
-
-                component_info = {
-                    'module_number': idx + 1,
-                    'title': module.get('title', ''),
-                    'created': True,
-                    'type': 'module',
-                    # Location would be actual modulestore location
-                    'location': f"block-v1:course+run+type@vertical+block@module_{idx+1}"
-                }
-
-                created_components['components'].append(component_info)
-                created_components['locations'].append(component_info['location'])
-
-        except Exception as e:
-            log.error(f"Error creating modulestore components: {str(e)}")
-            # Fall back to plan
-            return self._create_component_plan(course_structure)
-
+        def create(parent, block_type: str, block_id: str, fields: Dict[str, Any]):
+            block = store.create_child(
+                self.user_id,
+                parent,
+                block_type,
+                block_id=block_id,
+                fields=fields
+            )
+            location = block.location
+            created_components['components'].append({
+                'type': block_type,
+                'title': fields.get('display_name', ''),
+                'location': str(location),
+                'parent': str(parent)
+            })
+            created_components['locations'].append(str(location))
+            return location
+
+        problems = compile_assessments(course_structure.get('assessments', []))
+        assessments_by_section = {}
+        for assessment in course_structure.get('assessments', []):
+            assessments_by_section.setdefault(assessment.get('section_id'), []).append(assessment)
+
+        def create_assessment(chapter, assessment: Dict):
+            # Same layout as the OLX export: one graded sequential and vertical per assessment
+            name = url_name(assessment.get('id'))
+            title = assessment.get('title', 'Assessment')
+            sequential = create(chapter, 'sequential', name, {'display_name': title, 'graded': True, 'format': assessment_format(assessment)})
+            vertical = create(sequential, 'vertical', name, {'display_name': title})
+            for problem in problems[assessment.get('id')]:
+                create(vertical, 'problem', problem.block_id, {'display_name': problem.display_name, 'data': problem.data})
+
+        with store.bulk_operations(course_key_for(root)):
+            for section in course_structure.get('sections', []):
+                chapter = create(root, 'chapter', url_name(section.get('id')), {'display_name': section.get('title', '')})
+
+                for subsection in section.get('subsections', []):
+                    sequential = create(chapter, 'sequential', url_name(subsection.get('id')), {'display_name': subsection.get('title', '')})
+
+                    for unit in subsection.get('units', []):
+                        title = unit.get('title', '')
+                        # Same block ids as the OLX export
+                        name = url_name(unit.get('id'))
+                        vertical = create(sequential, 'vertical', name, {'display_name': title})
+                        create(vertical, 'html', f"{name}_html", {'display_name': title, 'data': unit.get('content', '')})
+
+                        video_fields = _video_fields(unit.get('video_url'))
+                        if video_fields:
+                            create(vertical, 'video', f"{name}_video", dict(video_fields, display_name=f"{title} - Video"))
+
+                for assessment in assessments_by_section.get(section.get('id'), []):
+                    create_assessment(chapter, assessment)
+
+            final_assessments = assessments_by_section.get(None, [])
+            if final_assessments:
+                chapter = create(root, 'chapter', final_chapter_name(course_structure), {'display_name': 'Final Assessment'})
+                for assessment in final_assessments:
+                    create_assessment(chapter, assessment)
+
+            store.publish(root, self.user_id)
+
+        log.info(f"Created {len(created_components['locations'])} blocks for {created_components['course_title']!r}")
+        created_components['published'] = True
         return created_components
 
     def get_component_html(self, module: Dict) -> str:
         """
         Generate HTML for a course module
 
+        Title, description, objectives and duration are escaped; ``content``
+        is already HTML.
+
         Args:
             module: Module dictionary with content
 
         Returns:
             HTML string for the module
         """
-        html = f"""
-        <div class="ai-generated-module">
-            <div class="module-header">
-                <h2>{module.get('title', 'Untitled Module')}</h2>
-                <p class="module-description">{module.get('description', '')}</p>
-            </div>
-            <div class="module-content">
-                {module.get('content', '')}
-            </div>
-        """
-
-        # Add learning objectives if present
-        objectives = module.get('learning_objectives', [])
-        if objectives:
-            html += """
-            <div class="learning-objectives">
-                <h3>Learning Objectives</h3>
-                <ul>
-            """
-            for obj in objectives:
-                html += f"<li>{obj}</li>"
-            html += """
-                </ul>
-            </div>
-            """
-
-        # Add duration if present
+        objectives = module.get('learning_objectives', []) or []
         duration = module.get('duration', '')
-        if duration:
-            html += f"""
-            <div class="module-duration">
-                <strong>Estimated Time:</strong> {duration}
-            </div>
-            """
-
-        html += "</div>"
-        return html
-
-    def create_olx_export(self, course_structure: Dict) -> Dict:
+        return _COMPONENT_HTML.format(
+            title=escape(str(module.get('title', 'Untitled Module'))),
+            description=escape(str(module.get('description', ''))),
+            content=module.get('content', ''),
+            objectives=_OBJECTIVES_HTML.format(
+                items="".join(f"<li>{escape(str(objective))}</li>" for objective in objectives)
+            ) if objectives else "",
+            duration=_DURATION_HTML.format(duration=escape(str(duration))) if duration else ""
+        )
+
+    def create_olx_export(self, course_structure: Dict, output) -> Dict:
         """
-        Create OLX (Open Learning XML) export format
+        Export the course as an OLX tarball for Studio's course import
+
+        The tarball is streamed to ``output`` file by file, so memory use
+        stays flat however large the course is.
 
         Args:
-            course_structure: Course structure dictionary
+            course_structure: Course structure dictionary (``Course.to_dict()``)
+            output: Path or binary file object to write the ``.tar.gz`` to
 
         Returns:
-            Dictionary in OLX format
+            Dictionary describing the export
         """
-        sections = course_structure.get('sections', [])
+        if isinstance(output, str):
+            with open(output, 'wb') as f:
+                files = write_olx(course_structure, f)
+        else:
+            files = write_olx(course_structure, output)
 
-        olx = {
-            'course': {
-                'display_name': course_structure.get('title', ''),
-                'description': course_structure.get('description', ''),
-                'chapters': []
-            }
+        return {
+            'course_title': course_structure.get('title', ''),
+            'files': files
         }
 
-        for idx, module in enumerate(sections):
-            chapter = {
-                'display_name': module.get('title', ''),
-                'url_name': f"chapter_{idx+1}",
-                'sequentials': [{
-                    'display_name': module.get('title', ''),
-                    'url_name': f"sequential_{idx+1}",
-                    'verticals': [{
-                        'display_name': f"{module.get('title', '')} - Content",
-                        'url_name': f"vertical_{idx+1}",
-                        'components': [{
-                            'type': 'html',
-                            'display_name': module.get('title', ''),
-                            'url_name': f"html_{idx+1}",
-                            'data': self.get_component_html(module)
-                        }]
-                    }]
-                }]
-            }
-            olx['course']['chapters'].append(chapter)
 
-        return olx
+def _video_fields(video_url: Optional[str]) -> Dict[str, Any]:
+    if not video_url:
+        return {}
+    if 'youtube.com/embed/' in video_url:
+        return {'youtube_id_1_0': video_url.split('youtube.com/embed/', 1)[1].split('?', 1)[0]}
+    return {'html5_sources': [video_url], 'youtube_id_1_0': ''}
+
@@ -1,69 +1,126 @@
 import os
 import json
+import hashlib
+import threading
 import uuid
-from typing import Dict, List, Any
+from typing import Callable, Dict, List, Any, Optional, Tuple
 import google.generativeai as genai
 import httpx
-import requests
 from ..utils.json_parser import safe_parse_llm_json
+from ..utils.cache import DEFAULT_BACKEND, ResponseCache, get_backend
+from ..utils.concurrency import DEFAULT_MAX_CONCURRENCY, run_bounded, run_dag
+from ..utils.http import get_http_client
+from ..utils.metrics import provider_call, record_cache_hit, stage
+from ..utils.rate_limit import get_limiter
 import logging
 
 from ..models.course import Course, Section, SubSection, Unit, Assessment
 
 from .assessment_generator import AssessmentGenerator
+from .content_generator import ContentGenerator
+from .gemini_client import get_model
+from .llm_cache import generate_text
+from .source_index import STRUCTURE_DIGEST_CHARS, build_source_index
+from .source_summarizer import SourceSummarizer
 
 
 logger = logging.getLogger(__name__)
 
+# Structure prompt budget when the document is large enough to need an outline
+SOURCE_EXCERPT_CHARS = 3000
+
+# The structure response is the largest single call, so it gets a longer deadline
+STRUCTURE_DEADLINE = float(os.getenv('AI_COURSE_CREATOR_STRUCTURE_DEADLINE', '240'))  # seconds
+
+VIDEO_CACHE_BACKEND = os.getenv('AI_COURSE_CREATOR_VIDEO_CACHE', DEFAULT_BACKEND)
+VIDEO_CACHE_TTL = int(os.getenv('AI_COURSE_CREATOR_VIDEO_CACHE_TTL', str(30 * 24 * 60 * 60)))  # seconds
+VIDEO_NEGATIVE_CACHE_TTL = int(os.getenv('AI_COURSE_CREATOR_VIDEO_NEGATIVE_CACHE_TTL', str(24 * 60 * 60)))  # seconds
+
+_video_cache = None
+_video_cache_lock = threading.Lock()
+
+
+def get_video_cache() -> ResponseCache:
+    """Process-wide search query -> embed URL cache (``None`` = no video found)"""
+    global _video_cache
+    with _video_cache_lock:
+        if _video_cache is None:
+            _video_cache = ResponseCache(get_backend(VIDEO_CACHE_BACKEND), namespace="video", ttl=VIDEO_CACHE_TTL)
+        return _video_cache
+
+
+def _video_cache_key(search_query: str) -> str:
+    normalized = " ".join(search_query.lower().split())
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
 class CourseGenerator:
     def __init__(self):
-        genai.configure(api_key=os.getenv('AI_COURSE_CREATOR_GEMINI_API_KEY'))
-        self.model = genai.GenerativeModel('gemini-2.0-flash')
         self.assessment_generator = AssessmentGenerator()
+        self.source_summarizer = SourceSummarizer()
+    
+    @property
+    def model(self) -> genai.GenerativeModel:
+        """Shared Gemini model handle, created lazily on first use"""
+        return get_model()
     
-    def generate_course_structure(self, title: str, audience: str, duration: str, components: List[str], assessment_types: List[str], include_videos: bool = True, source_material: str |None = None) -> Course:
-        """Generate the hierarchical course structure using Gemini"""
+    @stage("course")
+    def generate_course_structure(self, title: str, audience: str, duration: str, components: List[str], assessment_types: List[str], include_videos: bool = True, source_material: str |None = None, progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None, content_generator=None) -> Course:
+        """Generate the hierarchical course structure using Gemini
+
+        Only the structure call is sequential. Once the course skeleton is
+        built, video search, assessments and (when a ``content_generator`` is
+        given) unit content run as concurrent pipeline stages that fill the
+        same ``Course``, so the total time approaches the slowest stage.
+
+        ``progress_callback(event, data)`` receives ``stage`` events, the raw
+        ``structure`` as soon as it is parsed, a ``section`` event per built
+        section and a ``videos`` event once video search is done; it is passed
+        on to the other generators for ``assessment`` and ``unit`` events.
+        """
+        
+        def report(event: str, **data):
+            if progress_callback:
+                progress_callback(event, data)
         
         try:
-            prompt = self._create_structure_prompt(title, audience, duration, components, source_material)
+            # Index the whole upload once; prompts only carry the relevant passages
+            source_index = build_source_index(source_material)
+            source_digest = None
+            source_outline = None
+            
+            if source_index:
+                if len(source_material) > STRUCTURE_DIGEST_CHARS:
+                    report("stage", stage="summarizing")
+                    with stage("source_summary"):
+                        source_outline = self.source_summarizer.summarize(source_material, title)
+                    source_digest = source_index.digest(title, SOURCE_EXCERPT_CHARS)
+                else:
+                    source_digest = source_material
+            
+            report("stage", stage="structure")
+            prompt = self._create_structure_prompt(title, audience, duration, components, source_digest, source_outline)
             
             full_prompt = "You are an expert curriculum designer. Create comprehensive course structures with sections, subsections, and units following educational best practices.\n\n" + prompt
             
-            # Log the API call details
-            logger.info("=" * 60)
-            logger.info("GEMINI API CALL - COURSE STRUCTURE GENERATION")
-            logger.info("=" * 60)
-            logger.info(f"Course Title: {title}")
-            logger.info(f"Target Audience: {audience}")
-            logger.info(f"Duration: {duration}")
-            logger.info(f"Components: {components}")
-            logger.info(f"Prompt Length: {len(full_prompt)} characters")
-            logger.info("Prompt Preview:")
-            logger.info(full_prompt[:500] + "..." if len(full_prompt) > 500 else full_prompt)
-            logger.info("-" * 40)
+            logger.info(f"Generating course structure: {title} ({audience}, {duration}, {len(full_prompt)} prompt characters)")
             
-            # Make the API call
-            logger.info("Making Gemini API call...")
-            response = self.model.generate_content(
-                full_prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=0.0,
-                    max_output_tokens=9000,
-                    response_mime_type="application/json",
-                
+            with stage("structure"):
+                content = generate_text(
+                    self.model,
+                    full_prompt,
+                    generation_config=genai.types.GenerationConfig(
+                        temperature=0.0,
+                        max_output_tokens=9000,
+                        response_mime_type="application/json",
+                    
+                    ),
+                    validate=lambda text: 'sections' in safe_parse_llm_json(text),
+                    deadline=STRUCTURE_DEADLINE
                 )
-            )
-            
-            # Log the response details
-            logger.info("Gemini API call completed successfully!")
-            logger.info(f"Response usage metadata: {getattr(response, 'usage_metadata', 'Not available')}")
             
             # Get and validate response content
-            content = response.text.strip()
-            logger.info(f"Response Length: {len(content)} characters")
-            logger.info("Response Preview:")
-            logger.info(content[:800] + "..." if len(content) > 800 else content)
-            logger.info("=" * 60)
+            content = content.strip()
+            logger.debug(f"Course structure response: {len(content)} characters")
             if not content:
                 logger.error("Empty response from Gemini for course structure")
                 raise Exception("Gemini API returned empty response")
@@ -77,28 +134,217 @@ class CourseGenerator:
                 logger.error(f"AI response keys: {structure_data.keys()}")
                 raise Exception("Invalid course sctrutre: missing 'sections'")
 
+            report("structure", title=title, sections=structure_data['sections'])
             course = self._build_course_from_structure(
                 structure_data,
                 title,
                 audience,
                 duration,
-                include_videos
+                include_videos,
+                progress_callback=progress_callback
             )
 
-          
-            
+            stages = {
+                "assessments": (
+                    lambda: self.assessment_generator.generate_assessments(
+                        course_structure=course,
+                        assessment_types=assessment_types,
+                        progress_callback=progress_callback
+                    ),
+                    ()
+                ),
+            }
+            if include_videos:
+                stages["videos"] = (lambda: self._attach_videos(course, progress_callback), ())
+            if content_generator is not None:
+                stages["content"] = (
+                    lambda: content_generator.generate_course_content(
+                        course_structure=course,
+                        components=components,
+                        use_web_search=False,
+                        progress_callback=progress_callback,
+                        source_index=source_index
+                    ),
+                    ()
+                )
 
-            course = self.assessment_generator.generate_assessments(
-                course_structure = course,
-                assessment_types = assessment_types
-            )
+            report("stage", stage="generating", stages=sorted(stages))
+            run_dag(stages)
 
             return course
         except Exception as e:
             logger.error(f"Error generating course structure: {str(e)}")
             raise Exception(f"Course structure generation failed: {str(e)}")
     
-    def _create_structure_prompt(self, title: str, audience: str, duration: str, components: List[str], source_material: str | None = None) -> str:
+    def regenerate_unit(self, course: Course, unit_id: str, components: List[str], include_videos: bool = True, source_material: Optional[str] = None, content_generator: Optional[ContentGenerator] = None) -> Unit:
+        """Regenerate one unit's content (and video) in place, keeping its id and title
+
+        The new content is generated into a copy of the unit and swapped in
+        only when it succeeds; on failure the error is raised and the unit is
+        left as it was. A video search that finds nothing keeps the old video.
+        """
+        
+        found = course.find_unit(unit_id)
+        if found is None:
+            raise KeyError(f"Unit {unit_id} not found")
+        section, subsection, unit = found
+        
+        content_generator = content_generator or ContentGenerator()
+        source_index = build_source_index(source_material)
+        reference_material = source_index.search(f"{subsection.title} {unit.title}") if source_index else None
+        
+        replacement = Unit(
+            id=unit.id,
+            title=unit.title,
+            content_type=unit.content_type,
+            resources=[resource for resource in unit.resources if resource.get("type") != "generated_content"]
+        )
+        
+        def generate_content():
+            # A fresh call rather than the cached response being replaced
+            content = content_generator._request_unit_content(
+                replacement, course.title, section.title, subsection.title, reference_material, use_cache=False
+            )
+            if not (content and content.strip()):
+                raise ValueError(f"No content was generated for unit {unit.title}")
+            content_generator._apply_unit_content(replacement, content)
+        
+        stages = {"content": (generate_content, ())}
+        if include_videos:
+            query = f"{unit.title} tutorial"
+            stages["videos"] = (lambda: self.search_youtube_videos([query], use_cache=False).get(query), ())
+        results = run_dag(stages)
+        
+        unit.content = replacement.content
+        unit.reading_time = replacement.reading_time
+        unit.resources = replacement.resources
+        if results.get("videos"):
+            unit.video_url = results["videos"]
+        return unit
+    
+    def regenerate_subsection(self, course: Course, section_id: str, subsection_id: str, components: List[str], include_videos: bool = True, source_material: Optional[str] = None, content_generator: Optional[ContentGenerator] = None) -> SubSection:
+        """Replace one subsection's description and units, keeping its id and title
+
+        The new units get new ids. Every other node is untouched, including
+        the section assessment, which only depends on the section title.
+        The subsection is only changed once every stage has finished.
+        """
+        
+        section = course.get_section_by_id(section_id)
+        subsection = course.get_subsection_by_id(section_id, subsection_id)
+        if section is None or subsection is None:
+            raise KeyError(f"Subsection {subsection_id} not found in section {section_id}")
+        
+        structure = self._generate_subsection_structure(course, section, subsection)
+        units = [
+            Unit(
+                id=str(uuid.uuid4()),
+                title=unit_data.get("title", ""),
+                content_type="text_video" if include_videos else "text"
+            )
+            for unit_data in structure["units"]
+            if isinstance(unit_data, dict) and unit_data.get("title")
+        ]
+        
+        content_generator = content_generator or ContentGenerator()
+        source_index = build_source_index(source_material)
+        
+        def generate_unit(unit: Unit):
+            reference_material = source_index.search(f"{subsection.title} {unit.title}") if source_index else None
+            content_generator._generate_unit_content(
+                unit, course.title, section.title, subsection.title, components, reference_material, use_cache=False
+            )
+        
+        stages = {
+            "content": (lambda: run_bounded(
+                generate_unit,
+                [(unit,) for unit in units],
+                max_workers=content_generator.max_concurrency,
+                thread_name_prefix="ai-course-content"
+            ), ()),
+        }
+        if include_videos:
+            stages["videos"] = (lambda: self._attach_unit_videos(units), ())
+        run_dag(stages)
+        
+        subsection.description = structure.get("description") or subsection.description
+        subsection.units = units
+        return subsection
+    
+    def regenerate_assessment(self, course: Course, assessment_id: str, assessment_types: List[str]) -> Assessment:
+        """Regenerate one section or final assessment in place, keeping its id"""
+        
+        assessment = course.get_assessment_by_id(assessment_id)
+        if assessment is None:
+            raise KeyError(f"Assessment {assessment_id} not found")
+        
+        if assessment.section_id:
+            section = course.get_section_by_id(assessment.section_id)
+            if section is None:
+                raise KeyError(f"Section {assessment.section_id} of assessment {assessment_id} not found")
+            replacement = self.assessment_generator._generate_section_assessment(
+                section_id=section.id,
+                section_title=section.title,
+                course_title=course.title,
+                assessment_types=assessment_types,
+                use_cache=False
+            )
+        else:
+            replacement = self.assessment_generator._generate_final_assessment(course, assessment_types, use_cache=False)
+        
+        replacement.id = assessment.id
+        course.assessments[course.assessments.index(assessment)] = replacement
+        return replacement
+    
+    def _generate_subsection_structure(self, course: Course, section: Section, subsection: SubSection) -> Dict[str, Any]:
+        """Ask Gemini for a new description and unit titles for one subsection"""
+        
+        siblings = [other.title for other in section.subsections if other.id != subsection.id]
+        unit_count = len(subsection.units) or 3
+        
+        prompt = f"""
+        Return ONLY valid JSON.
+        
+        Redesign one subsection of an existing course.
+        
+        Course: "{course.title}" (audience: {course.audience})
+        Section: "{section.title}"
+        Subsection to redesign: "{subsection.title}"
+        Other subsections in this section (do not overlap with them): {', '.join(siblings) or 'none'}
+        
+        REQUIREMENTS:
+        - Exactly {unit_count} units, in a sensible learning order
+        - The description must be MEDIUM–LONG (3–4 paragraphs), formatted in HTML using <p>, <strong>, <em> tags
+        
+        Return ONLY a valid JSON object exactly matching this schema:
+        {{
+            "description": "<p>Description of the subsection.</p>",
+            "units": [
+                {{"title": "Unit Title"}}
+            ]
+        }}
+        """
+        
+        full_prompt = "You are an expert curriculum designer. Create comprehensive course structures with sections, subsections, and units following educational best practices.\n\n" + prompt
+        
+        content = generate_text(
+            self.model,
+            full_prompt,
+            generation_config=genai.types.GenerationConfig(
+                temperature=0.7,
+                max_output_tokens=3000,
+                response_mime_type="application/json",
+            ),
+            validate=lambda text: isinstance(safe_parse_llm_json(text).get('units'), list),
+            use_cache=False
+        )
+        
+        structure = safe_parse_llm_json(content)
+        if not isinstance(structure.get("units"), list) or not structure["units"]:
+            raise Exception(f"Invalid subsection structure for {subsection.title}: missing 'units'")
+        return structure
+    
+    def _create_structure_prompt(self, title: str, audience: str, duration: str, components: List[str], source_material: str | None = None, source_outline: str | None = None) -> str:
         
         duration_mapping = {
             "short": "1-2 hours",
@@ -137,9 +383,17 @@ You MUST prioritize this content when designing the course.
 Do NOT introduce topics that are not supported by this material.
 You may reorganize, expand, and clarify concepts, but stay faithful to the source.
 
-REFERENCE MATERIAL (summarized):
+REFERENCE MATERIAL (most relevant excerpts):
 
-{source_material[:8000]}
+{source_material}
+
+"""
+
+        if source_outline:
+            reference_block += f"""
+DOCUMENT OUTLINE (condensed from the whole document, use it for coverage and ordering):
+
+{source_outline}
 
 """
 
@@ -321,7 +575,7 @@ REFERENCE MATERIAL (summarized):
         return None
 
     
-    def _build_course_from_structure(self, structure_data: Dict, title: str, audience: str, duration: str, include_videos: bool ) -> Course:
+    def _build_course_from_structure(self, structure_data: Dict, title: str, audience: str, duration: str, include_videos: bool, progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None) -> Course:
         """Convert JSON structure to Course objects"""
         
         course = Course(
@@ -351,50 +605,117 @@ REFERENCE MATERIAL (summarized):
                 units = subsection_data.get('units') or []
 
                 for unit_data in units:
-                    video_url = None
-                    content_type = "text"
-                    
-                    if include_videos:
-                        search_query = f"{unit_data.get('title', '')} tutorial"
-                        video_url = self.search_youtube_video(search_query)
-
-                        if video_url:
-                            content_type = "text_video"
                     unit = Unit(
                         id=str(uuid.uuid4()),
                         title=unit_data.get('title', ''),
-                        content_type="text_video" if include_videos else "text",
-                        video_url=video_url
+                        content_type="text_video" if include_videos else "text"
                     )
                     subsection.add_unit(unit)
                 
                 section.add_subsection(subsection)
             
             course.add_section(section)
+            if progress_callback:
+                progress_callback("section", {"section": section.to_dict()})
         
         return course
+
+    def _attach_videos(self, course: Course, progress_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        """Look up a tutorial video for every unit and set its ``video_url``"""
+        
+        units = [
+            unit
+            for section in course.sections
+            for subsection in section.subsections
+            for unit in subsection.units
+        ]
+        self._attach_unit_videos(units)
+        
+        if progress_callback:
+            progress_callback("videos", {"videos": {unit.id: unit.video_url for unit in units}})
+    
+    @stage("videos")
+    def _attach_unit_videos(self, units: List[Unit]):
+        video_urls = self.search_youtube_videos([f"{unit.title} tutorial" for unit in units])
+        
+        for unit in units:
+            unit.video_url = video_urls.get(f"{unit.title} tutorial")
+    
     def search_youtube_video(self, search_query: str) -> str | None:
         """Search YouTube using Tavily and return an EMBED URL"""
 
         if not search_query:
             return None
 
+        return self.search_youtube_videos([search_query]).get(search_query)
+
+    def search_youtube_videos(self, search_queries: List[str], max_concurrency: int = DEFAULT_MAX_CONCURRENCY, use_cache: bool = True) -> Dict[str, Optional[str]]:
+        """Search YouTube for many queries at once and map each query to an EMBED URL
+
+        Duplicate queries are searched once, cached results (including "no
+        video found") skip the network, and the remaining Tavily requests run
+        concurrently over the shared HTTP client. Failed requests are not cached.
+        With ``use_cache=False`` every query is searched and the cache refreshed.
+        """
+
+        cache = get_video_cache()
+        results = {}
+        misses = []
+
+        for search_query in dict.fromkeys(query for query in search_queries if query):
+            hit, embed_url = cache.lookup(_video_cache_key(search_query)) if use_cache else (False, None)
+            if hit:
+                results[search_query] = embed_url
+                record_cache_hit("tavily", "search")
+            else:
+                misses.append(search_query)
+
+        if not misses:
+            return results
+
         tavily_api_key = os.getenv("AI_COURSE_CREATOR_TAVILY_API_KEY")
         if not tavily_api_key:
             logger.error("TAVILY_API_KEY not set")
-            return None
+            results.update((search_query, None) for search_query in misses)
+            return results
+
+        found = run_bounded(
+            self._search_tavily,
+            [(search_query, tavily_api_key) for search_query in misses],
+            max_workers=max_concurrency,
+            thread_name_prefix="ai-course-video"
+        )
+
+        for search_query, (completed, embed_url) in zip(misses, found):
+            results[search_query] = embed_url
+            if completed:
+                cache.set(
+                    _video_cache_key(search_query),
+                    embed_url,
+                    ttl=VIDEO_CACHE_TTL if embed_url else VIDEO_NEGATIVE_CACHE_TTL
+                )
+
+        return results
+
+    def _search_tavily(self, search_query: str, tavily_api_key: str) -> Tuple[bool, Optional[str]]:
+        """Return ``(completed, embed_url)``; ``completed`` is False if the request failed"""
 
         try:
-            response = requests.post(
-                "https://api.tavily.com/search",
-            json={
-                "api_key": tavily_api_key,
-                "query": f"{search_query} site:youtube.com/watch",
-                "search_depth": "basic",
-                "max_results": 5
-            },
-            timeout=15
-        )
+            def search():
+                with provider_call("tavily", "search"):
+                    response = get_http_client().post(
+                        "https://api.tavily.com/search",
+                        json={
+                            "api_key": tavily_api_key,
+                            "query": f"{search_query} site:youtube.com/watch",
+                            "search_depth": "basic",
+                            "max_results": 5
+                        }
+                    )
+                    response.raise_for_status()
+                return response
+
+            response = get_limiter("tavily").call(search)
 
             data = response.json()
             results = data.get("results", [])
@@ -404,15 +725,15 @@ REFERENCE MATERIAL (summarized):
                 video_id = self._extract_video_id(url)
                 if video_id:
                     embed_url = f"https://www.youtube.com/embed/{video_id}"
-                    logger.info(f"✓ Found YouTube video via Tavily: {embed_url}")
-                    return embed_url
+                    logger.debug(f"✓ Found YouTube video via Tavily: {embed_url}")
+                    return True, embed_url
 
             logger.debug(f"No YouTube video found via Tavily for: {search_query}")
-            return None
+            return True, None
 
         except Exception as e:
             logger.error(f"Tavily YouTube search failed: {str(e)}")
-            return None
+            return False, None
 
     
 
@@ -0,0 +1,58 @@
+"""
+Process-wide Gemini client registry
+
+``genai.configure`` resets the SDK's cached transport, so it is called once
+per API key here rather than in every generator constructor. Model handles
+are created on first use and shared by all generators and threads.
+"""
+import os
+import threading
+
+import google.generativeai as genai
+
+DEFAULT_MODEL_NAME = os.getenv('AI_COURSE_CREATOR_GEMINI_MODEL', 'gemini-2.0-flash')
+MODEL_MAX_OUTPUT_TOKENS = int(os.getenv('AI_COURSE_CREATOR_GEMINI_MAX_OUTPUT_TOKENS', '0'))  # 0: the model's own limit
+
+# Output token limit by model generation; unknown models get the smallest
+_MODEL_OUTPUT_LIMITS = (("gemini-2.5", 65536), ("gemini-3", 65536))
+DEFAULT_MAX_OUTPUT_TOKENS = 8192
+
+_lock = threading.Lock()
+_models = {}
+_configured_api_key = None
+
+
+def get_model(model_name: str = DEFAULT_MODEL_NAME) -> genai.GenerativeModel:
+    """Return the shared ``GenerativeModel`` for ``model_name``, configuring the SDK on first use"""
+    global _configured_api_key
+
+    api_key = os.getenv('AI_COURSE_CREATOR_GEMINI_API_KEY')
+    with _lock:
+        if api_key != _configured_api_key or not _models:
+            # First use, or the key was rotated: (re)configure and drop stale handles
+            genai.configure(api_key=api_key)
+            _configured_api_key = api_key
+            _models.clear()
+
+        model = _models.get(model_name)
+        if model is None:
+            model = _models[model_name] = genai.GenerativeModel(model_name)
+        return model
+
+
+def max_output_tokens(model_name: str = DEFAULT_MODEL_NAME) -> int:
+    """Most output tokens one ``generate_content`` call of ``model_name`` can return"""
+    if MODEL_MAX_OUTPUT_TOKENS:
+        return MODEL_MAX_OUTPUT_TOKENS
+    for prefix, tokens in _MODEL_OUTPUT_LIMITS:
+        if model_name.startswith(prefix):
+            return tokens
+    return DEFAULT_MAX_OUTPUT_TOKENS
+
+
+def reset():
+    """Forget configured state and model handles (e.g. after a fork)"""
+    global _configured_api_key
+    with _lock:
+        _models.clear()
+        _configured_api_key = None
@@ -0,0 +1,212 @@
+"""
+Background course generation jobs
+
+Jobs are recorded in the Django cache so that any web worker can report
+progress, and run on Celery when it is available or on a small in-process
+thread pool otherwise. The job record only holds status fields; the
+generation parameters (which may include a whole PDF's text) are handed
+to the worker directly and never stored in the cache. An uploaded PDF is
+saved to Django's default storage and read by the worker, so queueing a job
+never waits for text extraction.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+JOB_BACKEND = os.getenv('AI_COURSE_CREATOR_JOB_BACKEND', 'auto')  # auto, celery, local
+JOB_WORKERS = int(os.getenv('AI_COURSE_CREATOR_JOB_WORKERS', '2'))
+JOB_TTL = int(os.getenv('AI_COURSE_CREATOR_JOB_TTL', str(24 * 60 * 60)))  # seconds
+
+JOB_KEY = "ai_course_creator:job:{}"
+JOB_RESULT_KEY = "ai_course_creator:job:{}:result"
+UPLOAD_PATH = "ai_course_creator/uploads/{}.pdf"
+
+# Rough share of total wall clock spent before each stage starts
+STAGE_PROGRESS = {
+    "queued": 0,
+    "running": 5,
+    "reading_pdf": 5,
+    "summarizing": 6,
+    "structure": 10,
+    "generating": 40,
+    "completed": 100,
+    "failed": 100,
+}
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def create_job(owner_id: Optional[int] = None) -> str:
+    """Record a queued job and return its id"""
+    job_id = str(uuid.uuid4())
+    now = time.time()
+    cache.set(JOB_KEY.format(job_id), {
+        'id': job_id,
+        'status': 'queued',
+        'stage': 'queued',
+        'progress': STAGE_PROGRESS['queued'],
+        'message': '',
+        'owner_id': owner_id,
+        'created_at': now,
+        'updated_at': now,
+    }, JOB_TTL)
+    return job_id
+
+
+def get_job(job_id: str) -> Optional[Dict[str, Any]]:
+    return cache.get(JOB_KEY.format(job_id))
+
+
+def get_job_result(job_id: str) -> Optional[Dict[str, Any]]:
+    """The finished course, from the cache or, once that has expired, from its stored draft"""
+    result = cache.get(JOB_RESULT_KEY.format(job_id))
+    if result is None:
+        from ..models import CourseDraft
+
+        draft = CourseDraft.objects.filter(job_id=job_id).first()
+        if draft is not None:
+            result = draft.get_course_data()
+    return result
+
+
+def update_job(job_id: str, **fields) -> Optional[Dict[str, Any]]:
+    job = get_job(job_id)
+    if job is None:
+        return None
+    job.update(fields)
+    job['updated_at'] = time.time()
+    cache.set(JOB_KEY.format(job_id), job, JOB_TTL)
+    return job
+
+
+def store_source_pdf(uploaded_file) -> str:
+    """Save an uploaded PDF for a job to read later; return its storage name"""
+    return default_storage.save(UPLOAD_PATH.format(uuid.uuid4().hex), uploaded_file)
+
+
+def _read_source_pdf(name: str) -> str:
+    from ..utils.pdf import extract_pdf_text
+
+    with default_storage.open(name, 'rb') as uploaded_file:
+        return extract_pdf_text(uploaded_file)
+
+
+def run_job(job_id: str, params: Dict[str, Any]):
+    """
+    Run the generation pipeline with ``params`` for a queued job and store its result
+
+    A ``source_pdf`` parameter names a stored upload (see ``store_source_pdf``);
+    its text becomes the source material and the upload is deleted.
+    """
+    from .course_generator import CourseGenerator
+
+    params = dict(params)
+    source_pdf = params.pop('source_pdf', None)
+    try:
+        job = get_job(job_id)
+        if job is None:
+            logger.error(f"Course generation job {job_id} not found (expired?)")
+            return
+
+        def on_progress(event: str, data: Dict[str, Any]):
+            if event == 'stage':
+                update_job(job_id, stage=data['stage'], progress=STAGE_PROGRESS.get(data['stage'], job['progress']))
+
+        update_job(job_id, status='running', stage='running', progress=STAGE_PROGRESS['running'])
+
+        try:
+            if source_pdf:
+                update_job(job_id, stage='reading_pdf', progress=STAGE_PROGRESS['reading_pdf'])
+                try:
+                    params['source_material'] = _read_source_pdf(source_pdf)
+                except Exception as e:
+                    raise ValueError(f"Failed to read PDF: {str(e)}") from e
+
+            course = CourseGenerator().generate_course_structure(
+                progress_callback=on_progress,
+                **params
+            )
+            cache.set(JOB_RESULT_KEY.format(job_id), course.to_dict(), JOB_TTL)
+            save_draft(course, owner_id=job['owner_id'], job_id=job_id)
+            update_job(job_id, status='completed', stage='completed', progress=STAGE_PROGRESS['completed'])
+
+        except Exception as e:
+            logger.error(f"Course generation job {job_id} failed: {str(e)}")
+            update_job(job_id, status='failed', stage='failed', progress=STAGE_PROGRESS['failed'], message=str(e))
+
+    finally:
+        if source_pdf:
+            try:
+                default_storage.delete(source_pdf)
+            except Exception as e:
+                logger.warning(f"Could not delete uploaded PDF {source_pdf}: {str(e)}")
+
+
+def save_draft(course, owner_id: Optional[int] = None, job_id: str = ""):
+    """Store a finished course as a draft; a database error is logged, not raised"""
+    from ..models import CourseDraft
+
+    try:
+        close_old_connections()
+        return CourseDraft.objects.save_course(course, owner_id=owner_id, job_id=job_id)
+    except Exception as e:
+        logger.error(f"Could not save draft for course {course.id}: {str(e)}")
+        return None
+
+
+def _run_local_job(job_id: str, params: Dict[str, Any]):
+    try:
+        run_job(job_id, params)
+    finally:
+        # Pool threads outlive requests; don't leak their database connections
+        connections.close_all()
+
+
+def submit_job(params: Dict[str, Any], owner_id: Optional[int] = None) -> str:
+    """Create a job and dispatch it to Celery or the local worker pool"""
+    job_id = create_job(owner_id=owner_id)
+
+    task = _get_celery_task()
+    if task is not None:
+        try:
+            task.delay(job_id, params)
+            return job_id
+        except Exception as e:
+            if JOB_BACKEND == 'celery':
+                update_job(job_id, status='failed', stage='failed', message=str(e))
+                raise
+            logger.warning(f"Celery dispatch failed, running job {job_id} locally: {str(e)}")
+
+    _get_executor().submit(_run_local_job, job_id, params)
+    return job_id
+
+
+def _get_celery_task():
+    if JOB_BACKEND == 'local':
+        return None
+    try:
+        from ..tasks import generate_course_task
+    except ImportError:
+        if JOB_BACKEND == 'celery':
+            raise
+        return None
+    return generate_course_task
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOB_WORKERS, thread_name_prefix="ai-course-job")
+        return _executor
@@ -0,0 +1,164 @@
+"""
+Content-addressed cache for Gemini responses
+
+Responses are keyed by a hash of the model name, the full prompt and the
+generation config, so identical calls from any generator share one entry.
+"""
+import dataclasses
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Iterator, Optional
+
+from ..utils.cache import DEFAULT_BACKEND, ResponseCache, get_backend
+from ..utils.metrics import provider_call, record_cache_hit
+from ..utils.rate_limit import get_limiter
+from ..utils.resilience import RetryableResponse, resilient_call
+
+logger = logging.getLogger(__name__)
+
+LLM_CACHE_BACKEND = os.getenv('AI_COURSE_CREATOR_LLM_CACHE', DEFAULT_BACKEND)
+LLM_CACHE_TTL = int(os.getenv('AI_COURSE_CREATOR_LLM_CACHE_TTL', str(7 * 24 * 60 * 60)))  # seconds
+LLM_DEADLINE = float(os.getenv('AI_COURSE_CREATOR_LLM_DEADLINE', '120'))  # seconds per call, retries included
+LLM_HEDGE = os.getenv('AI_COURSE_CREATOR_LLM_HEDGE', 'true').lower() in ('1', 'true', 'yes')
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> ResponseCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(get_backend(LLM_CACHE_BACKEND), namespace="llm", ttl=LLM_CACHE_TTL)
+        return _cache
+
+
+def _config_dict(generation_config: Any) -> Dict[str, Any]:
+    if generation_config is None:
+        return {}
+    if dataclasses.is_dataclass(generation_config):
+        config = dataclasses.asdict(generation_config)
+    elif isinstance(generation_config, dict):
+        config = dict(generation_config)
+    else:
+        config = {"repr": repr(generation_config)}
+    return {key: value for key, value in config.items() if value is not None}
+
+
+def cache_key(model_name: str, prompt: str, generation_config: Any = None) -> str:
+    material = json.dumps(
+        {"model": model_name, "prompt": prompt, "config": _config_dict(generation_config)},
+        sort_keys=True,
+        default=str
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+def estimate_tokens(prompt: str, generation_config: Any = None) -> int:
+    """Rough token budget for a call: ~4 characters per prompt token plus the output cap"""
+    return len(prompt) // 4 + int(_config_dict(generation_config).get("max_output_tokens") or 0)
+
+
+def _total_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) or None
+
+
+def generate_text(model, prompt: str, generation_config: Any = None, use_cache: bool = True,
+                  validate: Optional[Callable[[str], bool]] = None, deadline: Optional[float] = None,
+                  context=None) -> str:
+    """
+    Return ``model.generate_content(prompt).text``, served from cache when possible
+
+    Empty responses, and responses rejected by ``validate``, are retried and
+    never cached; if every attempt is rejected the last response is returned.
+    Pass ``use_cache=False`` to force a fresh call (the new response still
+    replaces the cached one). Calls go through the ``gemini`` rate limiter,
+    are retried on transient errors, hedged once slower than the recent p95,
+    and raise ``CallDeadlineExceeded`` after ``deadline`` seconds
+    (``LLM_DEADLINE`` by default).
+
+    With a ``context`` (see ``context_cache.shared_context``) only ``prompt``
+    is sent, to the model bound to the cached prefix; the response cache is
+    still keyed on the full prefix + prompt.
+    """
+    cache = get_llm_cache()
+    full_prompt = context.prefix + prompt if context else prompt
+    key = cache_key(model.model_name, full_prompt, generation_config)
+
+    if use_cache:
+        hit, text = cache.lookup(key)
+        if hit:
+            logger.debug(f"LLM cache hit ({model.model_name}, key {key[:12]})")
+            record_cache_hit("gemini", "generate")
+            return text
+
+    limiter = get_limiter("gemini")
+    estimated = estimate_tokens(full_prompt, generation_config)
+    target = context.model if context else model
+
+    def request():
+        with provider_call("gemini", "generate") as record:
+            response = target.generate_content(prompt, generation_config=generation_config)
+            record.set_usage(getattr(response, "usage_metadata", None))
+        return response
+
+    def call() -> str:
+        response = request()
+        limiter.record_tokens(estimated, _total_tokens(response))
+        text = response.text
+        if not (text and text.strip()) or (validate is not None and not validate(text)):
+            raise RetryableResponse(text, "empty or invalid response")
+        return text
+
+    text = resilient_call(
+        call,
+        deadline=deadline or LLM_DEADLINE,
+        hedge=LLM_HEDGE,
+        latency_key=f"{model.model_name}:{_config_dict(generation_config).get('max_output_tokens')}",
+        limiter=limiter,
+        tokens=estimated
+    )
+    if text and text.strip() and (validate is None or validate(text)):
+        cache.set(key, text)
+    return text
+
+
+def stream_text(model, prompt: str, generation_config: Any = None, use_cache: bool = True) -> Iterator[str]:
+    """Streaming counterpart of ``generate_text``; a cache hit is yielded as one chunk"""
+    cache = get_llm_cache()
+    key = cache_key(model.model_name, prompt, generation_config)
+
+    if use_cache:
+        hit, text = cache.lookup(key)
+        if hit:
+            logger.debug(f"LLM cache hit ({model.model_name}, key {key[:12]})")
+            record_cache_hit("gemini", "stream")
+            yield text
+            return
+
+    # The slot is held until the stream ends; a throttled stream is not retried
+    limiter = get_limiter("gemini")
+    estimated = estimate_tokens(prompt, generation_config)
+    chunks = []
+    usage = None
+    with limiter.slot(tokens=estimated), provider_call("gemini", "stream") as record:
+        for chunk in model.generate_content(prompt, generation_config=generation_config, stream=True):
+            usage = _total_tokens(chunk) or usage
+            record.set_usage(getattr(chunk, "usage_metadata", None))
+            try:
+                text = chunk.text
+            except ValueError:
+                # Chunks without text parts (e.g. the final finish_reason chunk)
+                continue
+            if text:
+                chunks.append(text)
+                yield text
+    limiter.record_tokens(estimated, usage)
+
+    text = "".join(chunks)
+    if text.strip():
+        cache.set(key, text)
@@ -0,0 +1,106 @@
+"""
+Modulestore access for writing generated courses
+
+``get_modulestore`` returns Studio's modulestore when the plugin runs inside
+edx-platform. ``LocalModuleStore`` is an in-process fake with the subset of
+the modulestore API the course builder uses (``bulk_operations``,
+``create_child``, ``publish``); it records every write so tests and
+development can check what an import would do without a Studio database.
+"""
+import threading
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+
+def get_modulestore():
+    """Studio's modulestore, or ``None`` outside edx-platform"""
+    try:
+        from xmodule.modulestore.django import modulestore
+    except ImportError:
+        return None
+    return modulestore()
+
+
+def url_name(node_id: Optional[str]) -> str:
+    """Block id (and OLX ``url_name``) for a model id"""
+    return (node_id or uuid.uuid4().hex).replace("-", "")
+
+
+def course_key_for(location: Any) -> Any:
+    """Course key of a usage key (or a course key passed as is)"""
+    return getattr(location, "course_key", location)
+
+
+def _local_course_id(location: str) -> str:
+    """``Org+Course+Run`` from a ``course-v1:`` key or ``block-v1:`` location string"""
+    if location.startswith("block-v1:"):
+        return location[len("block-v1:"):].split("+type@", 1)[0]
+    return location.replace("course-v1:", "", 1)
+
+
+class LocalBlock:
+    def __init__(self, location: str, block_type: str, fields: Dict[str, Any]):
+        self.location = location
+        self.category = block_type
+        self.fields = fields
+        self.children: List[str] = []
+
+    @property
+    def display_name(self) -> str:
+        return self.fields.get("display_name", "")
+
+
+class LocalModuleStore:
+    """In-process stand-in for the Open edX modulestore"""
+
+    def __init__(self):
+        self.blocks: Dict[str, LocalBlock] = {}
+        self.published: List[str] = []
+        self.bulk_operations_count = 0
+        self.writes = 0
+        self.commits = 0
+        self._depth = 0
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def bulk_operations(self, course_key: Any) -> Iterator[None]:
+        with self._lock:
+            self._depth += 1
+            if self._depth == 1:
+                self.bulk_operations_count += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._depth -= 1
+                if self._depth == 0:
+                    self.commits += 1
+
+    def create_child(self, user_id: Optional[int], parent_usage_key: Any, block_type: str,
+                     block_id: Optional[str] = None, fields: Optional[Dict[str, Any]] = None, **kwargs) -> LocalBlock:
+        parent_id = str(parent_usage_key)
+        course_id = _local_course_id(parent_id)
+        location = f"block-v1:{course_id}+type@{block_type}+block@{block_id}"
+        block = LocalBlock(location, block_type, dict(fields or {}))
+        with self._lock:
+            if location in self.blocks:
+                raise ValueError(f"Duplicate block {location}")
+            parent = self.blocks.get(parent_id)
+            if parent is None:
+                if not (parent_id.startswith("course-v1:") or "+type@course+" in parent_id):
+                    raise KeyError(f"Parent block {parent_id} does not exist")
+                # The course root exists implicitly
+                parent = self.blocks[parent_id] = LocalBlock(parent_id, "course", {})
+            self.blocks[location] = block
+            parent.children.append(location)
+            if self._depth == 0:
+                self.commits += 1  # outside a bulk operation every write is its own transaction
+            self.writes += 1
+        return block
+
+    def publish(self, location: Any, user_id: Optional[int], **kwargs):
+        with self._lock:
+            self.published.append(str(location))
+            if self._depth == 0:
+                self.commits += 1
@@ -0,0 +1,198 @@
+"""
+Streaming OLX export of generated courses
+
+Writes a course as an OLX tarball that Studio's course import accepts
+(``course.xml`` plus ``course/``, ``chapter/``, ``sequential/``,
+``vertical/``, ``html/``, ``video/`` and ``problem/`` files). Files are
+generated one node at a time and written through a streaming gzip tar, so
+memory use does not grow with the size of the course: ``write_olx`` writes
+to a file object and ``iter_olx`` yields the compressed bytes in chunks for
+an HTTP response.
+"""
+import io
+import re
+import tarfile
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import quoteattr
+
+from .capa import ProblemBlock, compile_assessments
+from .modulestore import url_name
+
+OLX_ORG = "AICourseCreator"
+OLX_ROOT = "course"  # top-level directory inside the tarball
+
+# Assignment types of Studio's default grading policy
+SECTION_ASSESSMENT_FORMAT = "Homework"
+FINAL_ASSESSMENT_FORMAT = "Final Exam"
+
+_NUMBER_RE = re.compile(r"[^A-Za-z0-9]+")
+
+
+def course_run_keys(course_structure: Dict, org: str = OLX_ORG) -> Tuple[str, str, str]:
+    """``(org, course number, run)`` used for an exported course"""
+    number = _NUMBER_RE.sub("_", course_structure.get("title", "")).strip("_")[:40] or "course"
+    run = url_name(course_structure.get("id"))[:12]
+    return org, number, run
+
+
+def final_chapter_name(course_structure: Dict) -> str:
+    """Block id of the chapter holding course-level assessments"""
+    return f"{course_run_keys(course_structure)[2]}_final"
+
+
+def assessment_format(assessment: Dict) -> str:
+    """Assignment type a graded assessment sequential is counted under"""
+    return SECTION_ASSESSMENT_FORMAT if assessment.get("section_id") else FINAL_ASSESSMENT_FORMAT
+
+
+def _attrs(**values: Any) -> str:
+    return "".join(f" {name}={quoteattr(str(value))}" for name, value in values.items() if value is not None)
+
+
+def _container(tag: str, display_name: str, children: List[Tuple[str, str]], **attrs: Any) -> bytes:
+    lines = [f"<{tag}{_attrs(display_name=display_name, **attrs)}>"]
+    lines.extend(f'  <{child_tag} url_name="{child_name}"/>' for child_tag, child_name in children)
+    lines.append(f"</{tag}>")
+    return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _assessment_files(assessment: Dict, problems: List[ProblemBlock]) -> Iterator[Tuple[str, bytes]]:
+    """A graded sequential with one vertical holding a problem per question"""
+    name = url_name(assessment.get("id"))
+    title = assessment.get("title", "Assessment")
+
+    yield f"sequential/{name}.xml", _container("sequential", title, [("vertical", name)], graded="true", format=assessment_format(assessment))
+    yield f"vertical/{name}.xml", _container("vertical", title, [("problem", problem.block_id) for problem in problems])
+    for problem in problems:
+        yield f"problem/{problem.block_id}.xml", problem.data.encode("utf-8")
+
+
+def _unit_files(unit: Dict) -> Iterator[Tuple[str, bytes]]:
+    name = url_name(unit.get("id"))
+    title = unit.get("title", "")
+    children = [("html", f"{name}_html")]
+    video_url = unit.get("video_url")
+    if video_url:
+        children.append(("video", f"{name}_video"))
+
+    yield f"vertical/{name}.xml", _container("vertical", title, children)
+    yield f"html/{name}_html.xml", f"<html{_attrs(filename=f'{name}_html', display_name=title)}/>\n".encode("utf-8")
+    yield f"html/{name}_html.html", (unit.get("content") or "").encode("utf-8")
+
+    if video_url:
+        if "youtube.com/embed/" in video_url:
+            youtube_id = video_url.split("youtube.com/embed/", 1)[1].split("?", 1)[0]
+            video = f"<video{_attrs(display_name=f'{title} - Video', youtube_id_1_0=youtube_id)}/>\n"
+        else:
+            video = (
+                f"<video{_attrs(display_name=f'{title} - Video', youtube_id_1_0='')}>"
+                f"<source{_attrs(src=video_url)}/></video>\n"
+            )
+        yield f"video/{name}_video.xml", video.encode("utf-8")
+
+
+def iter_olx_files(course_structure: Dict, org: str = OLX_ORG) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yield ``(path, content)`` for every file of the OLX course, parents first
+
+    Only one node's files are held at a time; the assessment problems,
+    a small part of any course, are compiled up front in one batch.
+    Section assessments become a graded sequential at the end of their
+    chapter; course-level assessments go into a final chapter.
+    """
+    org, number, run = course_run_keys(course_structure, org)
+    sections = course_structure.get("sections", [])
+    problems = compile_assessments(course_structure.get("assessments", []))
+    assessments_by_section: Dict[Optional[str], List[Dict]] = {}
+    for assessment in course_structure.get("assessments", []):
+        assessments_by_section.setdefault(assessment.get("section_id"), []).append(assessment)
+    final_assessments = assessments_by_section.pop(None, [])
+
+    chapters = [("chapter", url_name(section.get("id"))) for section in sections]
+    if final_assessments:
+        chapters.append(("chapter", final_chapter_name(course_structure)))
+
+    yield "course.xml", f"<course{_attrs(url_name=run, org=org, course=number)}/>\n".encode("utf-8")
+    yield f"course/{run}.xml", _container("course", course_structure.get("title", ""), chapters)
+
+    for section in sections:
+        section_assessments = assessments_by_section.get(section.get("id"), [])
+        sequentials = [("sequential", url_name(subsection.get("id"))) for subsection in section.get("subsections", [])]
+        sequentials += [("sequential", url_name(assessment.get("id"))) for assessment in section_assessments]
+        yield f"chapter/{url_name(section.get('id'))}.xml", _container("chapter", section.get("title", ""), sequentials)
+
+        for subsection in section.get("subsections", []):
+            units = subsection.get("units", [])
+            yield (
+                f"sequential/{url_name(subsection.get('id'))}.xml",
+                _container("sequential", subsection.get("title", ""), [("vertical", url_name(unit.get("id"))) for unit in units])
+            )
+            for unit in units:
+                yield from _unit_files(unit)
+
+        for assessment in section_assessments:
+            yield from _assessment_files(assessment, problems[assessment.get("id")])
+
+    if final_assessments:
+        yield (
+            f"chapter/{final_chapter_name(course_structure)}.xml",
+            _container("chapter", "Final Assessment", [("sequential", url_name(assessment.get("id"))) for assessment in final_assessments])
+        )
+        for assessment in final_assessments:
+            yield from _assessment_files(assessment, problems[assessment.get("id")])
+
+
+def _add_file(tar: tarfile.TarFile, path: str, data: bytes, mtime: float):
+    info = tarfile.TarInfo(f"{OLX_ROOT}/{path}")
+    info.size = len(data)
+    info.mtime = mtime
+    info.mode = 0o644
+    tar.addfile(info, io.BytesIO(data))
+
+
+def write_olx(course_structure: Dict, fileobj, org: str = OLX_ORG) -> int:
+    """Write the course as a ``.tar.gz`` to a binary file object; returns the number of files"""
+    mtime = time.time()
+    count = 0
+    with tarfile.open(fileobj=fileobj, mode="w|gz") as tar:
+        for path, data in iter_olx_files(course_structure, org):
+            _add_file(tar, path, data, mtime)
+            count += 1
+    return count
+
+
+class _ChunkWriter:
+    """File object that collects what ``tarfile`` writes until it is drained"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_olx(course_structure: Dict, org: str = OLX_ORG) -> Iterator[bytes]:
+    """Yield the ``.tar.gz`` of the course in chunks, e.g. for a ``StreamingHttpResponse``"""
+    writer = _ChunkWriter()
+    mtime = time.time()
+    with tarfile.open(fileobj=writer, mode="w|gz") as tar:
+        for path, data in iter_olx_files(course_structure, org):
+            _add_file(tar, path, data, mtime)
+            chunk = writer.drain()
+            if chunk:
+                yield chunk
+    chunk = writer.drain()
+    if chunk:
+        yield chunk
+
+
+def olx_filename(course_structure: Dict, org: str = OLX_ORG) -> str:
+    _, number, run = course_run_keys(course_structure, org)
+    return f"{number}_{run}.tar.gz"
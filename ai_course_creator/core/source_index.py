@@ -0,0 +1,138 @@
+"""
+Local BM25 retrieval index over uploaded source material
+
+The extracted text is split into overlapping chunks and indexed as a sparse
+term-frequency matrix, so prompts can carry only the passages relevant to a
+course or unit title instead of a fixed-length prefix of the document.
+"""
+import logging
+import re
+from typing import List, Optional
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+CHUNK_CHARS = 1200
+CHUNK_OVERLAP = 200
+STRUCTURE_DIGEST_CHARS = 8000
+UNIT_REFERENCE_CHUNKS = 3
+
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset("""
+a about above after again against all also an and any are as at be because been before being below between both
+but by can could did do does doing down during each few for from further had has have having he her here hers him
+his how i if in into is it its itself just me more most my no nor not now of off on once only or other our ours out
+over own same she should so some such than that the their theirs them then there these they this those through to
+too under until up very was we were what when where which while who whom why will with you your yours
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [token for token in _TOKEN_RE.findall(text.lower()) if len(token) > 1 and token not in _STOPWORDS]
+
+
+def split_chunks(text: str, chunk_chars: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP) -> List[str]:
+    """Split text into ~``chunk_chars`` pieces, preferring paragraph then sentence breaks"""
+    text = text.strip()
+    chunks = []
+    start = 0
+    while start < len(text):
+        end = min(start + chunk_chars, len(text))
+        if end < len(text):
+            window = text[start:end]
+            cut = max(window.rfind("\n\n"), window.rfind(". "))
+            if cut > chunk_chars // 2:
+                end = start + cut + 1
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append(chunk)
+        if end >= len(text):
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+class SourceIndex:
+    """BM25 index over the chunks of one document"""
+
+    def __init__(self, text: str, chunk_chars: int = CHUNK_CHARS, overlap: int = CHUNK_OVERLAP):
+        self.chunks = split_chunks(text, chunk_chars, overlap)
+        self.vocabulary = {}
+
+        rows, cols = [], []
+        for row, chunk in enumerate(self.chunks):
+            for token in tokenize(chunk):
+                rows.append(row)
+                cols.append(self.vocabulary.setdefault(token, len(self.vocabulary)))
+
+        shape = (len(self.chunks), max(1, len(self.vocabulary)))
+        # Duplicate (row, col) pairs are summed into term frequencies
+        self.term_frequencies = sparse.csc_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=shape
+        )
+        self.term_frequencies.sum_duplicates()
+
+        self.chunk_lengths = np.asarray(self.term_frequencies.sum(axis=1)).ravel()
+        average_length = self.chunk_lengths.mean() if len(self.chunks) else 1.0
+        self.length_norm = BM25_K1 * (1 - BM25_B + BM25_B * self.chunk_lengths / max(average_length, 1.0))
+
+        document_frequencies = np.diff(self.term_frequencies.indptr)
+        self.idf = np.log1p((len(self.chunks) - document_frequencies + 0.5) / (document_frequencies + 0.5))
+
+        logger.info(f"Indexed source material: {len(self.chunks)} chunks, {len(self.vocabulary)} terms")
+
+    def __len__(self) -> int:
+        return len(self.chunks)
+
+    def scores(self, query: str) -> np.ndarray:
+        """BM25 score of every chunk for ``query``"""
+        scores = np.zeros(len(self.chunks), dtype=np.float64)
+        for term_id in {self.vocabulary[token] for token in tokenize(query) if token in self.vocabulary}:
+            column = self.term_frequencies.getcol(term_id)
+            rows = column.indices
+            tf = column.data
+            scores[rows] += self.idf[term_id] * tf * (BM25_K1 + 1) / (tf + self.length_norm[rows])
+        return scores
+
+    def top_chunk_ids(self, query: str, k: int) -> List[int]:
+        scores = self.scores(query)
+        ranked = np.argsort(-scores, kind="stable")[:k]
+        return [int(i) for i in ranked if scores[i] > 0]
+
+    def search(self, query: str, k: int = UNIT_REFERENCE_CHUNKS) -> List[str]:
+        """Top-``k`` chunks for ``query``, best first"""
+        return [self.chunks[i] for i in self.top_chunk_ids(query, k)]
+
+    def digest(self, query: str, max_chars: int = STRUCTURE_DIGEST_CHARS) -> str:
+        """
+        Compact excerpt of the document for ``query`` within ``max_chars``
+
+        Takes the opening chunk (usually the introduction or contents), then
+        the best-matching chunks, then fills any remaining budget in reading
+        order. Selected chunks are returned in document order.
+        """
+        if not self.chunks:
+            return ""
+
+        candidates = [0] + self.top_chunk_ids(query, len(self.chunks)) + list(range(len(self.chunks)))
+        selected = []
+        used = 0
+        for chunk_id in dict.fromkeys(candidates):
+            size = len(self.chunks[chunk_id]) + 5
+            if used + size > max_chars:
+                continue
+            selected.append(chunk_id)
+            used += size
+
+        return "\n[...]\n".join(self.chunks[i] for i in sorted(selected))
+
+
+def build_source_index(source_material: Optional[str]) -> Optional[SourceIndex]:
+    if not source_material or not source_material.strip():
+        return None
+    return SourceIndex(source_material)
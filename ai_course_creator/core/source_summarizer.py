@@ -0,0 +1,141 @@
+"""
+Map-reduce summarisation of large uploaded documents
+
+The document is cut into chunks at content-defined line boundaries, so an
+edit only changes the chunks around it. Chunks are summarised concurrently
+(map), and the summaries are merged level by level (reduce) until the
+outline fits a fixed character budget. Every call goes through the LLM
+response cache, so unchanged chunks are never summarised twice.
+"""
+import hashlib
+import logging
+from typing import List
+
+import google.generativeai as genai
+
+from ..utils.concurrency import DEFAULT_MAX_CONCURRENCY, run_bounded
+from .gemini_client import get_model
+from .llm_cache import generate_text
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_CHUNK_MIN_CHARS = 6000
+SUMMARY_CHUNK_MAX_CHARS = 16000
+SUMMARY_BOUNDARY_MODULUS = 8  # ~1 in 8 lines may end a chunk once it is past the minimum size
+MAP_SUMMARY_CHARS = 1200
+OUTLINE_CHARS = 6000
+MAX_REDUCE_LEVELS = 4
+
+
+def split_summary_chunks(text: str, min_chars: int = SUMMARY_CHUNK_MIN_CHARS, max_chars: int = SUMMARY_CHUNK_MAX_CHARS) -> List[str]:
+    """
+    Split text into chunks whose boundaries depend only on nearby content
+
+    A chunk ends after a line whose hash hits the boundary modulus once the
+    chunk is at least ``min_chars`` long, or unconditionally at ``max_chars``.
+    """
+    chunks = []
+    current = []
+    size = 0
+
+    for line in text.splitlines():
+        current.append(line)
+        size += len(line) + 1
+        line_hash = int.from_bytes(hashlib.md5(line.strip().encode("utf-8")).digest()[:4], "big")
+        if size >= max_chars or (size >= min_chars and line_hash % SUMMARY_BOUNDARY_MODULUS == 0):
+            chunks.append("\n".join(current).strip())
+            current = []
+            size = 0
+
+    if current:
+        chunks.append("\n".join(current).strip())
+    return [chunk for chunk in chunks if chunk]
+
+
+class SourceSummarizer:
+    def __init__(self, max_concurrency: int = DEFAULT_MAX_CONCURRENCY, outline_chars: int = OUTLINE_CHARS):
+        self.max_concurrency = max(1, max_concurrency)
+        self.outline_chars = outline_chars
+
+    @property
+    def model(self) -> genai.GenerativeModel:
+        return get_model()
+
+    def summarize(self, text: str, title: str = "") -> str:
+        """Return an outline of ``text`` no longer than ``outline_chars``"""
+        if len(text) <= self.outline_chars:
+            return text
+
+        chunks = split_summary_chunks(text)
+        logger.info(f"Summarising source material: {len(text)} characters in {len(chunks)} chunks")
+
+        # Map: the prompt depends only on the chunk itself, so cached summaries
+        # of unchanged chunks are reused when a document is edited
+        summaries = self._summarize_all(chunks, "", MAP_SUMMARY_CHARS, final=False)
+
+        # Reduce: merge neighbouring summaries until the outline fits
+        level = 0
+        while sum(len(summary) for summary in summaries) > self.outline_chars and level < MAX_REDUCE_LEVELS:
+            level += 1
+            groups = self._group(summaries, SUMMARY_CHUNK_MAX_CHARS)
+            is_final = len(groups) == 1
+            target = self.outline_chars if is_final else max(600, self.outline_chars // len(groups))
+            summaries = self._summarize_all(["\n\n".join(group) for group in groups], title if is_final else "", target, final=is_final)
+            logger.info(f"Reduce level {level}: {len(summaries)} summaries")
+
+        return "\n\n".join(summaries)[:self.outline_chars]
+
+    def _summarize_all(self, texts: List[str], title: str, target_chars: int, final: bool) -> List[str]:
+        return run_bounded(
+            self._summarize_chunk,
+            [(text, title, target_chars, final) for text in texts],
+            max_workers=self.max_concurrency,
+            thread_name_prefix="ai-course-summary"
+        )
+
+    def _group(self, summaries: List[str], max_chars: int) -> List[List[str]]:
+        groups = [[]]
+        size = 0
+        for summary in summaries:
+            if groups[-1] and size + len(summary) > max_chars:
+                groups.append([])
+                size = 0
+            groups[-1].append(summary)
+            size += len(summary)
+        return groups
+
+    def _summarize_chunk(self, text: str, title: str, target_chars: int, final: bool) -> str:
+        task = (
+            "Merge these partial summaries into one hierarchical outline of the whole document"
+            if final else
+            "Summarise this part of a larger document as a compact hierarchical outline"
+        )
+        prompt = f"""
+{task}{f' (course topic: "{title}")' if title else ''}.
+
+- Keep every distinct topic, definition, procedure and example name.
+- Preserve the original order of topics.
+- Use plain text with "-" bullets and indentation, no markdown headings.
+- Stay under {target_chars} characters.
+- Do NOT add anything that is not in the text.
+
+TEXT:
+{text}
+"""
+        full_prompt = "You are an expert at condensing textbooks into faithful study outlines.\n\n" + prompt
+
+        try:
+            summary = generate_text(
+                self.model,
+                full_prompt,
+                generation_config=genai.types.GenerationConfig(
+                    temperature=0.0,
+                    max_output_tokens=max(256, target_chars // 3)
+                )
+            ).strip()
+        except Exception as e:
+            logger.error(f"Error summarising source chunk: {str(e)}")
+            summary = ""
+
+        # Fall back to the raw text so a failed call never drops a section of the document
+        return summary or text[:target_chars]
@@ -0,0 +1,105 @@
+"""
+Incremental course generation events
+
+Runs the generation pipeline on a background thread and yields its progress
+events as they happen, so views can stream them as Server-Sent Events.
+"""
+import json
+import logging
+import queue
+import threading
+import uuid
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from django.db import connections
+
+from ..models.course import Unit
+from .content_generator import ContentGenerator
+from .course_generator import CourseGenerator
+from .jobs import save_draft
+
+logger = logging.getLogger(__name__)
+
+KEEPALIVE_INTERVAL = 15  # seconds between SSE comments while a stage is busy
+
+_DONE = object()
+
+
+def iter_course_events(params: Dict[str, Any], include_content: bool = True, owner_id: Optional[int] = None) -> Iterator[Tuple[str, Dict[str, Any]]]:
+    """
+    Generate a course and yield ``(event, data)`` pairs as each stage completes
+
+    Events: ``stage``, ``structure``, ``section``, then ``videos``,
+    ``assessment`` and ``unit`` interleaved as the concurrent stages finish,
+    then ``complete`` with the full course or ``error``. ``None`` is yielded
+    when no event arrived for ``KEEPALIVE_INTERVAL`` seconds. The finished
+    course is saved as a draft owned by ``owner_id``.
+    """
+    events = queue.Queue()
+
+    def emit(event: str, data: Dict[str, Any]):
+        events.put((event, data))
+
+    def run():
+        try:
+            course = CourseGenerator().generate_course_structure(
+                progress_callback=emit,
+                content_generator=ContentGenerator() if include_content else None,
+                **params
+            )
+
+            save_draft(course, owner_id=owner_id)
+            emit("complete", {"course": course.to_dict()})
+
+        except Exception as e:
+            logger.error(f"Streaming course generation failed: {str(e)}")
+            emit("error", {"message": str(e)})
+
+        finally:
+            connections.close_all()
+            events.put(_DONE)
+
+    threading.Thread(target=run, name="ai-course-stream", daemon=True).start()
+
+    while True:
+        try:
+            item = events.get(timeout=KEEPALIVE_INTERVAL)
+        except queue.Empty:
+            yield None
+            continue
+
+        if item is _DONE:
+            return
+        yield item
+
+
+def format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def iter_sse(params: Dict[str, Any], include_content: bool = True, owner_id: Optional[int] = None) -> Iterator[str]:
+    """Serialise ``iter_course_events`` as SSE frames with keep-alive comments"""
+    for item in iter_course_events(params, include_content=include_content, owner_id=owner_id):
+        if item is None:
+            yield ": keep-alive\n\n"
+        else:
+            yield format_sse(*item)
+
+
+def iter_unit_sse(course_title: str, section_title: str, subsection_title: str, unit_title: str,
+                  unit_id: str = None, components: List[str] = None) -> Iterator[str]:
+    """
+    Stream one unit's HTML as ``chunk`` events followed by a ``unit`` event
+
+    The final ``unit`` event carries the same ``Unit.to_dict()`` the
+    non-streamed path produces, so clients should replace the accumulated
+    chunks with its ``content``.
+    """
+    unit = Unit(id=unit_id or str(uuid.uuid4()), title=unit_title)
+
+    for html in ContentGenerator().stream_unit_content(
+        unit, course_title, section_title, subsection_title, components or ["text"]
+    ):
+        yield format_sse("chunk", {"html": html})
+
+    yield format_sse("unit", {"unit": unit.to_dict()})
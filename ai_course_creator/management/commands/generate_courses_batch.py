@@ -0,0 +1,59 @@
+"""
+Generate a catalog of courses from a CSV or JSONL spec file
+
+    ./manage.py generate_courses_batch specs.csv results.jsonl --concurrency 8 --courses-per-minute 20
+
+Re-running with the same results file resumes where the last run stopped.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from ai_course_creator.core.batch import DEFAULT_BATCH_CONCURRENCY, load_batch_specs, run_batch
+
+
+class Command(BaseCommand):
+    help = "Generate courses in bulk from a CSV/JSONL spec file, appending results to a JSONL file"
+
+    def add_arguments(self, parser):
+        parser.add_argument("input", help="CSV or JSONL file with topic, level, duration[, assessment_types, id]")
+        parser.add_argument("output", help="JSONL results file (also used to resume an interrupted run)")
+        parser.add_argument("--concurrency", type=int, default=DEFAULT_BATCH_CONCURRENCY,
+                            help="Courses generated at the same time")
+        parser.add_argument("--courses-per-minute", type=float, default=None,
+                            help="Maximum number of courses started per minute")
+        parser.add_argument("--unit-concurrency", type=int, default=None,
+                            help="Concurrent unit generations within each course")
+        parser.add_argument("--unit-batch-size", type=int, default=None,
+                            help="Units of a subsection generated per Gemini call")
+        parser.add_argument("--no-content", action="store_true", help="Generate structure and assessments only")
+        parser.add_argument("--no-videos", action="store_true", help="Skip YouTube video search")
+
+    def handle(self, *args, **options):
+        try:
+            specs = load_batch_specs(options["input"])
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+
+        def on_result(record):
+            if record["status"] == "ok":
+                self.stdout.write(self.style.SUCCESS(f"{record['id']}: {record['spec']['topic']} ({record['elapsed']}s)"))
+            else:
+                self.stderr.write(f"{record['id']}: {record['spec']['topic']} failed: {record['error']}")
+
+        summary = run_batch(
+            specs,
+            options["output"],
+            concurrency=options["concurrency"],
+            courses_per_minute=options["courses_per_minute"],
+            include_videos=not options["no_videos"],
+            include_content=not options["no_content"],
+            unit_concurrency=options["unit_concurrency"],
+            unit_batch_size=options["unit_batch_size"],
+            on_result=on_result,
+        )
+
+        self.stdout.write(
+            f"Generated {summary['generated']}, failed {summary['failed']}, "
+            f"skipped {summary['skipped']} already completed"
+        )
+        if summary["failed"]:
+            raise CommandError(f"{summary['failed']} course(s) failed; re-run to retry them")
@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CourseDraft',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('course_id', models.CharField(max_length=64, unique=True)),
+                ('job_id', models.CharField(blank=True, db_index=True, max_length=64)),
+                ('title', models.CharField(max_length=255)),
+                ('audience', models.CharField(blank=True, max_length=64)),
+                ('duration', models.CharField(blank=True, max_length=16)),
+                ('section_count', models.PositiveIntegerField(default=0)),
+                ('unit_count', models.PositiveIntegerField(default=0)),
+                ('data', models.BinaryField()),
+                ('created', models.DateTimeField(auto_now_add=True)),
+                ('modified', models.DateTimeField(auto_now=True)),
+                ('owner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='ai_course_drafts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-modified'],
+                'indexes': [models.Index(fields=['owner', '-modified'], name='ai_course_draft_owner_idx')],
+            },
+        ),
+    ]
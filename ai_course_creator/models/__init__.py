@@ -0,0 +1 @@
+from .drafts import CourseDraft
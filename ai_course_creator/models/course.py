@@ -1,8 +1,24 @@
-from dataclasses import dataclass, field
-from typing import List, Dict, Optional, Any
+from dataclasses import dataclass, field, fields
+from typing import List, Dict, Optional, Any, Tuple
 from datetime import datetime
 import uuid
 
+
+def _slotted(cls):
+    """Rebuild a dataclass with ``__slots__`` (``dataclass(slots=True)`` needs Python 3.10)"""
+    names = tuple(f.name for f in fields(cls))
+    namespace = {key: value for key, value in cls.__dict__.items() if key not in names + ('__dict__', '__weakref__')}
+    namespace['__slots__'] = names
+    slotted = type(cls)(cls.__name__, cls.__bases__, namespace)
+    slotted.__qualname__ = cls.__qualname__
+    return slotted
+
+
+def _id(data: Dict[str, Any]) -> str:
+    return data['id'] if 'id' in data else str(uuid.uuid4())
+
+
+@_slotted
 @dataclass
 class Unit:
     """Individual learning unit within a subsection"""
@@ -18,6 +34,10 @@ class Unit:
     resources: List[Dict] = field(default_factory=list)
     
     def to_dict(self) -> Dict[str, Any]:
+        return self.shallow_dict()
+    
+    def shallow_dict(self) -> Dict[str, Any]:
+        """``to_dict`` fields without converting child nodes (used by the serializer)"""
         return {
             'id': self.id,
             'title': self.title,
@@ -31,7 +51,24 @@ class Unit:
             'exercises': self.exercises,
             'resources': self.resources
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Unit':
+        get = data.get
+        return cls(
+            id=_id(data),
+            title=get('title', ''),
+            content=get('content', ''),
+            content_type=get('content_type', 'text_video'),
+            video_url=get('video_url'),
+            video_duration=get('video_duration', 0),
+            image_urls=get('image_urls', []),
+            reading_time=get('reading_time', 5),
+            exercises=get('exercises', []),
+            resources=get('resources', [])
+        )
 
+@_slotted
 @dataclass
 class SubSection:
     """Subsection containing multiple units"""
@@ -43,11 +80,16 @@ class SubSection:
     learning_objectives: List[str] = field(default_factory=list)
     
     def to_dict(self) -> Dict[str, Any]:
+        data = self.shallow_dict()
+        data['units'] = [unit.to_dict() for unit in self.units]
+        return data
+    
+    def shallow_dict(self) -> Dict[str, Any]:
         return {
             'id': self.id,
             'title': self.title,
             'description': self.description,
-            'units': [unit.to_dict() for unit in self.units],
+            'units': self.units,
             'estimated_time': self.estimated_time,
             'learning_objectives': self.learning_objectives
         }
@@ -55,7 +97,22 @@ class SubSection:
     def add_unit(self, unit: Unit):
         self.units.append(unit)
         self.estimated_time = sum(unit.reading_time + unit.video_duration for unit in self.units)
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'SubSection':
+        get = data.get
+        units = [Unit.from_dict(unit_data) for unit_data in get('units', [])]
+        return cls(
+            id=_id(data),
+            title=get('title', ''),
+            description=get('description', ''),
+            units=units,
+            # Same result as adding the units one by one with add_unit
+            estimated_time=sum(unit.reading_time + unit.video_duration for unit in units) if units else get('estimated_time', 30),
+            learning_objectives=get('learning_objectives', [])
+        )
 
+@_slotted
 @dataclass
 class Section:
     """Main section containing subsections"""
@@ -67,11 +124,16 @@ class Section:
     prerequisites: List[str] = field(default_factory=list)
     
     def to_dict(self) -> Dict[str, Any]:
+        data = self.shallow_dict()
+        data['subsections'] = [subsection.to_dict() for subsection in self.subsections]
+        return data
+    
+    def shallow_dict(self) -> Dict[str, Any]:
         return {
             'id': self.id,
             'title': self.title,
             'description': self.description,
-            'subsections': [subsection.to_dict() for subsection in self.subsections],
+            'subsections': self.subsections,
             'estimated_time': self.estimated_time,
             'prerequisites': self.prerequisites
         }
@@ -79,7 +141,22 @@ class Section:
     def add_subsection(self, subsection: SubSection):
         self.subsections.append(subsection)
         self.estimated_time = sum(subsection.estimated_time for subsection in self.subsections)
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Section':
+        get = data.get
+        subsections = [SubSection.from_dict(subsection_data) for subsection_data in get('subsections', [])]
+        return cls(
+            id=_id(data),
+            title=get('title', ''),
+            description=get('description', ''),
+            subsections=subsections,
+            # Same result as adding the subsections one by one with add_subsection
+            estimated_time=sum(subsection.estimated_time for subsection in subsections) if subsections else get('estimated_time', 120),
+            prerequisites=get('prerequisites', [])
+        )
 
+@_slotted
 @dataclass
 class Assessment:
     """Assessment/quiz for the course"""
@@ -93,6 +170,9 @@ class Assessment:
     passing_score: int = 70  # percentage
     
     def to_dict(self) -> Dict[str, Any]:
+        return self.shallow_dict()
+    
+    def shallow_dict(self) -> Dict[str, Any]:
         return {
             'id': self.id,
             'title': self.title,
@@ -103,7 +183,22 @@ class Assessment:
             'time_limit': self.time_limit,
             'passing_score': self.passing_score
         }
+    
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'Assessment':
+        get = data.get
+        return cls(
+            id=_id(data),
+            title=get('title', ''),
+            assessment_type=get('assessment_type', 'mixed'),
+            questions=get('questions', []),
+            section_id=get('section_id'),
+            subsection_id=get('subsection_id'),
+            time_limit=get('time_limit', 30),
+            passing_score=get('passing_score', 70)
+        )
 
+@_slotted
 @dataclass
 class Course:
     """Complete course structure"""
@@ -118,14 +213,20 @@ class Course:
     created_at: datetime = field(default_factory=datetime.now)
     
     def to_dict(self) -> Dict[str, Any]:
+        data = self.shallow_dict()
+        data['sections'] = [section.to_dict() for section in self.sections]
+        data['assessments'] = [assessment.to_dict() for assessment in self.assessments]
+        return data
+    
+    def shallow_dict(self) -> Dict[str, Any]:
         return {
             'id': self.id,
             'title': self.title,
             'description': self.description,
             'audience': self.audience,
             'duration': self.duration,
-            'sections': [section.to_dict() for section in self.sections],
-            'assessments': [assessment.to_dict() for assessment in self.assessments],
+            'sections': self.sections,
+            'assessments': self.assessments,
             'metadata': self.metadata,
             'created_at': self.created_at.isoformat(),
             'total_sections': len(self.sections),
@@ -153,72 +254,38 @@ class Course:
                     return subsection
         return None
     
+    def find_unit(self, unit_id: str) -> Optional[Tuple[Section, SubSection, Unit]]:
+        """Return ``(section, subsection, unit)`` for a unit id"""
+        for section in self.sections:
+            for subsection in section.subsections:
+                for unit in subsection.units:
+                    if unit.id == unit_id:
+                        return section, subsection, unit
+        return None
+    
+    def get_unit_by_id(self, unit_id: str) -> Optional[Unit]:
+        found = self.find_unit(unit_id)
+        return found[2] if found else None
+    
+    def get_assessment_by_id(self, assessment_id: str) -> Optional[Assessment]:
+        for assessment in self.assessments:
+            if assessment.id == assessment_id:
+                return assessment
+        return None
+    
     @classmethod
     def from_dict(cls, data: Dict[str, Any]) -> 'Course':
         """Create Course object from dictionary data"""
         
-        course = cls(
-            id=data.get('id', str(uuid.uuid4())),
-            title=data.get('title', ''),
-            description=data.get('description', ''),
-            audience=data.get('audience', 'beginner'),
-            duration=data.get('duration', 'medium'),
-            metadata=data.get('metadata', {}),
-            created_at=datetime.fromisoformat(data['created_at']) if data.get('created_at') else datetime.now()
+        get = data.get
+        return cls(
+            id=_id(data),
+            title=get('title', ''),
+            description=get('description', ''),
+            audience=get('audience', 'beginner'),
+            duration=get('duration', 'medium'),
+            sections=[Section.from_dict(section_data) for section_data in get('sections', [])],
+            assessments=[Assessment.from_dict(assessment_data) for assessment_data in get('assessments', [])],
+            metadata=get('metadata', {}),
+            created_at=datetime.fromisoformat(data['created_at']) if get('created_at') else datetime.now()
         )
-        
-        # Add sections
-        for section_data in data.get('sections', []):
-            section = Section(
-                id=section_data.get('id', str(uuid.uuid4())),
-                title=section_data.get('title', ''),
-                description=section_data.get('description', ''),
-                estimated_time=section_data.get('estimated_time', 120),
-                prerequisites=section_data.get('prerequisites', [])
-            )
-            
-            # Add subsections
-            for subsection_data in section_data.get('subsections', []):
-                subsection = SubSection(
-                    id=subsection_data.get('id', str(uuid.uuid4())),
-                    title=subsection_data.get('title', ''),
-                    description=subsection_data.get('description', ''),
-                    estimated_time=subsection_data.get('estimated_time', 30),
-                    learning_objectives=subsection_data.get('learning_objectives', [])
-                )
-                
-                # Add units
-                for unit_data in subsection_data.get('units', []):
-                    unit = Unit(
-                        id=unit_data.get('id', str(uuid.uuid4())),
-                        title=unit_data.get('title', ''),
-                        content=unit_data.get('content', ''),
-                        content_type=unit_data.get('content_type', 'text_video'),
-                        video_url=unit_data.get('video_url'),
-                        video_duration=unit_data.get('video_duration', 0),
-                        image_urls=unit_data.get('image_urls', []),
-                        reading_time=unit_data.get('reading_time', 5),
-                        exercises=unit_data.get('exercises', []),
-                        resources=unit_data.get('resources', [])
-                    )
-                    subsection.add_unit(unit)
-                
-                section.add_subsection(subsection)
-            
-            course.add_section(section)
-        
-        # Add assessments
-        for assessment_data in data.get('assessments', []):
-            assessment = Assessment(
-                id=assessment_data.get('id', str(uuid.uuid4())),
-                title=assessment_data.get('title', ''),
-                assessment_type=assessment_data.get('assessment_type', 'mixed'),
-                questions=assessment_data.get('questions', []),
-                section_id=assessment_data.get('section_id'),
-                subsection_id=assessment_data.get('subsection_id'),
-                time_limit=assessment_data.get('time_limit', 30),
-                passing_score=assessment_data.get('passing_score', 70)
-            )
-            course.add_assessment(assessment)
-        
-        return course
\ No newline at end of file
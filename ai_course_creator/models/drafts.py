@@ -0,0 +1,95 @@
+"""
+Persistent storage for generated courses
+
+Each draft keeps the whole course as zlib-compressed JSON. The fields used
+for lookups and listings (course id, owner, job id, title, counts) are
+extracted into indexed columns, so listing drafts never reads the blobs.
+"""
+import zlib
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.db import models
+
+from .course import Course
+from .serialization import dumps, loads, loads_course
+
+
+class CourseDraftQuerySet(models.QuerySet):
+    def for_owner(self, owner_id: Optional[int]) -> "CourseDraftQuerySet":
+        return self.filter(owner_id=owner_id)
+
+    def summaries(self) -> "CourseDraftQuerySet":
+        """Skip loading the course blob"""
+        return self.defer("data")
+
+
+class CourseDraftManager(models.Manager.from_queryset(CourseDraftQuerySet)):
+    def save_course(self, course: Course, owner_id: Optional[int] = None, job_id: str = "") -> "CourseDraft":
+        """Insert or update the draft for ``course.id``; the owner is only set when the draft is created"""
+        draft = self.filter(course_id=course.id).first()
+        if draft is None:
+            draft = self.model(course_id=course.id, owner_id=owner_id)
+        if job_id:
+            draft.job_id = job_id
+        draft.set_course(course)
+        draft.save()
+        return draft
+
+
+class CourseDraft(models.Model):
+    course_id = models.CharField(max_length=64, unique=True)
+    owner = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        null=True,
+        blank=True,
+        on_delete=models.SET_NULL,
+        related_name="ai_course_drafts",
+    )
+    job_id = models.CharField(max_length=64, blank=True, db_index=True)
+    title = models.CharField(max_length=255)
+    audience = models.CharField(max_length=64, blank=True)
+    duration = models.CharField(max_length=16, blank=True)
+    section_count = models.PositiveIntegerField(default=0)
+    unit_count = models.PositiveIntegerField(default=0)
+    data = models.BinaryField()
+    created = models.DateTimeField(auto_now_add=True)
+    modified = models.DateTimeField(auto_now=True)
+
+    objects = CourseDraftManager()
+
+    class Meta:
+        ordering = ["-modified"]
+        indexes = [
+            models.Index(fields=["owner", "-modified"], name="ai_course_draft_owner_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.course_id})"
+
+    def set_course(self, course: Course):
+        self.title = course.title[:255]
+        self.audience = course.audience[:64]
+        self.duration = course.duration[:16]
+        self.section_count = len(course.sections)
+        self.unit_count = sum(len(subsection.units) for section in course.sections for subsection in section.subsections)
+        self.data = zlib.compress(dumps(course))
+
+    def get_course_data(self) -> Dict[str, Any]:
+        return loads(zlib.decompress(bytes(self.data)))
+
+    def get_course(self) -> Course:
+        return loads_course(zlib.decompress(bytes(self.data)))
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "course_id": self.course_id,
+            "job_id": self.job_id,
+            "title": self.title,
+            "audience": self.audience,
+            "duration": self.duration,
+            "section_count": self.section_count,
+            "unit_count": self.unit_count,
+            "created": self.created.isoformat(),
+            "modified": self.modified.isoformat(),
+        }
@@ -0,0 +1,45 @@
+"""
+JSON encoding of the course model tree
+
+``dumps`` writes a course (or any JSON structure holding model objects)
+straight to UTF-8 bytes. Model objects are encoded through their
+``shallow_dict`` as the encoder reaches them, so the nested ``to_dict``
+copy of the whole tree is never built. The output matches
+``json.dumps(course.to_dict())`` key for key. orjson is used when it is
+installed (``pip install tutor-openedx-ai-course-creator[speedups]``),
+the standard library otherwise.
+"""
+import json
+from typing import Any, Dict
+
+from .course import Assessment, Course, Section, SubSection, Unit
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+_MODEL_TYPES = (Course, Section, SubSection, Unit, Assessment)
+
+
+def _shallow(obj: Any) -> Dict[str, Any]:
+    if isinstance(obj, _MODEL_TYPES):
+        return obj.shallow_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """Encode ``obj`` as compact UTF-8 JSON"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_shallow, option=orjson.OPT_PASSTHROUGH_DATACLASS | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=_shallow, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def loads_course(data: bytes) -> Course:
+    return Course.from_dict(loads(data))
@@ -183,83 +183,283 @@
     statusContainer.innerHTML = html;
   }
 
-  function renderLoading(progress) {
+  function escapeHtml(value) {
+    return String(value ?? "").replace(/[&<>"']/g, c => ({
+      "&": "&amp;", "<": "&lt;", ">": "&gt;", '"': "&quot;", "'": "&#39;"
+    })[c]);
+  }
+
+  const STAGE_LABELS = {
+    summarizing: "📄 Reading your document…",
+    structure: "🧠 Designing course structure…",
+    generating: "⚙️ Finding videos, writing units and assessments…"
+  };
+
+  const STAGE_PROGRESS = {
+    summarizing: 5,
+    structure: 10,
+    generating: 30
+  };
+
+  function renderLoading(progress, label) {
     renderStatus(`
       <div class="bg-white rounded-2xl p-6 border shadow">
         <div class="flex items-center gap-4 mb-4">
           <div class="animate-spin w-8 h-8 rounded-full border-4 border-blue-500 border-t-transparent"></div>
           <div class="flex-1">
             <div class="flex justify-between text-sm font-semibold">
-              <span>🚀 Generating your course…</span>
-              <span>${progress}%</span>
+              <span id="gen-stage-label">${label || "🚀 Generating your course…"}</span>
+              <span id="gen-progress-label">${progress}%</span>
             </div>
             <div class="mt-2 h-3 bg-gray-200 rounded-full overflow-hidden">
-              <div class="h-3 bg-gradient-to-r from-blue-500 via-purple-500 to-indigo-500 transition-all"
+              <div id="gen-progress-bar" class="h-3 bg-gradient-to-r from-blue-500 via-purple-500 to-indigo-500 transition-all"
                    style="width:${progress}%"></div>
             </div>
           </div>
         </div>
         <p class="text-xs text-gray-500 text-center">
-          This usually takes 4–5 minutes. Please wait ✨
+          Sections, units and assessments appear below as soon as they are ready ✨
         </p>
       </div>
+      <div id="gen-live-outline" class="space-y-4"></div>
+      <div id="gen-live-assessments" class="space-y-2"></div>
     `);
   }
 
+  function setProgress(progress, label) {
+    const bar = document.getElementById("gen-progress-bar");
+    if (!bar) return;
+    bar.style.width = `${progress}%`;
+    document.getElementById("gen-progress-label").textContent = `${progress}%`;
+    if (label) document.getElementById("gen-stage-label").textContent = label;
+  }
+
   function renderError(message) {
     renderStatus(`
       <div class="bg-red-50 border border-red-200 rounded-2xl p-6">
         <h4 class="font-semibold text-red-800 mb-2">❌ Generation Failed</h4>
-        <p class="text-red-700 text-sm">${message}</p>
+        <p class="text-red-700 text-sm">${escapeHtml(message)}</p>
       </div>
     `);
   }
 
   function renderSuccess(course) {
-    renderStatus(`
-      <div class="bg-green-50 border border-green-200 rounded-2xl p-6">
-        <h4 class="font-semibold text-green-800 mb-2">🎉 Course Generated Successfully!</h4>
-        <p class="text-green-700 text-sm">Check console for full course JSON.</p>
+    const banner = document.createElement("div");
+    banner.className = "bg-green-50 border border-green-200 rounded-2xl p-6";
+    banner.innerHTML = `
+      <h4 class="font-semibold text-green-800 mb-2">🎉 Course Generated Successfully!</h4>
+      <p class="text-green-700 text-sm">
+        ${course.total_sections} sections and ${course.total_assessments} assessments are ready.
+        Check console for full course JSON.
+      </p>
+    `;
+    statusContainer.replaceChild(banner, statusContainer.firstElementChild);
+  }
+
+  /* ---------- INCREMENTAL RENDERING ---------- */
+  const live = { sectionIndex: 0, totalUnits: 0, doneUnits: 0, videos: {} };
+
+  function renderOutline(sections) {
+    live.sectionIndex = 0;
+    live.totalUnits = 0;
+    live.doneUnits = 0;
+    live.videos = {};
+
+    document.getElementById("gen-live-outline").innerHTML = sections.map((sec, i) => `
+      <div class="bg-white rounded-2xl p-5 border" id="gen-section-${i}">
+        <h4 class="font-semibold">${i + 1}. ${escapeHtml(sec.title)}</h4>
+        <div class="mt-2 space-y-2 text-sm text-gray-600">
+          ${(sec.subsections || []).map(sub => `
+            <div>
+              <strong>${escapeHtml(sub.title)}</strong>
+              <ul class="ml-4 list-disc">
+                ${(sub.units || []).map(unit => {
+                  live.totalUnits += 1;
+                  return `<li>${escapeHtml(unit.title)}</li>`;
+                }).join("")}
+              </ul>
+            </div>
+          `).join("")}
+        </div>
       </div>
-    `);
+    `).join("");
   }
 
-  /* ---------- GENERATE BUTTON HANDLER (ENHANCED ONLY) ---------- */
-  document.getElementById("gen-start").addEventListener("click", async () => {
-    let progress = 10;
-    renderLoading(progress);
+  function renderSection(sec) {
+    const el = document.getElementById(`gen-section-${live.sectionIndex}`);
+    live.sectionIndex += 1;
+    if (!el) return;
+
+    el.innerHTML = `
+      <h4 class="font-semibold">${live.sectionIndex}. ${escapeHtml(sec.title)}</h4>
+      <div class="mt-2 space-y-2 text-sm text-gray-600">
+        ${sec.subsections.map(sub => `
+          <div>
+            <strong>${escapeHtml(sub.title)}</strong>
+            <ul class="ml-4 space-y-1">
+              ${sub.units.map(unit => `
+                <li id="gen-unit-${unit.id}">
+                  ⏳ ${escapeHtml(unit.title)} <span class="gen-unit-video"></span>
+                </li>
+              `).join("")}
+            </ul>
+          </div>
+        `).join("")}
+      </div>
+    `;
+  }
+
+  function renderUnit(unit) {
+    live.doneUnits += 1;
+    if (live.totalUnits) {
+      setProgress(
+        Math.min(99, STAGE_PROGRESS.generating + Math.round((70 * live.doneUnits) / live.totalUnits)),
+        `✍️ Writing unit content… (${live.doneUnits}/${live.totalUnits})`
+      );
+    }
 
-    const progressTimer = setInterval(() => {
-      progress = Math.min(progress + 10, 90);
-      renderLoading(progress);
-    }, 500);
+    const el = document.getElementById(`gen-unit-${unit.id}`);
+    if (!el) return;
+    el.innerHTML = `
+      <details>
+        <summary class="cursor-pointer">✅ ${escapeHtml(unit.title)}
+          <span class="gen-unit-video">${unit.video_url || live.videos[unit.id] ? "🎬" : ""}</span>
+          <span class="text-xs text-gray-400">${unit.reading_time} min read</span>
+        </summary>
+        <div class="mt-2 p-3 bg-gray-50 rounded-lg">${unit.content}</div>
+      </details>
+    `;
+  }
 
-    try {
-      const res = await fetch("/ai-course-creator/api/generate/", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({
-          topic: AppState.topic,
-          audience: AppState.audience,
-          duration: AppState.duration,
-          components: AppState.components?.components || [],
-          assessments: AppState.assessments?.assessments || [],
-          notes: document.getElementById("gen-notes").value || ""
-        })
-      });
+  function renderVideos(videos) {
+    live.videos = videos;
+    Object.entries(videos).forEach(([unitId, url]) => {
+      const marker = document.querySelector(`#gen-unit-${unitId} .gen-unit-video`);
+      if (marker && url) marker.textContent = "🎬";
+    });
+  }
+
+  function renderAssessment(assessment) {
+    const el = document.createElement("div");
+    el.className = "bg-orange-50 rounded-xl px-4 py-3 border text-sm";
+    el.innerHTML = `📝 <strong>${escapeHtml(assessment.title)}</strong>
+      <span class="text-gray-500">(${assessment.questions.length} questions)</span>`;
+    document.getElementById("gen-live-assessments").appendChild(el);
+  }
+
+  function handleEvent(event, data) {
+    switch (event) {
+      case "stage":
+        setProgress(STAGE_PROGRESS[data.stage] || 5, STAGE_LABELS[data.stage]);
+        break;
+      case "structure":
+        renderOutline(data.sections || []);
+        break;
+      case "section":
+        renderSection(data.section);
+        break;
+      case "videos":
+        renderVideos(data.videos);
+        break;
+      case "unit":
+        renderUnit(data.unit);
+        break;
+      case "assessment":
+        renderAssessment(data.assessment);
+        break;
+      case "complete":
+        setProgress(100, "🎉 Done!");
+        AppState.generatedCourse = data.course;
+        console.log("✅ GENERATED COURSE:", data.course);
+        renderSuccess(data.course);
+        break;
+      case "error":
+        throw new Error(data.message || "Generation failed");
+    }
+  }
+
+  /* Parse "event:"/"data:" frames from a fetch() body (EventSource cannot POST) */
+  async function readEventStream(res, onEvent) {
+    const reader = res.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+      const { value, done } = await reader.read();
+      if (done) break;
+      buffer += decoder.decode(value, { stream: true });
+
+      let boundary;
+      while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+        const frame = buffer.slice(0, boundary);
+        buffer = buffer.slice(boundary + 2);
+
+        let event = "message";
+        const data = [];
+        frame.split("\n").forEach(line => {
+          if (line.startsWith("event:")) event = line.slice(6).trim();
+          else if (line.startsWith("data:")) data.push(line.slice(5).trim());
+        });
+        if (data.length) onEvent(event, JSON.parse(data.join("\n")));
+      }
+    }
+  }
+
+  /* Stream one unit's HTML into `target`, then swap in the final unit content */
+  async function streamUnitContent(params, target) {
+    const form = new FormData();
+    Object.entries(params).forEach(([key, value]) => form.append(key, value));
+
+    const res = await fetch(
+      window.GENERATE_UNIT_STREAM_URL || "/ai-course-creator/api/units/stream/",
+      { method: "POST", body: form }
+    );
+    if (!res.ok) {
+      const data = await res.json().catch(() => ({}));
+      throw new Error(data.message || "Unit generation failed");
+    }
+
+    let html = "";
+    let unit = null;
+    await readEventStream(res, (event, data) => {
+      if (event === "chunk") {
+        html += data.html;
+        target.innerHTML = html;
+      } else if (event === "unit") {
+        unit = data.unit;
+        target.innerHTML = unit.content;
+      }
+    });
+    return unit;
+  }
+
+  window.streamUnitContent = streamUnitContent;
 
-      const data = await res.json();
-      clearInterval(progressTimer);
+  /* ---------- GENERATE BUTTON HANDLER ---------- */
+  document.getElementById("gen-start").addEventListener("click", async () => {
+    renderLoading(5);
 
-      if (!res.ok) throw new Error(data.message || "Generation failed");
+    const form = new FormData();
+    form.append("course_topic", AppState.topic || "");
+    form.append("course_level", AppState.audience?.audience || "beginner");
+    form.append("notes", document.getElementById("gen-notes").value || "");
+    (AppState.assessments?.assessments || []).forEach(a => form.append("assessment_types", a));
+    if (AppState.document) form.append("source_pdf", AppState.document);
+
+    try {
+      const res = await fetch(
+        window.GENERATE_COURSE_STREAM_URL || "/ai-course-creator/api/generate/stream/",
+        { method: "POST", body: form }
+      );
 
-      renderLoading(100);
-      console.log("✅ GENERATED COURSE:", data.json);
+      if (!res.ok) {
+        const data = await res.json().catch(() => ({}));
+        throw new Error(data.message || "Generation failed");
+      }
 
-      setTimeout(() => renderSuccess(data.json), 500);
+      await readEventStream(res, handleEvent);
 
     } catch (err) {
-      clearInterval(progressTimer);
       console.error("❌ Course generation failed:", err);
       renderError(err.message || "Something went wrong.");
     }
@@ -0,0 +1,11 @@
+"""
+Celery tasks for AI Course Creator
+"""
+from celery import shared_task
+
+from .core.jobs import run_job
+
+
+@shared_task(name="ai_course_creator.generate_course")
+def generate_course_task(job_id: str, params: dict):
+    run_job(job_id, params)
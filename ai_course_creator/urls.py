@@ -1,5 +1,20 @@
 from django.urls import path
-from .views import generate_course, studio_page
+from .views import (
+    create_generation_job,
+    export_draft_olx,
+    generate_course,
+    generation_job_result,
+    generation_job_status,
+    get_draft,
+    list_drafts,
+    metrics,
+    regenerate_assessment,
+    regenerate_subsection,
+    regenerate_unit,
+    stream_course_generation,
+    stream_unit_content,
+    studio_page,
+)
 
 urlpatterns = [
    
@@ -8,5 +23,65 @@ urlpatterns = [
         generate_course,
         name="ai_course_creator_generate",
     ),
+    path(
+        "api/generate/stream/",
+        stream_course_generation,
+        name="ai_course_creator_generate_stream",
+    ),
+    path(
+        "api/units/stream/",
+        stream_unit_content,
+        name="ai_course_creator_unit_stream",
+    ),
+    path(
+        "api/regenerate/unit/",
+        regenerate_unit,
+        name="ai_course_creator_regenerate_unit",
+    ),
+    path(
+        "api/regenerate/subsection/",
+        regenerate_subsection,
+        name="ai_course_creator_regenerate_subsection",
+    ),
+    path(
+        "api/regenerate/assessment/",
+        regenerate_assessment,
+        name="ai_course_creator_regenerate_assessment",
+    ),
+    path(
+        "api/jobs/",
+        create_generation_job,
+        name="ai_course_creator_create_job",
+    ),
+    path(
+        "api/jobs/<str:job_id>/",
+        generation_job_status,
+        name="ai_course_creator_job_status",
+    ),
+    path(
+        "api/jobs/<str:job_id>/result/",
+        generation_job_result,
+        name="ai_course_creator_job_result",
+    ),
+    path(
+        "api/drafts/",
+        list_drafts,
+        name="ai_course_creator_drafts",
+    ),
+    path(
+        "api/drafts/<str:course_id>/",
+        get_draft,
+        name="ai_course_creator_draft",
+    ),
+    path(
+        "api/drafts/<str:course_id>/olx/",
+        export_draft_olx,
+        name="ai_course_creator_draft_olx",
+    ),
+    path(
+        "api/metrics/",
+        metrics,
+        name="ai_course_creator_metrics",
+    ),
     path("studio/", studio_page, name="ai_course_creator_studio"),
 ]
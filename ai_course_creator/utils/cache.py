@@ -0,0 +1,243 @@
+"""
+Small key/value caches with TTL, size-bounded eviction and hit/miss counters
+
+Values must be JSON-serialisable. ``None`` is a valid cached value, so
+callers can cache negative results; use ``lookup`` to tell a cached ``None``
+apart from a miss.
+"""
+import json
+import logging
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BACKEND = os.getenv('AI_COURSE_CREATOR_CACHE_BACKEND', 'memory')  # memory, sqlite, django, none
+DEFAULT_MAX_ENTRIES = int(os.getenv('AI_COURSE_CREATOR_CACHE_MAX_ENTRIES', '2000'))
+DEFAULT_SQLITE_PATH = os.getenv(
+    'AI_COURSE_CREATOR_CACHE_PATH',
+    os.path.join(tempfile.gettempdir(), 'ai_course_creator_cache.sqlite3')
+)
+
+
+class MemoryBackend:
+    """In-process LRU of ``key -> (expires_at, payload)``"""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, payload = entry
+            if expires_at is not None and expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return payload
+
+    def set(self, key: str, payload: str, ttl: Optional[int]) -> int:
+        """Store a payload and return how many entries were evicted"""
+        expires_at = time.time() + ttl if ttl else None
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (expires_at, payload)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                evicted += 1
+        return evicted
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteBackend:
+    """On-disk cache shared by every process on the host"""
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                "key TEXT PRIMARY KEY, payload TEXT NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)")
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute("SELECT payload, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            payload, expires_at = row
+            if expires_at is not None and expires_at < now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+            return payload
+
+    def set(self, key: str, payload: str, ttl: Optional[int]) -> int:
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, payload, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, payload, now + ttl if ttl else None, now)
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()
+            overflow = count - self.max_entries
+            if overflow > 0:
+                self._conn.execute(
+                    "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                    (overflow,)
+                )
+                return overflow
+        return 0
+
+    def delete(self, key: str):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM cache")
+
+
+class DjangoCacheBackend:
+    """Delegates storage and eviction to a configured Django cache"""
+
+    def __init__(self, alias: str = 'default'):
+        from django.core.cache import caches
+        self._cache = caches[alias]
+
+    def get(self, key: str) -> Optional[str]:
+        return self._cache.get(key)
+
+    def set(self, key: str, payload: str, ttl: Optional[int]) -> int:
+        self._cache.set(key, payload, ttl)
+        return 0
+
+    def delete(self, key: str):
+        self._cache.delete(key)
+
+    def clear(self):
+        # Never flush a shared Django cache from here
+        pass
+
+
+class NullBackend:
+    def get(self, key: str) -> Optional[str]:
+        return None
+
+    def set(self, key: str, payload: str, ttl: Optional[int]) -> int:
+        return 0
+
+    def delete(self, key: str):
+        pass
+
+    def clear(self):
+        pass
+
+
+class ResponseCache:
+    """Namespaced, TTL-bounded cache over one of the backends above"""
+
+    def __init__(self, backend, namespace: str, ttl: Optional[int] = None):
+        self.backend = backend
+        self.namespace = namespace
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0}
+        _response_caches.add(self)
+
+    def _key(self, key: str) -> str:
+        return f"ai_course_creator:{self.namespace}:{key}"
+
+    def lookup(self, key: str) -> Tuple[bool, Any]:
+        """Return ``(hit, value)``"""
+        try:
+            payload = self.backend.get(self._key(key))
+        except Exception as e:
+            logger.warning(f"Cache read failed ({self.namespace}): {str(e)}")
+            payload = None
+
+        with self._lock:
+            self._stats['hits' if payload is not None else 'misses'] += 1
+
+        if payload is None:
+            return False, None
+        return True, json.loads(payload)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        hit, value = self.lookup(key)
+        return value if hit else default
+
+    def set(self, key: str, value: Any, ttl: Optional[int] = None):
+        try:
+            evicted = self.backend.set(self._key(key), json.dumps(value), ttl or self.ttl)
+        except Exception as e:
+            logger.warning(f"Cache write failed ({self.namespace}): {str(e)}")
+            return
+
+        with self._lock:
+            self._stats['sets'] += 1
+            self._stats['evictions'] += evicted
+
+    def delete(self, key: str):
+        self.backend.delete(self._key(key))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return dict(self._stats)
+
+
+_response_caches = weakref.WeakSet()
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def response_cache_stats() -> Dict[str, Dict[str, int]]:
+    """Hit/miss counters of every live ``ResponseCache``, summed per namespace"""
+    totals: Dict[str, Dict[str, int]] = {}
+    for cache in list(_response_caches):
+        namespace_totals = totals.setdefault(cache.namespace, {'hits': 0, 'misses': 0, 'sets': 0, 'evictions': 0})
+        for key, value in cache.stats().items():
+            namespace_totals[key] += value
+    return totals
+
+
+def get_backend(name: str = DEFAULT_BACKEND):
+    """Return the process-wide backend instance for ``name``"""
+    with _backends_lock:
+        if name not in _backends:
+            if name == 'memory':
+                _backends[name] = MemoryBackend()
+            elif name == 'sqlite':
+                _backends[name] = SQLiteBackend()
+            elif name == 'django':
+                _backends[name] = DjangoCacheBackend()
+            elif name == 'none':
+                _backends[name] = NullBackend()
+            else:
+                raise ValueError(f"Unknown cache backend: {name}")
+        return _backends[name]
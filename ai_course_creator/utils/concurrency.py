@@ -0,0 +1,79 @@
+"""
+Bounded-concurrency helpers shared by the generators
+"""
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CONCURRENCY = int(os.getenv('AI_COURSE_CREATOR_MAX_CONCURRENCY', '8'))
+
+
+def run_bounded(func: Callable[..., Any], jobs: Iterable[tuple], max_workers: int = DEFAULT_MAX_CONCURRENCY,
+                thread_name_prefix: str = "ai-course-creator") -> List[Any]:
+    """
+    Call ``func(*job)`` for every job with at most ``max_workers`` calls in flight.
+
+    Results are returned in the same order as ``jobs``. Exceptions raised by a
+    job are re-raised when its result is collected, so callers that need
+    per-item fallbacks should handle errors inside ``func``.
+    """
+    jobs = list(jobs)
+    workers = max(1, min(max_workers or 1, len(jobs)))
+
+    if workers == 1:
+        return [func(*job) for job in jobs]
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix=thread_name_prefix) as executor:
+        futures = [executor.submit(func, *job) for job in jobs]
+        return [future.result() for future in futures]
+
+
+def run_dag(stages: Dict[str, Tuple[Callable[[], Any], Iterable[str]]],
+            thread_name_prefix: str = "ai-course-stage") -> Dict[str, Any]:
+    """
+    Run ``{name: (func, depends_on)}`` stages, each as soon as its dependencies finish.
+
+    Independent stages run concurrently (one thread per stage; stages are
+    expected to bound their own inner concurrency). Returns ``{name: result}``.
+    If a stage raises, stages that have not started yet are skipped and the
+    first error is re-raised once running stages finish.
+    """
+    for name, (_, depends_on) in stages.items():
+        unknown = set(depends_on) - set(stages)
+        if unknown:
+            raise ValueError(f"Stage {name} depends on unknown stages: {', '.join(sorted(unknown))}")
+
+    results = {}
+    pending = dict(stages)
+    running = {}
+    error = None
+
+    with ThreadPoolExecutor(max_workers=max(1, len(stages)), thread_name_prefix=thread_name_prefix) as executor:
+        while pending or running:
+            if error is None:
+                ready = [name for name, (_, depends_on) in pending.items() if all(dep in results for dep in depends_on)]
+                for name in ready:
+                    func, _ = pending.pop(name)
+                    running[executor.submit(func)] = name
+
+            if not running:
+                if pending and error is None:
+                    raise ValueError(f"Stage dependency cycle: {', '.join(sorted(pending))}")
+                break
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    logger.error(f"Pipeline stage {name} failed: {str(e)}")
+                    if error is None:
+                        error = e
+
+    if error is not None:
+        raise error
+    return results
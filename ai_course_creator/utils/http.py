@@ -0,0 +1,28 @@
+"""
+Shared, pooled HTTP client for outbound API calls
+"""
+import os
+import threading
+
+import httpx
+
+HTTP_TIMEOUT = float(os.getenv('AI_COURSE_CREATOR_HTTP_TIMEOUT', '15'))  # seconds
+HTTP_MAX_CONNECTIONS = int(os.getenv('AI_COURSE_CREATOR_HTTP_MAX_CONNECTIONS', '20'))
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client() -> httpx.Client:
+    """Return the process-wide ``httpx.Client`` (thread-safe, keep-alive pooled)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = httpx.Client(
+                timeout=HTTP_TIMEOUT,
+                limits=httpx.Limits(
+                    max_connections=HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=HTTP_MAX_CONNECTIONS
+                )
+            )
+        return _client
@@ -0,0 +1,258 @@
+"""
+Latency, token and cost metrics for the generation pipeline
+
+Counters and histograms live in process memory and are rendered in the
+Prometheus text format by ``render_prometheus`` (served at ``api/metrics/``).
+``provider_call`` times one outbound Gemini / Tavily request and records its
+token usage; ``stage`` times a pipeline stage (structure, videos, content,
+assessments, PDF ingest) and works as a context manager or decorator. Rate
+limiter and response cache statistics are collected at render time.
+
+With ``AI_COURSE_CREATOR_OTEL=true`` and ``opentelemetry-api`` installed,
+calls and stages are also exported as OpenTelemetry spans.
+"""
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+METRICS_PREFIX = "ai_course_creator"
+OTEL_ENABLED = os.getenv('AI_COURSE_CREATOR_OTEL', 'false').lower() in ('1', 'true', 'yes')
+DEFAULT_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0, 300.0, 600.0)  # seconds
+
+# USD per million prompt / output tokens, for the estimated cost counter
+GEMINI_PROMPT_PRICE = float(os.getenv('AI_COURSE_CREATOR_GEMINI_PROMPT_PRICE', '0.10'))
+GEMINI_OUTPUT_PRICE = float(os.getenv('AI_COURSE_CREATOR_GEMINI_OUTPUT_PRICE', '0.40'))
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Sequence[Tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = dict(self._values)
+        return _gauge(
+            self.name, self.documentation,
+            [(tuple(zip(self.labelnames, key)), value) for key, value in sorted(values.items())],
+            kind="counter"
+        )
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts..., sum, count
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: Any):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [0.0] * (len(self.buckets) + 2)
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[index] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def render(self) -> List[str]:
+        with self._lock:
+            values = {key: list(entry) for key, entry in self._values.items()}
+
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for key, entry in sorted(values.items()):
+            labels = tuple(zip(self.labelnames, key))
+            for bound, count in zip(self.buckets, entry):
+                lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', f'{bound:g}'),))} {count:g}")
+            lines.append(f"{self.name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {entry[-1]:g}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {entry[-2]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {entry[-1]:g}")
+        return lines
+
+
+PROVIDER_CALLS = Counter(
+    f"{METRICS_PREFIX}_provider_calls_total", "Outbound API calls by result (ok, error, cancelled, cache_hit)",
+    ("provider", "operation", "status")
+)
+PROVIDER_CALL_SECONDS = Histogram(
+    f"{METRICS_PREFIX}_provider_call_seconds", "Latency of outbound API requests", ("provider", "operation")
+)
+PROVIDER_TOKENS = Counter(
+    f"{METRICS_PREFIX}_provider_tokens_total", "Tokens reported by the provider", ("provider", "kind")
+)
+PROVIDER_COST = Counter(
+    f"{METRICS_PREFIX}_provider_cost_usd_total", "Estimated spend from reported token usage", ("provider",)
+)
+CALL_RETRIES_TOTAL = Counter(f"{METRICS_PREFIX}_call_retries_total", "Retries of transient call failures", ("call",))
+CALL_HEDGES_TOTAL = Counter(f"{METRICS_PREFIX}_call_hedges_total", "Duplicate requests started for slow calls", ("call",))
+STAGE_SECONDS = Histogram(
+    f"{METRICS_PREFIX}_stage_seconds", "Duration of pipeline stages", ("stage", "status")
+)
+
+_METRICS = (PROVIDER_CALLS, PROVIDER_CALL_SECONDS, PROVIDER_TOKENS, PROVIDER_COST, CALL_RETRIES_TOTAL, CALL_HEDGES_TOTAL, STAGE_SECONDS)
+
+_tracer = None
+_tracer_lock = threading.Lock()
+
+
+def _get_tracer():
+    global _tracer
+    if not OTEL_ENABLED:
+        return None
+    with _tracer_lock:
+        if _tracer is None:
+            try:
+                from opentelemetry import trace
+            except ImportError:
+                logger.warning("AI_COURSE_CREATOR_OTEL is set but opentelemetry-api is not installed")
+                _tracer = False
+            else:
+                _tracer = trace.get_tracer("ai_course_creator")
+        return _tracer or None
+
+
+@contextmanager
+def _span(name: str, attributes: Dict[str, Any]) -> Iterator[Optional[Any]]:
+    tracer = _get_tracer()
+    if tracer is None:
+        yield None
+        return
+    with tracer.start_as_current_span(name, attributes=attributes) as span:
+        yield span
+
+
+class CallRecord:
+    """Token usage of one provider call, filled in by the caller"""
+
+    def __init__(self):
+        self.prompt_tokens: Optional[int] = None
+        self.output_tokens: Optional[int] = None
+
+    def set_usage(self, usage_metadata: Any):
+        """Read ``prompt_token_count`` / ``candidates_token_count`` from a Gemini response"""
+        self.prompt_tokens = getattr(usage_metadata, "prompt_token_count", None) or self.prompt_tokens
+        self.output_tokens = getattr(usage_metadata, "candidates_token_count", None) or self.output_tokens
+
+
+@contextmanager
+def provider_call(provider: str, operation: str) -> Iterator[CallRecord]:
+    """
+    Time one outbound request; an exception counts it as an error
+
+    A streamed call whose consumer stops early (``GeneratorExit``, e.g. the
+    client disconnected) counts as cancelled.
+    """
+    record = CallRecord()
+    started = time.monotonic()
+    status = "error"
+    with _span(f"{provider}.{operation}", {"provider": provider, "operation": operation}) as span:
+        try:
+            yield record
+            status = "ok"
+        except GeneratorExit:
+            status = "cancelled"
+            raise
+        finally:
+            PROVIDER_CALL_SECONDS.observe(time.monotonic() - started, provider=provider, operation=operation)
+            PROVIDER_CALLS.inc(provider=provider, operation=operation, status=status)
+            _record_tokens(provider, record)
+            if span is not None:
+                span.set_attribute("status", status)
+                if record.prompt_tokens is not None:
+                    span.set_attribute("prompt_tokens", record.prompt_tokens)
+                if record.output_tokens is not None:
+                    span.set_attribute("output_tokens", record.output_tokens)
+
+
+def _record_tokens(provider: str, record: CallRecord):
+    if record.prompt_tokens:
+        PROVIDER_TOKENS.inc(record.prompt_tokens, provider=provider, kind="prompt")
+    if record.output_tokens:
+        PROVIDER_TOKENS.inc(record.output_tokens, provider=provider, kind="output")
+    if provider == "gemini" and (record.prompt_tokens or record.output_tokens):
+        cost = ((record.prompt_tokens or 0) * GEMINI_PROMPT_PRICE + (record.output_tokens or 0) * GEMINI_OUTPUT_PRICE) / 1e6
+        PROVIDER_COST.inc(cost, provider=provider)
+
+
+def record_cache_hit(provider: str, operation: str):
+    PROVIDER_CALLS.inc(provider=provider, operation=operation, status="cache_hit")
+
+
+@contextmanager
+def stage(name: str, **attributes: Any) -> Iterator[None]:
+    """Time a pipeline stage; usable as ``with stage("content"):`` or ``@stage("content")``"""
+    started = time.monotonic()
+    status = "error"
+    with _span(f"stage.{name}", dict(attributes, stage=name)):
+        try:
+            yield
+            status = "ok"
+        finally:
+            STAGE_SECONDS.observe(time.monotonic() - started, stage=name, status=status)
+
+
+def _gauge(name: str, documentation: str, samples: List[Tuple[Tuple[Tuple[str, str], ...], float]], kind: str = "gauge") -> List[str]:
+    lines = [f"# HELP {name} {documentation}", f"# TYPE {name} {kind}"]
+    lines.extend(f"{name}{_format_labels(labels)} {value:g}" for labels, value in samples)
+    return lines
+
+
+def _collected() -> List[str]:
+    from .cache import response_cache_stats
+    from .rate_limit import limiter_stats
+
+    limiters = sorted(limiter_stats().items())
+    caches = sorted(response_cache_stats().items())
+    prefix = METRICS_PREFIX
+    lines = []
+    lines += _gauge(f"{prefix}_limiter_concurrency_limit", "Current AIMD concurrency limit",
+                    [((("provider", name),), stats["concurrency_limit"]) for name, stats in limiters])
+    lines += _gauge(f"{prefix}_limiter_in_flight", "Requests holding a limiter slot",
+                    [((("provider", name),), stats["in_flight"]) for name, stats in limiters])
+    lines += _gauge(f"{prefix}_limiter_throttled_total", "Requests the provider throttled",
+                    [((("provider", name),), stats["throttled"]) for name, stats in limiters], kind="counter")
+    lines += _gauge(f"{prefix}_limiter_queue_seconds_total", "Time spent waiting for a limiter slot",
+                    [((("provider", name),), stats["queue_seconds"]) for name, stats in limiters], kind="counter")
+    lines += _gauge(f"{prefix}_cache_requests_total", "Response cache lookups",
+                    [((("cache", name), ("result", result)), stats[key])
+                     for name, stats in caches for result, key in (("hit", "hits"), ("miss", "misses"))], kind="counter")
+    lines += _gauge(f"{prefix}_cache_evictions_total", "Response cache evictions",
+                    [((("cache", name),), stats["evictions"]) for name, stats in caches], kind="counter")
+    return lines
+
+
+def render_prometheus() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)"""
+    lines = []
+    for metric in _METRICS:
+        lines.extend(metric.render())
+    lines.extend(_collected())
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,144 @@
+"""
+PDF text extraction for uploaded source material
+
+Uploads are spooled to a temporary file while being hashed, so the request
+never holds the whole PDF in memory. Pages are extracted in order, in
+batches on a process pool for large documents, and extraction stops as soon
+as ``max_chars`` of text have been gathered; the text is cut to ``max_chars``.
+Results are cached by file hash and limit.
+"""
+import hashlib
+import logging
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+from pypdf import PdfReader
+
+from .cache import DEFAULT_BACKEND, ResponseCache, get_backend
+from .metrics import stage
+
+logger = logging.getLogger(__name__)
+
+PDF_MAX_CHARS = int(os.getenv('AI_COURSE_CREATOR_PDF_MAX_CHARS', '500000'))
+PDF_WORKERS = int(os.getenv('AI_COURSE_CREATOR_PDF_WORKERS', str(min(4, os.cpu_count() or 1))))
+PDF_PAGES_PER_TASK = 8
+PDF_POOL_MIN_PAGES = 16  # smaller documents are cheaper to extract in-thread
+PDF_CACHE_TTL = int(os.getenv('AI_COURSE_CREATOR_PDF_CACHE_TTL', str(30 * 24 * 60 * 60)))  # seconds
+
+_pool = None
+_pool_lock = threading.Lock()
+_cache = None
+
+
+def _get_cache() -> ResponseCache:
+    global _cache
+    with _pool_lock:
+        if _cache is None:
+            _cache = ResponseCache(get_backend(DEFAULT_BACKEND), namespace="pdf", ttl=PDF_CACHE_TTL)
+        return _cache
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: web workers are multi-threaded
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _extract_pages(path: str, start: int, stop: int) -> List[str]:
+    """Extract text from pages ``[start, stop)``; runs in a worker process"""
+    reader = PdfReader(path)
+    texts = []
+    for page in reader.pages[start:stop]:
+        text = page.extract_text()
+        if text:
+            texts.append(text)
+    return texts
+
+
+def _spool(uploaded_file, directory: str) -> tuple:
+    """Copy an upload to a temp file chunk by chunk; return ``(path, sha256)``"""
+    digest = hashlib.sha256()
+    path = os.path.join(directory, "source.pdf")
+    with open(path, "wb") as out:
+        chunks = uploaded_file.chunks() if hasattr(uploaded_file, "chunks") else iter(lambda: uploaded_file.read(1 << 20), b"")
+        for chunk in chunks:
+            digest.update(chunk)
+            out.write(chunk)
+    return path, digest.hexdigest()
+
+
+def _extract(path: str, max_chars: int) -> str:
+    page_count = len(PdfReader(path).pages)
+    batches = deque(
+        (start, min(start + PDF_PAGES_PER_TASK, page_count))
+        for start in range(0, page_count, PDF_PAGES_PER_TASK)
+    )
+    texts = []
+    gathered = 0
+
+    if page_count < PDF_POOL_MIN_PAGES or PDF_WORKERS <= 1:
+        while batches and gathered < max_chars:
+            for text in _extract_pages(path, *batches.popleft()):
+                texts.append(text)
+                gathered += len(text) + 1
+        return "\n".join(texts)[:max_chars]
+
+    # Keep a bounded window of batches in flight and collect them in page order
+    pool = _get_pool()
+    in_flight = deque()
+    try:
+        while (batches or in_flight) and gathered < max_chars:
+            while batches and len(in_flight) < PDF_WORKERS * 2:
+                in_flight.append(pool.submit(_extract_pages, path, *batches.popleft()))
+            for text in in_flight.popleft().result():
+                texts.append(text)
+                gathered += len(text) + 1
+    finally:
+        for future in in_flight:
+            future.cancel()
+        # Wait for running batches so the temp file can be removed safely
+        for future in in_flight:
+            if not future.cancelled():
+                try:
+                    future.result()
+                except Exception:
+                    pass
+
+    return "\n".join(texts)[:max_chars]
+
+
+@stage("pdf_ingest")
+def extract_pdf_text(uploaded_file, max_chars: int = PDF_MAX_CHARS) -> str:
+    """
+    Return the text of an uploaded PDF, stopping once ``max_chars`` are gathered
+
+    ``uploaded_file`` may be a Django ``UploadedFile`` or any binary file object.
+    Raises the underlying ``pypdf`` error if the file cannot be read.
+    """
+    directory = tempfile.mkdtemp(prefix="ai-course-pdf-")
+    try:
+        path, file_hash = _spool(uploaded_file, directory)
+
+        cache = _get_cache()
+        cache_key = f"{file_hash}:{max_chars}"
+        hit, text = cache.lookup(cache_key)
+        if hit:
+            logger.info(f"PDF text cache hit ({file_hash[:12]})")
+            return text
+
+        text = _extract(path, max_chars)
+        logger.info(f"Extracted {len(text)} characters from PDF {file_hash[:12]}")
+        cache.set(cache_key, text)
+        return text
+
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
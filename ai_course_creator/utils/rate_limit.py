@@ -0,0 +1,235 @@
+"""
+Per-provider rate limiting for outbound API calls
+
+Each provider (``gemini``, ``tavily``) gets a requests-per-minute bucket, an
+optional tokens-per-minute bucket, and an AIMD concurrency limit: the limit
+grows by one slot per window of successful calls and halves when the
+provider answers 429 / RESOURCE_EXHAUSTED. Throttled calls wait and are
+retried instead of failing, so throughput settles at the quota ceiling.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+THROTTLE_RETRIES = int(os.getenv('AI_COURSE_CREATOR_THROTTLE_RETRIES', '4'))
+THROTTLE_BACKOFF = 2.0  # seconds before the first retry of a throttled call
+BACKOFF_COOLDOWN = 5.0  # seconds; 429s inside this window count as one congestion event
+
+# provider: (requests per minute, tokens per minute, max concurrency); 0 disables a limit
+PROVIDER_DEFAULTS = {
+    "gemini": (60, 1_000_000, 16),
+    "tavily": (100, 0, 8),
+}
+
+
+class TokenBucket:
+    """Refills ``rate_per_minute`` units per minute up to ``capacity``; balance may go negative"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float):
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Block until ``amount`` units are available and take them; return seconds waited"""
+        amount = min(amount, self.capacity)
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= amount:
+                    self._tokens -= amount
+                    return waited
+                delay = (amount - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+    def adjust(self, amount: float):
+        """Take (positive) or return (negative) units after the fact, e.g. actual token usage"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+    def drain(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            self._tokens = min(self._tokens, 0.0)
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit: +1 slot per ``limit`` successes, halved on throttling"""
+
+    def __init__(self, max_limit: int, initial: Optional[int] = None, min_limit: int = 1):
+        self.max_limit = max(1, max_limit)
+        self.min_limit = max(1, min(min_limit, self.max_limit))
+        self.limit = float(initial or max(self.min_limit, self.max_limit // 2))
+        self.in_flight = 0
+        self._last_backoff = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> float:
+        started = time.monotonic()
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+        return time.monotonic() - started
+
+    def release(self, throttled: bool = False):
+        with self._condition:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                if now - self._last_backoff > BACKOFF_COOLDOWN:
+                    self.limit = max(self.min_limit, self.limit / 2)
+                    self._last_backoff = now
+            else:
+                self.limit = min(self.max_limit, self.limit + 1.0 / self.limit)
+            self._condition.notify_all()
+
+
+def throttle_backoff(attempt: int) -> float:
+    """Seconds to wait before retrying a call throttled ``attempt + 1`` times"""
+    return THROTTLE_BACKOFF * (2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def is_throttle_error(error: BaseException) -> bool:
+    """True for HTTP 429 and Gemini ``ResourceExhausted`` / ``TooManyRequests`` errors"""
+    if type(error).__name__ in ("ResourceExhausted", "TooManyRequests"):
+        return True
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) == 429 or getattr(error, "code", None) == 429:
+        return True
+    # The gRPC status name, e.g. in errors re-raised by the SDK with the status in the message
+    return "RESOURCE_EXHAUSTED" in str(error)
+
+
+class ProviderLimiter:
+    def __init__(self, name: str, requests_per_minute: float, tokens_per_minute: float = 0, max_concurrency: int = 8):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self.concurrency = AdaptiveConcurrency(max_concurrency)
+
+        self._stats_lock = threading.Lock()
+        self._stats = {"calls": 0, "throttled": 0, "queue_seconds": 0.0, "max_queue_seconds": 0.0}
+
+    @contextmanager
+    def slot(self, tokens: float = 0) -> Iterator["ProviderLimiter"]:
+        """
+        Hold one request slot for the duration of a call
+
+        Waits for a concurrency slot, a request and ``tokens`` from the
+        token bucket. A throttling error raised inside the block backs off
+        the concurrency limit and pauses the request bucket before
+        propagating.
+        """
+        queued = self.concurrency.acquire()
+        throttled = False
+        try:
+            if self.requests:
+                queued += self.requests.acquire()
+            if self.tokens and tokens:
+                queued += self.tokens.acquire(tokens)
+            self._record(queued)
+            yield self
+        except Exception as e:
+            throttled = is_throttle_error(e)
+            if throttled:
+                with self._stats_lock:
+                    self._stats["throttled"] += 1
+                if self.requests:
+                    self.requests.drain()
+            raise
+        finally:
+            self.concurrency.release(throttled=throttled)
+
+    def has_capacity(self) -> bool:
+        """True when a concurrency slot is free right now"""
+        return self.concurrency.in_flight < int(self.concurrency.limit)
+
+    def call(self, func: Callable[[], Any], tokens: float = 0) -> Any:
+        """
+        Run ``func`` inside a slot, waiting and retrying when the provider throttles
+
+        For calls made through ``resilience.resilient_call``, pass the limiter
+        to it instead, so throttles are retried in one place.
+        """
+        for attempt in range(THROTTLE_RETRIES + 1):
+            try:
+                with self.slot(tokens):
+                    return func()
+            except Exception as e:
+                if attempt == THROTTLE_RETRIES or not is_throttle_error(e):
+                    raise
+                delay = throttle_backoff(attempt)
+                logger.warning(f"{self.name} throttled, retrying in {delay:.1f}s "
+                               f"(concurrency limit {int(self.concurrency.limit)})")
+                time.sleep(delay)
+
+    def record_tokens(self, estimated: float, actual: Optional[float]):
+        """Correct the token bucket once a call reports its real usage"""
+        if self.tokens and actual is not None:
+            self.tokens.adjust(actual - min(estimated, self.tokens.capacity))
+
+    def _record(self, queued: float):
+        with self._stats_lock:
+            self._stats["calls"] += 1
+            self._stats["queue_seconds"] += queued
+            self._stats["max_queue_seconds"] = max(self._stats["max_queue_seconds"], queued)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self._stats)
+        stats["avg_queue_seconds"] = stats["queue_seconds"] / stats["calls"] if stats["calls"] else 0.0
+        stats["concurrency_limit"] = int(self.concurrency.limit)
+        stats["in_flight"] = self.concurrency.in_flight
+        return stats
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _env_number(provider: str, setting: str, default: float) -> float:
+    return float(os.getenv(f'AI_COURSE_CREATOR_{provider.upper()}_{setting}', str(default)))
+
+
+def get_limiter(provider: str) -> ProviderLimiter:
+    """
+    Return the process-wide limiter for ``provider``
+
+    Limits come from ``AI_COURSE_CREATOR_<PROVIDER>_RPM``, ``_TPM`` and
+    ``_MAX_CONCURRENCY``, falling back to ``PROVIDER_DEFAULTS``.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            rpm, tpm, max_concurrency = PROVIDER_DEFAULTS.get(provider, (0, 0, 8))
+            limiter = ProviderLimiter(
+                provider,
+                requests_per_minute=_env_number(provider, "RPM", rpm),
+                tokens_per_minute=_env_number(provider, "TPM", tpm),
+                max_concurrency=int(_env_number(provider, "MAX_CONCURRENCY", max_concurrency)),
+            )
+            _limiters[provider] = limiter
+        return limiter
+
+
+def limiter_stats() -> Dict[str, Dict[str, Any]]:
+    with _limiters_lock:
+        limiters = dict(_limiters)
+    return {name: limiter.stats() for name, limiter in limiters.items()}
@@ -0,0 +1,223 @@
+"""
+Deadlines, retries and hedging for idempotent outbound calls
+
+``resilient_call`` runs a call on a shared worker pool so it can be given a
+deadline, retries transient failures with full-jitter exponential backoff,
+and, once enough latencies have been observed, starts one duplicate
+("hedged") request when the first is slower than the recent p95. The first
+successful attempt wins. Calls abandoned at a deadline finish in the
+background; their results are discarded.
+
+Given a provider limiter, each attempt takes a limiter slot before it is
+timed, so time queued behind the limiter neither counts as latency nor
+triggers a hedge, and throttled attempts are retried here with the
+limiter's backoff rather than inside the limiter as well.
+"""
+import logging
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Optional
+
+from .metrics import CALL_HEDGES_TOTAL, CALL_RETRIES_TOTAL
+from .rate_limit import THROTTLE_RETRIES, ProviderLimiter, is_throttle_error, throttle_backoff
+
+logger = logging.getLogger(__name__)
+
+CALL_RETRIES = int(os.getenv('AI_COURSE_CREATOR_CALL_RETRIES', '3'))
+CALL_BACKOFF = 1.0  # seconds; base of the exponential backoff
+CALL_MAX_BACKOFF = 20.0  # seconds
+CALL_WORKERS = int(os.getenv('AI_COURSE_CREATOR_CALL_WORKERS', '64'))
+HEDGE_MIN_SAMPLES = 20
+LATENCY_WINDOW = 200
+
+_TRANSIENT_ERROR_NAMES = frozenset({
+    "DeadlineExceeded", "ServiceUnavailable", "InternalServerError", "ServerError", "Aborted",
+    "TimeoutException", "ConnectTimeout", "ReadTimeout", "ConnectError", "ReadError",
+    "RemoteProtocolError", "TimeoutError", "ConnectionError", "ConnectionResetError",
+})
+
+
+class CallDeadlineExceeded(TimeoutError):
+    pass
+
+
+class _Abandoned(Exception):
+    """A request whose attempt was given up before it was sent"""
+
+
+class RetryableResponse(Exception):
+    """Raise from a call to retry it; ``value`` is returned if every attempt is rejected"""
+
+    def __init__(self, value: Any, reason: str = "response rejected"):
+        super().__init__(reason)
+        self.value = value
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Errors worth retrying; throttling is left to the provider limiter"""
+    if is_throttle_error(error):
+        return False
+    if isinstance(error, RetryableResponse):
+        return True
+    if type(error).__name__ in _TRANSIENT_ERROR_NAMES:
+        return True
+    response = getattr(error, "response", None)
+    status = getattr(response, "status_code", None) or getattr(error, "code", None)
+    return isinstance(status, int) and 500 <= status < 600
+
+
+class LatencyTracker:
+    """Rolling window of call latencies per key (e.g. model and output size)"""
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, key: str, seconds: float):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key: str, fraction: float = 0.95) -> Optional[float]:
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < HEDGE_MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+_executor = None
+_executor_lock = threading.Lock()
+latency_tracker = LatencyTracker()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=CALL_WORKERS, thread_name_prefix="ai-course-call")
+        return _executor
+
+
+def _backoff(attempt: int) -> float:
+    return random.uniform(0, min(CALL_MAX_BACKOFF, CALL_BACKOFF * (2 ** attempt)))
+
+
+def _attempt(func: Callable[[], Any], deadline_at: Optional[float], hedge_after: Optional[float],
+             latency_key: Optional[str], limiter: Optional[ProviderLimiter], tokens: float) -> Any:
+    """One attempt, plus at most one hedged duplicate; returns the first success"""
+    executor = _get_executor()
+    started = threading.Event()  # set once the first request holds its limiter slot (or has finished)
+    started_at = []
+    # Set once the caller stops waiting (another request won or the deadline
+    # passed); a request still queued for its slot then returns without being sent
+    abandoned = threading.Event()
+
+    def timed():
+        with limiter.slot(tokens) if limiter else nullcontext():
+            if abandoned.is_set():
+                raise _Abandoned()
+            began = time.monotonic()
+            if not started.is_set():
+                started_at.append(began)
+                started.set()
+            result = func()
+            abandoned.set()  # the first success wins; before the slot is handed on
+            if latency_key:
+                latency_tracker.record(latency_key, time.monotonic() - began)
+        return result
+
+    first = executor.submit(timed)
+    first.add_done_callback(lambda _: started.set())
+    pending = {first}
+    hedged = hedge_after is None
+    error = None
+
+    while pending:
+        timeout = None if deadline_at is None else max(0.0, deadline_at - time.monotonic())
+        if not hedged:
+            # The hedge delay runs from when the request was sent, not from when it was queued
+            if not started.wait(timeout):
+                break
+            if started_at:
+                until_hedge = max(0.0, started_at[0] + hedge_after - time.monotonic())
+                timeout = until_hedge if timeout is None else min(timeout, until_hedge)
+
+        done, pending = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                abandoned.set()
+                for other in pending:
+                    other.cancel()
+                return future.result()
+            error = future.exception()
+
+        if pending and deadline_at is not None and time.monotonic() >= deadline_at:
+            break
+        if pending and not hedged:
+            hedged = True
+            if limiter is not None and not limiter.has_capacity():
+                logger.debug(f"Not hedging slow call ({latency_key}): {limiter.name} has no free slot")
+                continue
+            logger.info(f"Hedging slow call ({latency_key}) after {hedge_after:.1f}s")
+            CALL_HEDGES_TOTAL.inc(call=latency_key)
+            pending.add(executor.submit(timed))
+        elif not pending:
+            raise error
+
+    abandoned.set()
+    for future in pending:
+        future.cancel()
+    raise CallDeadlineExceeded(f"Call did not finish before its deadline ({latency_key})")
+
+
+def resilient_call(func: Callable[[], Any], deadline: Optional[float] = None, retries: int = CALL_RETRIES,
+                   hedge: bool = True, latency_key: Optional[str] = None,
+                   limiter: Optional[ProviderLimiter] = None, tokens: float = 0) -> Any:
+    """
+    Call ``func`` with an overall ``deadline`` (seconds), retrying transient errors
+
+    Hedging needs a ``latency_key`` so only comparable calls share a p95.
+    ``func`` must be idempotent: with hedging it may run twice. If every
+    attempt raises ``RetryableResponse``, the last rejected value is returned.
+
+    With a ``limiter``, every attempt (hedges included) runs inside one of its
+    slots holding ``tokens``, a hedge is only started while the limiter has a
+    free slot, and throttled attempts are retried up to ``THROTTLE_RETRIES``
+    times on top of ``retries``. Without one, throttling errors are raised.
+    """
+    deadline_at = time.monotonic() + deadline if deadline else None
+    rejected = None
+    failures = throttles = 0
+
+    while True:
+        hedge_after = latency_tracker.percentile(latency_key) if hedge and latency_key else None
+        try:
+            return _attempt(func, deadline_at, hedge_after, latency_key, limiter, tokens)
+        except Exception as e:
+            if isinstance(e, RetryableResponse):
+                rejected = e
+            throttled = limiter is not None and is_throttle_error(e)
+            if throttled:
+                delay, exhausted = throttle_backoff(throttles), throttles == THROTTLE_RETRIES
+                throttles += 1
+            else:
+                delay, exhausted = _backoff(failures), failures == retries
+                failures += 1
+            out_of_time = deadline_at is not None and time.monotonic() + delay >= deadline_at
+            if exhausted or out_of_time or not (throttled or is_transient_error(e)):
+                if rejected is not None:
+                    return rejected.value
+                raise
+            if throttled:
+                logger.warning(f"{limiter.name} throttled ({latency_key or 'call'}), retrying in {delay:.1f}s "
+                               f"(concurrency limit {int(limiter.concurrency.limit)})")
+            else:
+                logger.warning(f"Transient failure ({latency_key or 'call'}): {str(e)}; retry {failures} in {delay:.1f}s")
+            CALL_RETRIES_TOTAL.inc(call=latency_key or "call")
+            time.sleep(delay)
@@ -1,65 +1,416 @@
+import hmac
+import json
+import os
+
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
-from django.http import JsonResponse
-from pypdf import PdfReader
+from django.views.decorators.http import require_GET, require_POST
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.urls import reverse
 
+from .core import jobs, streaming
+from .core.olx_export import iter_olx, olx_filename
+from .core.jobs import save_draft
 from .core.course_generator import CourseGenerator
+from .models import CourseDraft
+from .models.course import Course
+from .models.serialization import dumps
+from .utils.metrics import render_prometheus
+from .utils.pdf import extract_pdf_text
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 
 
 
-@csrf_exempt
-@require_POST
-def generate_course(request):
+DEFAULT_ASSESSMENT_TYPES = ["multiple-choice", "checkbox", "text-input", "dropdown", "numerical"]
+DRAFT_PAGE_SIZE = 50
+METRICS_TOKEN = os.getenv("AI_COURSE_CREATOR_METRICS_TOKEN", "")
+
+
+def _read_generation_params(request, defer_pdf=False):
+    """
+    Return (params, error_response) for a course generation POST
+
+    With ``defer_pdf`` an uploaded PDF is stored for the background job to
+    read instead of being extracted during the request.
+    """
     course_topic = request.POST.get("course_topic")
     course_level = request.POST.get("course_level")
 
     if not course_topic or not course_level:
-        return JsonResponse(
+        return None, JsonResponse(
             {"result": "error", "message": "course_topic and course_level are required"},
             status=400
         )
 
-    
-    source_material = None
+    params = {
+        "title": course_topic,
+        "audience": course_level,
+        "duration": "medium",
+        "components": ["text", "video"],
+        "assessment_types": request.POST.getlist("assessment_types") or DEFAULT_ASSESSMENT_TYPES,
+        "source_material": None,
+    }
+
     uploaded_pdf = request.FILES.get("source_pdf")
 
     if uploaded_pdf:
         try:
-            reader = PdfReader(uploaded_pdf)
-            extracted_text = []
-
-            for page in reader.pages:
-                text = page.extract_text()
-                if text:
-                    extracted_text.append(text)
-
-            source_material = "\n".join(extracted_text)
+            if defer_pdf:
+                params["source_pdf"] = jobs.store_source_pdf(uploaded_pdf)
+            else:
+                params["source_material"] = extract_pdf_text(uploaded_pdf)
 
         except Exception as e:
-            return JsonResponse(
+            return None, JsonResponse(
                 {"result": "error", "message": f"Failed to read PDF: {str(e)}"},
                 status=400
             )
 
+    return params, None
+
+
+def _owner_id(request):
+    return request.user.id if request.user.is_authenticated else None
+
+
+def _can_access_draft(request, draft):
+    """Owners see their own drafts; drafts without an owner are visible to staff only"""
+    if draft.owner_id is None:
+        return request.user.is_staff
+    return draft.owner_id == _owner_id(request)
+
+
+def _draft_for_request(request, **lookup):
+    draft = CourseDraft.objects.filter(**lookup).first()
+    if draft is None or not _can_access_draft(request, draft):
+        return None
+    return draft
+
+
+def _read_regeneration_request(request, *required):
+    """Return (data, course, save, error_response) for a JSON regeneration POST
+
+    The course is either posted in full as ``course`` or loaded from the
+    stored draft named by ``course_id``. ``save`` tells whether the result
+    may be stored as a draft: a posted course whose id names someone else's
+    draft is rejected, and a posted course without a draft is only stored
+    for a signed-in user.
+    """
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError:
+        data = None
+    if not isinstance(data, dict):
+        return None, None, False, JsonResponse({"result": "error", "message": "Request body must be a JSON object"}, status=400)
+
+    missing = [name for name in required if not data.get(name)]
+    has_course = isinstance(data.get("course"), dict) or (isinstance(data.get("course_id"), str) and data["course_id"])
+    if missing or not has_course:
+        return None, None, False, JsonResponse(
+            {"result": "error", "message": f"course or course_id, {', '.join(required)} are required"},
+            status=400
+        )
+
+    if isinstance(data.get("course"), dict):
+        course = Course.from_dict(data["course"])
+        existing = CourseDraft.objects.summaries().filter(course_id=course.id).first()
+        if existing is not None and not _can_access_draft(request, existing):
+            return None, None, False, JsonResponse(
+                {"result": "error", "message": "Course belongs to another user"},
+                status=403
+            )
+        return data, course, existing is not None or request.user.is_authenticated, None
+
+    draft = _draft_for_request(request, course_id=data["course_id"])
+    if draft is None:
+        return None, None, False, JsonResponse({"result": "error", "message": "Draft not found"}, status=404)
+    return data, draft.get_course(), True, None
+
+
+def _course_response(data):
+    """Like JsonResponse, but encodes model objects in ``data`` without building their dicts first"""
+    return HttpResponse(dumps(data), content_type="application/json")
+
+
+def _regeneration_response(request, course, node_key, node, save):
+    if save:
+        save_draft(course, owner_id=_owner_id(request))
+    return _course_response(
+        {
+            "result": "success",
+            node_key: node,
+            "json": course
+        }
+    )
+
+
+def _job_for_request(request, job_id):
+    job = jobs.get_job(job_id)
+    if job is None:
+        return None
+    owner_id = job.get("owner_id")
+    if owner_id is not None and owner_id != getattr(request.user, "id", None):
+        return None
+    return job
+
+
+@csrf_exempt
+@require_POST
+def generate_course(request):
+    params, error = _read_generation_params(request)
+    if error:
+        return error
+
     course_generator = CourseGenerator()
 
-    course = course_generator.generate_course_structure(
-        title=course_topic,
-        audience=course_level,
-        duration="medium",
-        components=["text", "video"],
-        source_material=source_material  
+    course = course_generator.generate_course_structure(**params)
+    save_draft(course, owner_id=_owner_id(request))
+
+    return _course_response(
+        {
+            "result": "success",
+            "json": course
+        }
+    )
+
+
+@csrf_exempt
+@require_POST
+def stream_course_generation(request):
+    """Stream generation progress as Server-Sent Events"""
+    params, error = _read_generation_params(request)
+    if error:
+        return error
+
+    include_content = request.POST.get("include_content", "true").lower() not in ("0", "false", "no")
+
+    response = StreamingHttpResponse(
+        streaming.iter_sse(params, include_content=include_content, owner_id=_owner_id(request)),
+        content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@csrf_exempt
+@require_POST
+def stream_unit_content(request):
+    """Stream one unit's HTML from Gemini as it is generated"""
+    required = ("course_title", "section_title", "subsection_title", "unit_title")
+    values = {name: request.POST.get(name) for name in required}
+
+    if not all(values.values()):
+        return JsonResponse(
+            {"result": "error", "message": f"{', '.join(required)} are required"},
+            status=400
+        )
+
+    response = StreamingHttpResponse(
+        streaming.iter_unit_sse(unit_id=request.POST.get("unit_id"), **values),
+        content_type="text/event-stream"
+    )
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+
+@csrf_exempt
+@require_POST
+def regenerate_unit(request):
+    """Regenerate one unit of a posted course; every other node is returned unchanged"""
+    data, course, save, error = _read_regeneration_request(request, "unit_id")
+    if error:
+        return error
+
+    try:
+        unit = CourseGenerator().regenerate_unit(
+            course,
+            data["unit_id"],
+            components=data.get("components") or ["text", "video"],
+            include_videos=data.get("include_videos", True),
+            source_material=data.get("source_material"),
+        )
+    except KeyError as e:
+        return JsonResponse({"result": "error", "message": str(e.args[0])}, status=404)
+    except Exception as e:
+        return JsonResponse({"result": "error", "message": str(e)}, status=502)
+
+    return _regeneration_response(request, course, "unit", unit, save)
+
+
+@csrf_exempt
+@require_POST
+def regenerate_subsection(request):
+    """Redesign one subsection (description, units and their content) of a posted course"""
+    data, course, save, error = _read_regeneration_request(request, "section_id", "subsection_id")
+    if error:
+        return error
+
+    try:
+        subsection = CourseGenerator().regenerate_subsection(
+            course,
+            data["section_id"],
+            data["subsection_id"],
+            components=data.get("components") or ["text", "video"],
+            include_videos=data.get("include_videos", True),
+            source_material=data.get("source_material"),
+        )
+    except KeyError as e:
+        return JsonResponse({"result": "error", "message": str(e.args[0])}, status=404)
+    except Exception as e:
+        return JsonResponse({"result": "error", "message": str(e)}, status=502)
+
+    return _regeneration_response(request, course, "subsection", subsection, save)
+
+
+@csrf_exempt
+@require_POST
+def regenerate_assessment(request):
+    """Regenerate one section or final assessment of a posted course"""
+    data, course, save, error = _read_regeneration_request(request, "assessment_id")
+    if error:
+        return error
+
+    try:
+        assessment = CourseGenerator().regenerate_assessment(
+            course,
+            data["assessment_id"],
+            assessment_types=data.get("assessment_types") or DEFAULT_ASSESSMENT_TYPES,
+        )
+    except KeyError as e:
+        return JsonResponse({"result": "error", "message": str(e.args[0])}, status=404)
+    except Exception as e:
+        return JsonResponse({"result": "error", "message": str(e)}, status=502)
+
+    return _regeneration_response(request, course, "assessment", assessment, save)
+
+
+@csrf_exempt
+@require_POST
+def create_generation_job(request):
+    """Queue a course generation and return its job id immediately"""
+    params, error = _read_generation_params(request, defer_pdf=True)
+    if error:
+        return error
+
+    job_id = jobs.submit_job(params, owner_id=_owner_id(request))
+
+    return JsonResponse(
+        {
+            "result": "accepted",
+            "job_id": job_id,
+            "status_url": reverse("ai_course_creator:ai_course_creator_job_status", args=[job_id]),
+            "result_url": reverse("ai_course_creator:ai_course_creator_job_result", args=[job_id]),
+        },
+        status=202
+    )
+
+
+@require_GET
+def generation_job_status(request, job_id):
+    job = _job_for_request(request, job_id)
+    if job is None:
+        return JsonResponse({"result": "error", "message": "Job not found"}, status=404)
+
+    return JsonResponse(
+        {
+            "result": "success",
+            "job_id": job["id"],
+            "status": job["status"],
+            "stage": job["stage"],
+            "progress": job["progress"],
+            "message": job["message"],
+        }
+    )
+
+
+@require_GET
+def generation_job_result(request, job_id):
+    job = _job_for_request(request, job_id)
+    if job is None:
+        # The job record expires from the cache; its result lives on as a draft
+        draft = _draft_for_request(request, job_id=job_id)
+        if draft is None:
+            return JsonResponse({"result": "error", "message": "Job not found"}, status=404)
+        return JsonResponse({"result": "success", "json": draft.get_course_data()})
+
+    if job["status"] == "failed":
+        return JsonResponse({"result": "error", "status": job["status"], "message": job["message"]}, status=500)
+
+    course_data = jobs.get_job_result(job_id) if job["status"] == "completed" else None
+    if course_data is None:
+        return JsonResponse({"result": "pending", "status": job["status"], "progress": job["progress"]}, status=202)
+
+    return JsonResponse(
+        {
+            "result": "success",
+            "json": course_data
+        }
+    )
+
+@require_GET
+def list_drafts(request):
+    """Summaries of the current user's stored courses, newest first"""
+    if not request.user.is_authenticated:
+        return JsonResponse({"result": "error", "message": "Authentication required"}, status=401)
+
+    try:
+        offset = max(0, int(request.GET.get("offset", 0)))
+        limit = min(max(1, int(request.GET.get("limit", DRAFT_PAGE_SIZE))), 200)
+    except ValueError:
+        return JsonResponse({"result": "error", "message": "offset and limit must be integers"}, status=400)
+
+    drafts = CourseDraft.objects.for_owner(request.user.id).summaries()[offset:offset + limit]
+    return JsonResponse(
+        {
+            "result": "success",
+            "drafts": [draft.summary() for draft in drafts],
+        }
     )
 
+
+@require_GET
+def get_draft(request, course_id):
+    draft = _draft_for_request(request, course_id=course_id)
+    if draft is None:
+        return JsonResponse({"result": "error", "message": "Draft not found"}, status=404)
+
     return JsonResponse(
         {
             "result": "success",
-            "json": course.to_dict()
+            "draft": draft.summary(),
+            "json": draft.get_course_data()
         }
     )
 
+
+@require_GET
+def export_draft_olx(request, course_id):
+    """Stream a stored course as an OLX .tar.gz for Studio's import page"""
+    draft = _draft_for_request(request, course_id=course_id)
+    if draft is None:
+        return JsonResponse({"result": "error", "message": "Draft not found"}, status=404)
+
+    course_data = draft.get_course_data()
+    response = StreamingHttpResponse(iter_olx(course_data), content_type="application/gzip")
+    response["Content-Disposition"] = f'attachment; filename="{olx_filename(course_data)}"'
+    return response
+
+
+@require_GET
+def metrics(request):
+    """Prometheus scrape endpoint; needs the bearer token if one is configured, otherwise a staff user"""
+    if METRICS_TOKEN:
+        authorization = request.META.get("HTTP_AUTHORIZATION", "")
+        if not hmac.compare_digest(authorization.encode("utf-8"), f"Bearer {METRICS_TOKEN}".encode("utf-8")):
+            return HttpResponse(status=401)
+    elif not request.user.is_staff:
+        return HttpResponse(status=403)
+
+    return HttpResponse(render_prometheus(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
 @login_required
 def studio_page(request):
     return render(request, "ai_course_creator/studio.html")
@@ -0,0 +1,101 @@
+import json
+
+import pytest
+
+from ai_course_creator.core import batch
+from ai_course_creator.core.batch import completed_spec_ids, load_batch_specs, run_batch
+from ai_course_creator.models.course import Course
+
+
+class _CourseGenerator:
+    generated = []
+
+    def generate_course_structure(self, title, **kwargs):
+        if title == "Broken":
+            raise RuntimeError("no structure")
+        self.generated.append(title)
+        return Course(id=f"course-{title}", title=f"Cours de {title} — été", description="", audience="beginner", duration="short")
+
+
+@pytest.fixture(autouse=True)
+def course_generator(monkeypatch):
+    _CourseGenerator.generated = []
+    monkeypatch.setattr(batch, "CourseGenerator", _CourseGenerator)
+    return _CourseGenerator
+
+
+def _specs(*topics):
+    return [{"id": topic.lower(), "topic": topic, "level": "beginner", "duration": "short", "assessment_types": []}
+            for topic in topics]
+
+
+def _records(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_writes_one_line_per_course(tmp_path):
+    output = tmp_path / "results.jsonl"
+    results = []
+
+    summary = run_batch(_specs("Python", "Broken"), str(output), include_content=False, on_result=results.append)
+
+    assert summary == {"generated": 1, "failed": 1, "skipped": 0}
+    records = {record["id"]: record for record in _records(output)}
+    assert records["python"]["course"]["title"] == "Cours de Python — été"
+    assert (records["broken"]["status"], records["broken"]["error"]) == ("error", "no structure")
+    assert {result["id"]: type(result.get("course")).__name__ for result in results} == {"python": "Course", "broken": "NoneType"}
+
+
+def test_resumes_after_a_line_cut_inside_a_multibyte_character(tmp_path, course_generator):
+    output = tmp_path / "results.jsonl"
+    run_batch(_specs("Python"), str(output), include_content=False)
+    partial = json.dumps({"id": "rust", "status": "ok", "course": {"title": "é"}}, ensure_ascii=False).encode("utf-8")
+    with open(output, "ab") as f:
+        f.write(partial[:partial.index("é".encode("utf-8")) + 1])
+
+    assert completed_spec_ids(str(output)) == {"python"}
+
+    course_generator.generated = []
+    summary = run_batch(_specs("Python", "Rust"), str(output), include_content=False)
+
+    assert summary == {"generated": 1, "failed": 0, "skipped": 1}
+    assert course_generator.generated == ["Rust"]
+    with open(output, "rb") as f:
+        lines = f.read().split(b"\n")
+    assert lines[-1] == b""  # every line is terminated, including the partial one
+    assert lines[1] == partial[:partial.index("é".encode("utf-8")) + 1]
+    assert [json.loads(line)["id"] for line in (lines[0], lines[2])] == ["python", "rust"]
+    assert completed_spec_ids(str(output)) == {"python", "rust"}
+
+
+def test_failed_courses_are_retried(tmp_path, course_generator):
+    output = tmp_path / "results.jsonl"
+    run_batch(_specs("Broken"), str(output), include_content=False)
+
+    summary = run_batch(_specs("Broken"), str(output), include_content=False)
+
+    assert summary == {"generated": 0, "failed": 1, "skipped": 0}
+
+
+def test_missing_results_file_has_no_completed_ids(tmp_path):
+    assert completed_spec_ids(str(tmp_path / "missing.jsonl")) == set()
+
+
+def test_load_csv_specs(tmp_path):
+    path = tmp_path / "specs.csv"
+    path.write_text("topic,level,duration,assessment_types\nPython,Advanced,long,multiple-choice;checkbox\n", encoding="utf-8")
+
+    spec, = load_batch_specs(str(path))
+
+    assert spec["level"] == "advanced"
+    assert spec["assessment_types"] == ["multiple-choice", "checkbox"]
+    assert len(spec["id"]) == 16
+
+
+def test_invalid_duration_is_rejected(tmp_path):
+    path = tmp_path / "specs.jsonl"
+    path.write_text('{"topic": "Python", "duration": "forever"}\n', encoding="utf-8")
+
+    with pytest.raises(ValueError, match="invalid duration"):
+        load_batch_specs(str(path))
@@ -0,0 +1,73 @@
+import xml.etree.ElementTree as ET
+
+from ai_course_creator.core.capa import compile_assessments, compile_question, plain_text, validate_problems
+
+
+def _question(text="What is 2 + 2?", options=("3", "4"), correct="4", **extra):
+    return dict({"type": "multiple-choice", "question": text, "options": list(options), "correct_answer": correct}, **extra)
+
+
+def _assessment(*questions, assessment_id="a-1"):
+    return {"id": assessment_id, "title": "Quiz", "questions": list(questions)}
+
+
+def test_plain_text_keeps_stray_angle_brackets_and_ampersands():
+    assert plain_text("<p>a < b?</p>") == "a < b?"
+    assert plain_text("<strong>R&D</strong> &amp; more") == "R&D & more"
+    assert plain_text(None) == ""
+
+
+def test_escaped_question_is_well_formed():
+    data = compile_question(_question("<p>Is a < b &nbsp;R&D?</p>"), "Q1", escaped=True)
+    label = ET.fromstring(data).find(".//label")
+    assert label.text == "Is a < b \xa0R&D?"
+
+
+def test_valid_batch_keeps_question_html():
+    problems = compile_assessments([_assessment(_question("<p>What is <em>2 + 2</em>?</p>"), _question())])
+
+    blocks = problems["a-1"]
+    assert [block.block_id for block in blocks] == ["a1_0", "a1_1"]
+    assert "<em>2 + 2</em>" in blocks[0].data
+    assert validate_problems([block.data for block in blocks]) == [None, None]
+
+
+def test_malformed_question_is_retried_as_escaped_text():
+    problems = compile_assessments([
+        _assessment(_question("<p>Is a < b?</p>"), _question("<p>Fine <em>question</em></p>")),
+        _assessment(_question("<p>R&D budget?</p>"), assessment_id="a-2"),
+    ])
+
+    first, second = problems["a-1"]
+    assert ET.fromstring(first.data).find(".//label").text == "Is a < b?"
+    assert "<em>question</em>" in second.data  # the rest of the batch is left as generated
+    assert ET.fromstring(problems["a-2"][0].data).find(".//label/p").text == "R&D budget?"  # a bare & is escaped in place
+
+
+def test_unbalanced_markup_across_problems_is_checked_one_by_one():
+    # Each problem alone is malformed, but together they parse as one document
+    problems = ['<problem display_name="1"><multiplechoiceresponse>', '</multiplechoiceresponse></problem>']
+
+    errors = validate_problems(problems)
+
+    assert all(errors)
+
+
+def test_invalid_problem_is_dropped(caplog):
+    no_correct_choice = _question(correct="5")
+    problems = compile_assessments([_assessment(_question(), no_correct_choice, _question())])
+
+    assert [block.block_id for block in problems["a-1"]] == ["a1_0", "a1_2"]
+    assert "Dropping invalid problem a1_1: no correct choice" in caplog.text
+
+
+def test_assessment_without_questions_compiles_to_no_problems():
+    assert compile_assessments([_assessment()]) == {"a-1": []}
+
+
+def test_html_entities_are_made_xml_safe_without_escaping():
+    problems = compile_assessments([_assessment(_question("<p>R&D&nbsp;<em>costs</em> &copy;</p>"))])
+
+    label = ET.fromstring(problems["a-1"][0].data).find(".//label")
+    assert label.find("p/em").text == "costs"
+    assert "".join(label.itertext()) == "R&D\xa0costs \xa9"
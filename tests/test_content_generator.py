@@ -0,0 +1,61 @@
+import pytest
+
+from ai_course_creator.core import content_generator, gemini_client
+from ai_course_creator.core.content_generator import UNIT_BATCH_OUTPUT_TOKENS, UNIT_BATCH_SIZE, ContentGenerator
+from ai_course_creator.models.course import Unit
+
+
+class _Model:
+    def __init__(self, model_name):
+        self.model_name = model_name
+
+
+@pytest.fixture
+def use_model(monkeypatch):
+    def use(model_name):
+        monkeypatch.setattr(content_generator, "get_model", lambda: _Model(model_name))
+    return use
+
+
+@pytest.mark.parametrize("model_name, requested, expected", [
+    ("gemini-2.0-flash", 4, 3),
+    ("gemini-2.0-flash", 2, 2),
+    ("gemini-2.5-flash", 4, 4),
+    ("gemini-2.5-flash", 40, 25),
+    ("gemini-2.5-pro", 1, 1),
+])
+def test_batch_size_keeps_each_unit_budget(use_model, model_name, requested, expected):
+    use_model(model_name)
+
+    assert ContentGenerator(unit_batch_size=requested)._unit_batch_size() == expected
+
+
+def test_default_model_batches_by_default(use_model):
+    use_model("gemini-2.0-flash")
+
+    assert UNIT_BATCH_SIZE > 1
+    assert ContentGenerator()._unit_batch_size() == UNIT_BATCH_SIZE
+
+
+def test_max_output_tokens_setting_overrides_the_model_limit(use_model, monkeypatch):
+    use_model("gemini-2.0-flash")
+    monkeypatch.setattr(gemini_client, "MODEL_MAX_OUTPUT_TOKENS", 2 * UNIT_BATCH_OUTPUT_TOKENS)
+
+    assert ContentGenerator(unit_batch_size=8)._unit_batch_size() == 2
+
+
+def test_batch_output_cap_scales_with_the_batch(use_model, monkeypatch):
+    use_model("gemini-2.5-flash")
+    configs = []
+
+    def generate_text(model, prompt, generation_config=None, **kwargs):
+        configs.append(generation_config)
+        return '{"units": []}'
+
+    monkeypatch.setattr(content_generator, "generate_text", generate_text)
+    monkeypatch.setattr(ContentGenerator, "_generate_unit_content", lambda self, unit, *args: None)
+    units = [Unit(id=f"u-{index}", title=f"Unit {index}") for index in range(3)]
+
+    ContentGenerator(unit_batch_size=3)._generate_unit_batch(units, "Course", "Section", "Subsection", ["text"], [None] * 3)
+
+    assert configs[0].max_output_tokens == 3 * UNIT_BATCH_OUTPUT_TOKENS
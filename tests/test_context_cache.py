@@ -0,0 +1,110 @@
+import pytest
+
+from ai_course_creator.core import context_cache
+from ai_course_creator.core.context_cache import LocalContextCache, min_cache_tokens, shared_context
+
+
+class _Model:
+    model_name = "gemini-2.0-flash"
+
+    def __init__(self):
+        self.prompts = []
+
+    def generate_content(self, prompt, **kwargs):
+        self.prompts.append(prompt)
+        return prompt
+
+
+@pytest.fixture
+def model(monkeypatch):
+    model = _Model()
+    monkeypatch.setattr(context_cache, "get_model", lambda model_name=None: model)
+    return model
+
+
+@pytest.fixture
+def local_cache(monkeypatch):
+    cache = LocalContextCache()
+    monkeypatch.setitem(context_cache._backends, "local", cache)
+    return cache
+
+
+def test_min_cache_tokens_by_model(monkeypatch):
+    assert min_cache_tokens("gemini-2.5-flash") == 1024
+    assert min_cache_tokens("gemini-2.0-flash-lite") == 1024
+    assert min_cache_tokens("gemini-2.5-pro") == 4096
+    assert min_cache_tokens("some-other-model") == 4096
+
+    monkeypatch.setattr(context_cache, "CONTEXT_CACHE_MIN_TOKENS", 10)
+    assert min_cache_tokens("gemini-2.5-pro") == 10
+
+
+def test_local_model_prepends_the_prefix(model):
+    cache = LocalContextCache()
+    context = cache.create("gemini-2.0-flash", "Be brief.", "Course: Python", ttl=60)
+
+    assert context.prefix == "Be brief.\n\nCourse: Python"
+    assert context.model.model_name == "gemini-2.0-flash"
+    context.model.generate_content("Unit: Lists")
+    assert model.prompts == ["Be brief.\n\nCourse: Python" + "Unit: Lists"]
+    assert cache.contexts == {context.name: context}
+
+
+def test_local_delete_is_counted_once(model):
+    cache = LocalContextCache()
+    context = cache.create("gemini-2.0-flash", "Be brief.", "Course: Python", ttl=60)
+
+    cache.delete(context)
+    cache.delete(context)
+
+    assert (cache.created, cache.deleted, cache.contexts) == (1, 1, {})
+
+
+def test_shared_context_caches_a_large_prefix_for_the_block(model, local_cache):
+    contents = "x" * 4 * 1024
+
+    with shared_context("Be brief.", contents, backend="local") as context:
+        assert context is not None
+        assert context.prefix == "Be brief.\n\n" + contents
+        assert local_cache.contexts == {context.name: context}
+
+    assert (local_cache.created, local_cache.deleted) == (1, 1)
+
+
+def test_shared_context_skips_prefixes_below_the_minimum(model, local_cache):
+    with shared_context("Be brief.", "x" * 3000, backend="local") as context:
+        assert context is None
+
+    assert local_cache.created == 0
+
+
+def test_shared_context_uses_the_token_count_of_the_backend(model, local_cache, monkeypatch):
+    monkeypatch.setattr(local_cache, "count_tokens", lambda *args: 2048)
+
+    with shared_context("Be brief.", "short", backend="local") as context:
+        assert context is not None
+
+
+def test_shared_context_falls_back_when_creation_fails(model, local_cache, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("quota")
+
+    monkeypatch.setattr(local_cache, "create", fail)
+
+    with shared_context("Be brief.", "x" * 8192, backend="local") as context:
+        assert context is None
+
+
+def test_shared_context_disabled():
+    with shared_context("Be brief.", "x" * 8192, backend="none") as context:
+        assert context is None
+
+
+def test_shared_context_estimates_when_counting_fails(model, local_cache, monkeypatch):
+    def fail(*args):
+        raise RuntimeError("deadline")
+
+    monkeypatch.setattr(local_cache, "count_tokens", fail)
+
+    with shared_context("Be brief.", "x" * 8192, backend="local") as context:
+        assert context is not None
@@ -0,0 +1,111 @@
+import pytest
+
+from ai_course_creator.core.course_builder import CourseBuilderService
+from ai_course_creator.core.modulestore import LocalModuleStore
+
+ROOT = "block-v1:Org+Course+Run+type@course+block@course"
+
+
+def _course():
+    return {
+        "id": "course-1",
+        "title": "Python",
+        "sections": [{
+            "id": "s-1",
+            "title": "Basics",
+            "subsections": [{
+                "id": "ss-1",
+                "title": "Variables",
+                "units": [
+                    {"id": "u-1", "title": "Names", "content": "<p>names</p>",
+                     "video_url": "https://www.youtube.com/embed/abc123"},
+                    {"id": "u-2", "title": "Types", "content": "<p>types</p>"},
+                ],
+            }],
+        }],
+        "assessments": [
+            {"id": "a-1", "section_id": "s-1", "title": "Basics Quiz", "questions": [
+                {"type": "multiple-choice", "question": "2 + 2?", "options": ["3", "4"], "correct_answer": "4"},
+            ]},
+            {"id": "a-2", "section_id": None, "title": "Final", "questions": [
+                {"type": "text-input", "question": "Name a type", "correct_answer": "int"},
+            ]},
+        ],
+    }
+
+
+def _location(block_type, block_id):
+    return f"block-v1:Org+Course+Run+type@{block_type}+block@{block_id}"
+
+
+def _build(course=None):
+    store = LocalModuleStore()
+    result = CourseBuilderService(parent_location=ROOT, modulestore=store, user_id=7).create_course_components(course or _course())
+    return store, result
+
+
+def test_builds_the_block_tree():
+    store, result = _build()
+
+    assert store.blocks[ROOT].children == [_location("chapter", "s1"), _location("chapter", "course1_final")]
+    assert store.blocks[_location("chapter", "s1")].children == [_location("sequential", "ss1"), _location("sequential", "a1")]
+    assert store.blocks[_location("sequential", "ss1")].children == [_location("vertical", "u1"), _location("vertical", "u2")]
+    assert store.blocks[_location("vertical", "u1")].children == [_location("html", "u1_html"), _location("video", "u1_video")]
+    assert store.blocks[_location("vertical", "u2")].children == [_location("html", "u2_html")]
+    assert store.blocks[_location("video", "u1_video")].fields["youtube_id_1_0"] == "abc123"
+    assert store.blocks[_location("html", "u2_html")].fields["data"] == "<p>types</p>"
+
+    quiz = store.blocks[_location("sequential", "a1")]
+    assert quiz.fields["graded"] is True
+    assert store.blocks[_location("vertical", "a1")].children == [_location("problem", "a1_0")]
+    assert store.blocks[_location("vertical", "a2")].children == [_location("problem", "a2_0")]
+    assert "<stringresponse" in store.blocks[_location("problem", "a2_0")].fields["data"]
+
+    assert result["published"] is True
+    assert result["locations"] == [location for location in store.blocks if location != ROOT]
+
+
+def test_writes_in_one_commit_and_publishes_once():
+    store, result = _build()
+
+    assert store.writes == len(result["locations"]) == 14
+    assert store.bulk_operations_count == 1
+    assert store.commits == 1
+    assert store.published == [ROOT]
+
+
+def test_duplicate_block_id_raises():
+    course = _course()
+    course["sections"][0]["subsections"][0]["units"][1]["id"] = "u-1"
+    store = LocalModuleStore()
+    builder = CourseBuilderService(parent_location=ROOT, modulestore=store, user_id=7)
+
+    with pytest.raises(ValueError, match="Duplicate block"):
+        builder.create_course_components(course)
+
+    assert store.published == []
+    assert store.commits == 1  # the bulk operation still ends
+
+
+def test_unknown_parent_raises():
+    store = LocalModuleStore()
+
+    with pytest.raises(KeyError):
+        store.create_child(7, _location("chapter", "missing"), "sequential", block_id="s")
+
+
+def test_writes_outside_a_bulk_operation_commit_one_by_one():
+    store = LocalModuleStore()
+    chapter = store.create_child(7, ROOT, "chapter", block_id="c", fields={"display_name": "One"})
+    store.create_child(7, chapter.location, "sequential", block_id="s")
+    store.publish(ROOT, 7)
+
+    assert chapter.display_name == "One"
+    assert store.commits == 3
+
+
+def test_without_a_modulestore_returns_the_plan():
+    result = CourseBuilderService().create_course_components(_course())
+
+    assert result["total_modules"] == 1
+    assert "locations" not in result
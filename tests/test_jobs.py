@@ -0,0 +1,96 @@
+import pytest
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+from ai_course_creator.core import course_generator, jobs
+from ai_course_creator.models.course import Course
+from ai_course_creator.utils import pdf
+
+
+class _CourseGenerator:
+    def generate_course_structure(self, title, progress_callback=None, source_material=None, **kwargs):
+        if title == "Broken":
+            raise RuntimeError("no structure")
+        progress_callback("stage", {"stage": "structure"})
+        assert jobs.get_job(self.job_id)["stage"] == "structure"
+        return Course(id="course-1", title=title, description=source_material[:10], audience="beginner", duration="short")
+
+
+@pytest.fixture(autouse=True)
+def generator(monkeypatch):
+    monkeypatch.setattr(course_generator, "CourseGenerator", _CourseGenerator)
+    monkeypatch.setattr(jobs, "save_draft", lambda course, owner_id=None, job_id="": None)
+    return _CourseGenerator
+
+
+def _params(title="Python"):
+    return {"title": title, "audience": "beginner", "source_material": "é" * 500_000}
+
+
+def test_job_record_holds_only_status_fields(generator):
+    job_id = jobs.create_job(owner_id=3)
+
+    assert set(jobs.get_job(job_id)) == {"id", "status", "stage", "progress", "message", "owner_id", "created_at", "updated_at"}
+
+    generator.job_id = job_id
+    jobs.run_job(job_id, _params())
+
+    job = jobs.get_job(job_id)
+    assert (job["status"], job["progress"], job["owner_id"]) == ("completed", 100, 3)
+    assert "params" not in job
+    assert jobs.get_job_result(job_id)["description"] == "é" * 10
+
+
+def test_failed_job_records_the_error():
+    job_id = jobs.create_job()
+
+    jobs.run_job(job_id, _params("Broken"))
+
+    job = jobs.get_job(job_id)
+    assert (job["status"], job["message"]) == ("failed", "no structure")
+
+
+def test_submitted_job_runs_locally_with_its_params(generator, monkeypatch):
+    submitted = []
+    monkeypatch.setattr(jobs, "_get_celery_task", lambda: None)
+    monkeypatch.setattr(jobs, "_get_executor", lambda: type("Executor", (), {"submit": lambda self, *args: submitted.append(args)})())
+
+    job_id = jobs.submit_job(_params(), owner_id=3)
+
+    assert submitted == [(jobs._run_local_job, job_id, _params())]
+    assert jobs.get_job(job_id)["status"] == "queued"
+
+
+@pytest.fixture
+def storage(monkeypatch, tmp_path):
+    storage = FileSystemStorage(location=str(tmp_path))
+    monkeypatch.setattr(jobs, "default_storage", storage)
+    return storage
+
+
+def test_job_reads_its_stored_pdf_and_deletes_it(generator, storage, monkeypatch):
+    monkeypatch.setattr(pdf, "extract_pdf_text", lambda uploaded_file: uploaded_file.read().decode() * 2)
+    name = jobs.store_source_pdf(ContentFile(b"Lists and dicts"))
+    job_id = jobs.create_job()
+    generator.job_id = job_id
+
+    jobs.run_job(job_id, dict(_params(), source_material=None, source_pdf=name))
+
+    assert jobs.get_job(job_id)["status"] == "completed"
+    assert jobs.get_job_result(job_id)["description"] == "Lists and "
+    assert not storage.exists(name)
+
+
+def test_unreadable_pdf_fails_the_job(storage, monkeypatch):
+    def fail(uploaded_file):
+        raise ValueError("EOF marker not found")
+
+    monkeypatch.setattr(pdf, "extract_pdf_text", fail)
+    name = jobs.store_source_pdf(ContentFile(b"not a pdf"))
+    job_id = jobs.create_job()
+
+    jobs.run_job(job_id, dict(_params(), source_pdf=name))
+
+    job = jobs.get_job(job_id)
+    assert (job["status"], job["message"]) == ("failed", "Failed to read PDF: EOF marker not found")
+    assert not storage.exists(name)
@@ -0,0 +1,127 @@
+import re
+from contextlib import contextmanager
+from types import SimpleNamespace
+
+import pytest
+
+from ai_course_creator.core import context_cache
+from ai_course_creator.utils.metrics import Counter, Histogram, provider_call, record_cache_hit, render_prometheus, stage
+
+_SAMPLE_RE = re.compile(r'^[a-z_]+(\{([a-z_]+="([^"\\]|\\.)*",?)*\})? -?[0-9.e+inf]+$', re.IGNORECASE)
+
+
+def _sample(text, line_prefix):
+    values = [line.rsplit(" ", 1)[1] for line in text.splitlines() if line.startswith(line_prefix + " ")]
+    return float(values[0]) if values else 0.0
+
+
+def test_counter_and_histogram_render_in_the_text_format():
+    counter = Counter("test_requests_total", "Requests", ("path",))
+    counter.inc(path='/a"b')
+    counter.inc(2, path='/a"b')
+    histogram = Histogram("test_seconds", "Latency", ("op",), buckets=(0.5, 1.0))
+    histogram.observe(0.2, op="x")
+    histogram.observe(0.7, op="x")
+
+    assert counter.render() == [
+        "# HELP test_requests_total Requests",
+        "# TYPE test_requests_total counter",
+        'test_requests_total{path="/a\\"b"} 3',
+    ]
+    assert histogram.render() == [
+        "# HELP test_seconds Latency",
+        "# TYPE test_seconds histogram",
+        'test_seconds_bucket{op="x",le="0.5"} 1',
+        'test_seconds_bucket{op="x",le="1"} 2',
+        'test_seconds_bucket{op="x",le="+Inf"} 2',
+        'test_seconds_sum{op="x"} 0.900000',
+        'test_seconds_count{op="x"} 2',
+    ]
+
+
+def test_render_prometheus_is_valid_exposition_text():
+    with provider_call("gemini", "render_test") as record:
+        record.prompt_tokens, record.output_tokens = 1000, 500
+    record_cache_hit("gemini", "render_test")
+    with stage("render_test"):
+        pass
+
+    text = render_prometheus()
+
+    assert text.endswith("\n")
+    for line in text.splitlines():
+        assert line.startswith("# HELP ") or line.startswith("# TYPE ") or _SAMPLE_RE.match(line), line
+    calls = 'ai_course_creator_provider_calls_total{provider="gemini",operation="render_test",status="%s"}'
+    assert _sample(text, calls % "ok") == 1
+    assert _sample(text, calls % "cache_hit") == 1
+    assert _sample(text, 'ai_course_creator_stage_seconds_count{stage="render_test",status="ok"}') == 1
+    assert "# TYPE ai_course_creator_limiter_in_flight gauge" in text
+
+
+def test_failed_call_counts_as_error():
+    with pytest.raises(RuntimeError):
+        with provider_call("gemini", "error_test"):
+            raise RuntimeError("boom")
+
+    text = render_prometheus()
+    assert _sample(text, 'ai_course_creator_provider_calls_total{provider="gemini",operation="error_test",status="error"}') == 1
+
+
+def test_abandoned_stream_counts_as_cancelled():
+    def stream():
+        with provider_call("gemini", "cancel_test"):
+            yield "a"
+            yield "b"
+
+    chunks = stream()
+    next(chunks)
+    chunks.close()
+
+    text = render_prometheus()
+    calls = 'ai_course_creator_provider_calls_total{provider="gemini",operation="cancel_test",status="%s"}'
+    assert _sample(text, calls % "cancelled") == 1
+    assert _sample(text, calls % "error") == 0
+
+
+def test_context_cache_creation_is_recorded(monkeypatch):
+    cached = SimpleNamespace(name="cachedContents/1", usage_metadata=SimpleNamespace(total_token_count=2048))
+    monkeypatch.setattr(context_cache, "get_model", lambda model_name=None: None)
+    monkeypatch.setattr(context_cache.genai.caching.CachedContent, "create", lambda **kwargs: cached)
+    monkeypatch.setattr(context_cache.genai.GenerativeModel, "from_cached_content", lambda cached_content: object())
+    tokens = 'ai_course_creator_provider_tokens_total{provider="gemini",kind="prompt"}'
+    before = _sample(render_prometheus(), tokens)
+
+    context_cache.GeminiContextCache().create("gemini-2.5-flash", "Be brief.", "Course: Python", ttl=60)
+
+    text = render_prometheus()
+    assert _sample(text, 'ai_course_creator_provider_calls_total{provider="gemini",operation="cache_create",status="ok"}') >= 1
+    assert _sample(text, tokens) - before == 2048
+
+
+def test_context_cache_token_count_is_limited_and_recorded(monkeypatch):
+    class _Model:
+        def __init__(self, model_name, system_instruction=None):
+            pass
+
+        def count_tokens(self, contents):
+            return SimpleNamespace(total_tokens=1500)
+
+    class _Limiter:
+        slots = 0
+
+        @contextmanager
+        def slot(self, tokens=0):
+            self.slots += 1
+            yield
+
+    limiter = _Limiter()
+    monkeypatch.setattr(context_cache, "get_model", lambda model_name=None: None)
+    monkeypatch.setattr(context_cache.genai, "GenerativeModel", _Model)
+    monkeypatch.setattr(context_cache, "get_limiter", lambda provider: limiter)
+    calls = 'ai_course_creator_provider_calls_total{provider="gemini",operation="count_tokens",status="ok"}'
+    before = _sample(render_prometheus(), calls)
+
+    assert context_cache.GeminiContextCache().count_tokens("gemini-2.5-flash", "Be brief.", "Course: Python") == 1500
+
+    assert limiter.slots == 1
+    assert _sample(render_prometheus(), calls) - before == 1
@@ -0,0 +1,106 @@
+import io
+import tarfile
+import xml.etree.ElementTree as ET
+
+from ai_course_creator.core.olx_export import iter_olx, olx_filename, write_olx
+
+
+def _course():
+    return {
+        "id": "course-1",
+        "title": "R&D <Basics>",
+        "sections": [{
+            "id": "s-1",
+            "title": "Costs & \"Benefits\"",
+            "subsections": [{
+                "id": "ss-1",
+                "title": "a < b",
+                "units": [
+                    {"id": "u-1", "title": "Names & <values>", "content": "<p>a < b &nbsp;R&D</p>",
+                     "video_url": "https://www.youtube.com/embed/abc123?rel=0"},
+                    {"id": "u-2", "title": "Files", "content": "<p>files</p>", "video_url": "https://example.com/v.mp4?a=1&b=2"},
+                ],
+            }],
+        }],
+        "assessments": [
+            {"id": "a-1", "section_id": "s-1", "title": "Quiz <1>", "questions": [
+                {"type": "multiple-choice", "question": "<p>Is a < b?</p>", "options": ["yes", "no"], "correct_answer": "yes"},
+                {"type": "checkbox", "question": "<p>R&D&nbsp;costs</p>", "options": ["<b>x</b>", "y"], "correct_answers": ["<b>x</b>"]},
+                {"type": "dropdown", "question": "Pick", "options": ["it's", "b"], "correct_answer": "it's"},
+                {"type": "numerical", "question": "2 + 2", "correct_answer": "4", "tolerance": "0.1",
+                 "explanation": "<p>4 &gt; 3</p>"},
+            ]},
+            {"id": "a-2", "section_id": None, "title": "Final", "questions": [
+                {"type": "text-input", "question": "Name a type", "correct_answer": "int & float"},
+            ]},
+        ],
+    }
+
+
+def _members(data: bytes):
+    with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as tar:
+        return {member.name: tar.extractfile(member).read() for member in tar.getmembers()}
+
+
+def _export(course):
+    output = io.BytesIO()
+    count = write_olx(course, output)
+    members = _members(output.getvalue())
+    assert count == len(members)
+    return members
+
+
+def test_every_xml_file_parses():
+    members = _export(_course())
+
+    xml_files = [name for name in members if name.endswith(".xml")]
+    assert "course/course.xml" in xml_files
+    for name in xml_files:
+        ET.fromstring(members[name])
+
+
+def test_children_point_at_exported_files():
+    members = _export(_course())
+
+    for name, data in members.items():
+        if not name.endswith(".xml") or name == "course/course.xml":
+            continue
+        for child in ET.fromstring(data):
+            if child.get("url_name"):
+                assert f"course/{child.tag}/{child.get('url_name')}.xml" in members
+
+
+def test_problems_keep_their_text():
+    members = _export(_course())
+
+    question = ET.fromstring(members["course/problem/a1_0.xml"]).find(".//label")
+    assert "".join(question.itertext()) == "Is a < b?"
+    checkbox = ET.fromstring(members["course/problem/a1_1.xml"])
+    assert "".join(checkbox.find(".//label").itertext()) == "R&D\xa0costs"
+    assert checkbox.find(".//choice[@correct='true']/b").text == "x"
+    assert ET.fromstring(members["course/problem/a2_0.xml"]).find("stringresponse").get("answer") == "int & float"
+
+
+def test_assessments_use_default_grading_types():
+    members = _export(_course())
+
+    section_quiz = ET.fromstring(members["course/sequential/a1.xml"])
+    final = ET.fromstring(members["course/sequential/a2.xml"])
+    assert (section_quiz.get("graded"), section_quiz.get("format")) == ("true", "Homework")
+    assert (final.get("graded"), final.get("format")) == ("true", "Final Exam")
+
+
+def test_videos():
+    members = _export(_course())
+
+    assert ET.fromstring(members["course/video/u1_video.xml"]).get("youtube_id_1_0") == "abc123"
+    source = ET.fromstring(members["course/video/u2_video.xml"]).find("source")
+    assert source.get("src") == "https://example.com/v.mp4?a=1&b=2"
+
+
+def test_streamed_export_matches_written_export():
+    course = _course()
+    streamed = _members(b"".join(iter_olx(course)))
+
+    assert streamed == _export(course)
+    assert olx_filename(course).endswith(".tar.gz")
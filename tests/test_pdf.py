@@ -0,0 +1,22 @@
+import io
+import uuid
+
+from ai_course_creator.utils import pdf
+
+
+class _Reader:
+    def __init__(self, path):
+        self.pages = [None] * 3
+
+
+def test_extracted_text_is_cut_to_max_chars(monkeypatch):
+    monkeypatch.setattr(pdf, "PdfReader", _Reader)
+    monkeypatch.setattr(pdf, "_extract_pages", lambda path, start, stop: ["x" * 10 for _ in range(start, stop)])
+    upload = io.BytesIO(uuid.uuid4().bytes)
+
+    assert pdf.extract_pdf_text(upload, max_chars=15) == "x" * 10 + "\n" + "x" * 4
+
+    # The cached text is the truncated one
+    monkeypatch.setattr(pdf, "_extract_pages", None)
+    upload.seek(0)
+    assert pdf.extract_pdf_text(upload, max_chars=15) == "x" * 10 + "\n" + "x" * 4
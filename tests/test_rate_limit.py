@@ -0,0 +1,133 @@
+from types import SimpleNamespace
+
+import pytest
+
+from ai_course_creator.utils import rate_limit
+from ai_course_creator.utils.rate_limit import AdaptiveConcurrency, ProviderLimiter, TokenBucket, is_throttle_error
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+class HTTPStatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.response = SimpleNamespace(status_code=status_code)
+
+
+class GoogleAPIError(Exception):
+    def __init__(self, message, code):
+        super().__init__(message)
+        self.code = code
+
+
+@pytest.mark.parametrize("error", [
+    ResourceExhausted("quota"),
+    HTTPStatusError(429),
+    GoogleAPIError("too many requests", 429),
+    RuntimeError("400 RESOURCE_EXHAUSTED: quota exceeded"),
+])
+def test_throttle_errors(error):
+    assert is_throttle_error(error)
+
+
+@pytest.mark.parametrize("error", [
+    ValueError("Unit 4290 failed: invalid JSON at line 1429"),
+    RuntimeError("429"),
+    HTTPStatusError(500),
+    GoogleAPIError("bad request", 400),
+])
+def test_other_errors_are_not_throttles(error):
+    assert not is_throttle_error(error)
+
+
+def test_concurrency_grows_by_one_slot_per_window_of_successes():
+    concurrency = AdaptiveConcurrency(max_limit=8, initial=2)
+
+    for _ in range(2):
+        concurrency.acquire()
+        concurrency.release()
+
+    assert concurrency.limit == pytest.approx(2.0 + 0.5 + 1 / 2.5)
+    assert concurrency.in_flight == 0
+
+
+def test_concurrency_stays_within_its_bounds():
+    concurrency = AdaptiveConcurrency(max_limit=2, initial=2)
+    for _ in range(10):
+        concurrency.acquire()
+        concurrency.release()
+    assert concurrency.limit == 2
+
+    concurrency = AdaptiveConcurrency(max_limit=8, initial=1)
+    concurrency.acquire()
+    concurrency.release(throttled=True)
+    assert concurrency.limit == 1
+
+
+def test_throttling_halves_the_limit_once_per_cooldown(monkeypatch):
+    concurrency = AdaptiveConcurrency(max_limit=16, initial=8)
+
+    for _ in range(3):
+        concurrency.acquire()
+        concurrency.release(throttled=True)
+    assert concurrency.limit == 4
+
+    monkeypatch.setattr(rate_limit, "BACKOFF_COOLDOWN", -1.0)
+    concurrency.acquire()
+    concurrency.release(throttled=True)
+    assert concurrency.limit == 2
+
+
+def test_unrelated_error_in_a_slot_does_not_back_off():
+    limiter = ProviderLimiter("test", requests_per_minute=60, max_concurrency=8)
+    limit = limiter.concurrency.limit
+
+    with pytest.raises(ValueError):
+        with limiter.slot():
+            raise ValueError("Unit 4290 failed: invalid JSON at line 1429")
+
+    assert limiter.concurrency.limit > limit
+    assert limiter.stats()["throttled"] == 0
+    assert limiter.requests._tokens > 0
+
+
+def test_throttle_in_a_slot_backs_off_and_drains_the_request_bucket():
+    limiter = ProviderLimiter("test", requests_per_minute=60, max_concurrency=8)
+
+    with pytest.raises(ResourceExhausted):
+        with limiter.slot():
+            raise ResourceExhausted("quota")
+
+    assert limiter.concurrency.limit == 2
+    assert limiter.stats()["throttled"] == 1
+    assert limiter.requests._tokens <= 0
+
+
+def test_call_retries_throttles_only(monkeypatch):
+    monkeypatch.setattr(rate_limit, "throttle_backoff", lambda attempt: 0.0)
+    limiter = ProviderLimiter("test", requests_per_minute=0, max_concurrency=8)
+    calls = []
+
+    def throttled_once():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ResourceExhausted("quota")
+        return "ok"
+
+    assert limiter.call(throttled_once) == "ok"
+    assert len(calls) == 2
+
+    with pytest.raises(ValueError):
+        limiter.call(lambda: calls.append(1) or int("x"))
+    assert len(calls) == 3
+
+
+def test_token_bucket_corrects_to_actual_usage():
+    bucket = TokenBucket(rate_per_minute=600)
+
+    bucket.acquire(100)
+    bucket.adjust(-60)
+
+    assert bucket._tokens == pytest.approx(560, abs=1)
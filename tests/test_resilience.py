@@ -0,0 +1,184 @@
+import threading
+import time
+
+import pytest
+
+from ai_course_creator.utils import resilience
+from ai_course_creator.utils.rate_limit import ProviderLimiter
+from ai_course_creator.utils.resilience import LatencyTracker, resilient_call
+
+
+class ResourceExhausted(Exception):
+    pass
+
+
+@pytest.fixture(autouse=True)
+def backoffs(monkeypatch):
+    delays = []
+    monkeypatch.setattr(resilience, "_backoff", lambda attempt: delays.append(("transient", attempt)) or 0.0)
+    monkeypatch.setattr(resilience, "throttle_backoff", lambda attempt: delays.append(("throttle", attempt)) or 0.0)
+    monkeypatch.setattr(resilience, "latency_tracker", LatencyTracker())
+    return delays
+
+
+def _limiter(max_concurrency=1):
+    return ProviderLimiter("test", requests_per_minute=0, max_concurrency=max_concurrency)
+
+
+def test_queueing_for_a_slot_is_not_latency():
+    limiter = _limiter()
+    release = threading.Event()
+
+    def hold_slot():
+        with limiter.slot():
+            release.wait(5)
+
+    holder = threading.Thread(target=hold_slot)
+    holder.start()
+    while limiter.concurrency.in_flight == 0:
+        time.sleep(0.001)
+    threading.Timer(0.2, release.set).start()
+
+    assert resilient_call(lambda: "ok", latency_key="k", limiter=limiter) == "ok"
+    holder.join()
+
+    samples = resilience.latency_tracker._samples["k"]
+    assert len(samples) == 1 and samples[0] < 0.1
+
+
+def test_no_hedge_without_a_free_slot(monkeypatch):
+    limiter = _limiter()
+    monkeypatch.setattr(resilience.latency_tracker, "percentile", lambda key: 0.01)
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "ok"
+
+    assert resilient_call(slow, latency_key="k", limiter=limiter) == "ok"
+    assert len(calls) == 1
+
+
+def test_slow_request_is_hedged_when_a_slot_is_free(monkeypatch):
+    limiter = _limiter(max_concurrency=4)
+    monkeypatch.setattr(resilience.latency_tracker, "percentile", lambda key: 0.01)
+    calls = []
+
+    def first_slow():
+        calls.append(1)
+        if len(calls) == 1:
+            time.sleep(0.3)
+            return "slow"
+        return "fast"
+
+    assert resilient_call(first_slow, latency_key="k", limiter=limiter) == "fast"
+    assert len(calls) == 2
+
+
+def test_throttles_are_retried_in_one_layer_with_the_limiter_backoff(backoffs):
+    limiter = _limiter()
+    calls = []
+
+    def throttled_twice():
+        calls.append(1)
+        if len(calls) <= 2:
+            raise ResourceExhausted("429")
+        return "ok"
+
+    assert resilient_call(throttled_twice, retries=0, hedge=False, limiter=limiter) == "ok"
+    assert len(calls) == 3
+    assert backoffs == [("throttle", 0), ("throttle", 1)]
+    assert limiter.stats()["throttled"] == 2
+
+
+def test_throttle_retries_are_bounded(monkeypatch):
+    limiter = _limiter()
+    monkeypatch.setattr(resilience, "THROTTLE_RETRIES", 2)
+    calls = []
+
+    def always_throttled():
+        calls.append(1)
+        raise ResourceExhausted("429")
+
+    with pytest.raises(ResourceExhausted):
+        resilient_call(always_throttled, hedge=False, limiter=limiter)
+    assert len(calls) == 3
+
+
+def test_throttles_are_not_retried_without_a_limiter():
+    calls = []
+
+    def always_throttled():
+        calls.append(1)
+        raise ResourceExhausted("429")
+
+    with pytest.raises(ResourceExhausted):
+        resilient_call(always_throttled, hedge=False)
+    assert len(calls) == 1
+
+
+def test_transient_errors_are_retried():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 3:
+            raise ConnectionResetError()
+        return "ok"
+
+    assert resilient_call(flaky, retries=2, hedge=False) == "ok"
+
+
+def test_rejected_responses_return_the_last_value():
+    def rejected():
+        raise resilience.RetryableResponse("", "empty")
+
+    assert resilient_call(rejected, retries=1, hedge=False) == ""
+
+
+def test_request_queued_past_the_deadline_is_not_sent():
+    limiter = _limiter()
+    release = threading.Event()
+    calls = []
+
+    def hold_slot():
+        with limiter.slot():
+            release.wait(5)
+
+    holder = threading.Thread(target=hold_slot)
+    holder.start()
+    while limiter.concurrency.in_flight == 0:
+        time.sleep(0.001)
+
+    with pytest.raises(resilience.CallDeadlineExceeded):
+        resilient_call(lambda: calls.append(1), deadline=0.1, hedge=False, limiter=limiter)
+
+    release.set()
+    holder.join()
+    deadline = time.monotonic() + 5
+    while limiter.concurrency.in_flight and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    assert calls == []
+    assert limiter.concurrency.in_flight == 0
+
+
+def test_hedge_still_queued_when_the_first_request_wins_is_not_sent(monkeypatch):
+    limiter = _limiter(max_concurrency=4)
+    monkeypatch.setattr(resilience.latency_tracker, "percentile", lambda key: 0.01)
+    monkeypatch.setattr(limiter, "has_capacity", lambda: True)
+    limiter.concurrency.limit = 1.0  # the hedge has to wait for the first request's slot
+    calls = []
+
+    def slow():
+        calls.append(1)
+        time.sleep(0.1)
+        return "ok"
+
+    assert resilient_call(slow, latency_key="k", limiter=limiter) == "ok"
+    deadline = time.monotonic() + 5
+    while limiter.concurrency.in_flight and time.monotonic() < deadline:
+        time.sleep(0.001)
+
+    assert len(calls) == 1
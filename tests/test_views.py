@@ -0,0 +1,42 @@
+import json
+
+import pytest
+from django.contrib.auth.models import AnonymousUser
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import RequestFactory
+
+from ai_course_creator import views
+from ai_course_creator.core import jobs
+
+
+@pytest.mark.parametrize("view", [views.regenerate_unit, views.regenerate_subsection, views.regenerate_assessment])
+@pytest.mark.parametrize("body", [b"[]", b'"x"', b"42", b"null", b"{not json", json.dumps({"course_id": ["a"]}).encode()])
+def test_regeneration_rejects_bodies_that_are_not_a_json_object(view, body):
+    request = RequestFactory().post("/regenerate/", data=body, content_type="application/json")
+    request.user = AnonymousUser()
+
+    response = view(request)
+
+    assert response.status_code == 400
+    assert json.loads(response.content)["result"] == "error"
+
+
+def test_generation_job_defers_pdf_extraction_to_the_job(monkeypatch, tmp_path):
+    submitted = []
+    monkeypatch.setattr(jobs, "default_storage", FileSystemStorage(location=str(tmp_path)))
+    monkeypatch.setattr(jobs, "submit_job", lambda params, owner_id=None: submitted.append(params) or "job-1")
+    monkeypatch.setattr(views, "extract_pdf_text", None)
+    monkeypatch.setattr(views, "reverse", lambda name, args: f"/{name}/{args[0]}")
+    request = RequestFactory().post("/jobs/", data={
+        "course_topic": "Python",
+        "course_level": "beginner",
+        "source_pdf": SimpleUploadedFile("notes.pdf", b"%PDF-1.4", content_type="application/pdf"),
+    })
+    request.user = AnonymousUser()
+
+    response = views.create_generation_job(request)
+
+    assert response.status_code == 202
+    assert submitted[0]["source_material"] is None
+    assert jobs.default_storage.open(submitted[0]["source_pdf"]).read() == b"%PDF-1.4"